@@ -0,0 +1,179 @@
+# runs the back test benchmark scenarios against synthetic bars, eg.
+#   python -m benchmarks.run --save benchmarks/baseline.json
+#   python -m benchmarks.run --compare benchmarks/baseline.json
+# each scenario runs in its own interpreter so its peak RSS isn't muddied by the others
+from datetime import datetime, timezone
+import argparse
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # windows
+    resource = None
+
+from .synthetic import make_symbols
+
+# how much slower than the baseline (as a fraction) a scenario can be before it's flagged
+DEFAULT_TOLERANCE = 0.1
+
+
+def _peak_rss() -> int:
+    # bytes, or None where we can't tell
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_scenario(name: str, bars: int, interval: str, symbol_count: int, seed: int) -> dict:
+    from .scenarios import SCENARIOS
+
+    scenario, default_symbol_count = SCENARIOS[name]
+    symbol_count = symbol_count or default_symbol_count
+
+    started = time.perf_counter()
+    symbols = make_symbols(symbol_count, bars, interval=interval, seed=seed)
+    generated = time.perf_counter()
+    counts = scenario(symbols, random.Random(seed))
+    finished = time.perf_counter()
+
+    elapsed = finished - generated
+    return {
+        "symbols": symbol_count,
+        "ticks": counts["ticks"],
+        "orders": counts["orders"],
+        "setup_seconds": generated - started,
+        "seconds": elapsed,
+        "ticks_per_sec": counts["ticks"] / elapsed,
+        "orders_per_sec": counts["orders"] / elapsed,
+        "peak_rss": _peak_rss(),
+    }
+
+
+def _run_in_subprocess(name: str, args) -> dict:
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.run",
+        "--child",
+        name,
+        "--bars",
+        str(args.bars),
+        "--interval",
+        args.interval,
+        "--seed",
+        str(args.seed),
+    ]
+    if args.symbols:
+        command += ["--symbols", str(args.symbols)]
+
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode:
+        raise RuntimeError(f"Scenario {name} failed:\n{completed.stderr}")
+
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def _format_rss(peak_rss) -> str:
+    if peak_rss is None:
+        return "n/a"
+    return f"{peak_rss / 2**20:.1f} MB"
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # names of the scenarios that got slower than the baseline by more than tolerance
+    if baseline.get("config") != results["config"]:
+        print(
+            f"Warning: baseline was run with {baseline.get('config')}, this run used "
+            f"{results['config']} so the numbers may not be comparable"
+        )
+
+    regressions = []
+    print(f"{'scenario':<16}{'ticks/sec':>14}{'baseline':>14}{'change':>10}{'peak rss':>14}")
+    for name, result in results["scenarios"].items():
+        if name not in baseline["scenarios"]:
+            print(f"{name:<16}{result['ticks_per_sec']:>14.0f}{'-':>14}{'-':>10}")
+            continue
+
+        previous = baseline["scenarios"][name]
+        change = result["ticks_per_sec"] / previous["ticks_per_sec"] - 1
+        flag = ""
+        if change < -tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+
+        print(
+            f"{name:<16}{result['ticks_per_sec']:>14.0f}{previous['ticks_per_sec']:>14.0f}"
+            f"{change:>+10.1%}{_format_rss(result['peak_rss']):>14}{flag}"
+        )
+
+    return regressions
+
+
+def main(argv=None):
+    from .scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(description="Benchmark BackTestAPI on synthetic bars")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="default all")
+    parser.add_argument("--bars", type=int, default=5000, help="bars per symbol")
+    parser.add_argument("--interval", default="1min", help="pandas frequency string")
+    parser.add_argument("--symbols", type=int, help="override each scenario's symbol count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        # keep the engine's per order logging out of the timings
+        logging.basicConfig(level=logging.ERROR)
+        result = run_scenario(args.child, args.bars, args.interval, args.symbols, args.seed)
+        print(json.dumps(result))
+        return 0
+
+    results = {
+        "config": {
+            "bars": args.bars,
+            "interval": args.interval,
+            "symbols": args.symbols,
+            "seed": args.seed,
+        },
+        "python": platform.python_version(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "scenarios": {},
+    }
+
+    for name in args.scenario or list(SCENARIOS):
+        result = _run_in_subprocess(name, args)
+        results["scenarios"][name] = result
+        print(
+            f"{name}: {result['ticks']} ticks, {result['orders']} orders in "
+            f"{result['seconds']:.2f}s - {result['ticks_per_sec']:.0f} ticks/sec, "
+            f"{result['orders_per_sec']:.0f} orders/sec, peak rss {_format_rss(result['peak_rss'])}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
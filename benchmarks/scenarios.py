@@ -0,0 +1,159 @@
+from broker_api.back_test import BackTestAPI, BackTestClock
+import random
+
+# big enough that no scenario has its buys cancelled for lack of funds
+BALANCE = 1_000_000_000
+
+
+def _setup(symbols):
+    # closes are pulled out up front so the scenarios time the engine rather than pandas lookups
+    clock = BackTestClock()
+    api = BackTestAPI(clock, back_testing_balance=BALANCE, symbol_objects=symbols)
+    closes = {symbol.yf_symbol: symbol.ohlc.bars["Close"].tolist() for symbol in symbols}
+    return clock, api, symbols[0].ohlc.bars.index, closes
+
+
+def market_churn(symbols, rng: random.Random) -> dict:
+    # flips every symbol between flat and long with market orders on every bar
+    clock, api, index, closes = _setup(symbols)
+    orders = 0
+
+    for period in index:
+        clock.now = period
+        for symbol in closes:
+            if api.get_position(symbol).quantity:
+                api.sell_order_market(symbol, 1)
+            else:
+                api.buy_order_market(symbol, 1)
+            orders += 1
+
+    return {"ticks": len(index), "orders": orders}
+
+
+def limit_grid(symbols, rng: random.Random, levels: int = 20, step: float = 0.001) -> dict:
+    # a grid of resting limit buys below the close and sells above it, which is pulled and laid
+    # again around the new close whenever something in it fills
+    clock, api, index, closes = _setup(symbols)
+    resting = {symbol: [] for symbol in closes}
+    held = {symbol: None for symbol in closes}
+    orders = 0
+
+    for number, period in enumerate(index):
+        clock.now = period
+        for symbol, symbol_closes in closes.items():
+            quantity = api.get_position(symbol).quantity
+            if quantity == held[symbol]:
+                continue
+            held[symbol] = quantity
+
+            for order_id in resting[symbol]:
+                if not api.get_order(order_id).closed:
+                    api.cancel_order(order_id)
+
+            close = symbol_closes[number]
+            grid = []
+            for level in range(1, levels + 1):
+                grid.append(api.buy_order_limit(symbol, 1, close * (1 - step * level)).order_id)
+                grid.append(api.sell_order_limit(symbol, 1, close * (1 + step * level)).order_id)
+                orders += 2
+            resting[symbol] = grid
+
+    return {"ticks": len(index), "orders": orders}
+
+
+def sparse_symbols(symbols, rng: random.Random, order_probability: float = 0.002) -> dict:
+    # lots of symbols that each only see an occasional order, so most of every tick is spent
+    # finding out there is nothing to do
+    clock, api, index, closes = _setup(symbols)
+    orders = 0
+
+    for number, period in enumerate(index):
+        clock.now = period
+        api.list_positions()
+        for symbol, symbol_closes in closes.items():
+            if rng.random() >= order_probability:
+                continue
+
+            close = symbol_closes[number]
+            choice = rng.random()
+            if choice < 0.25:
+                api.buy_order_market(symbol, 1)
+            elif choice < 0.5:
+                api.sell_order_market(symbol, 1)
+            elif choice < 0.75:
+                api.buy_order_limit(symbol, 1, close * (1 - rng.uniform(0, 0.01)))
+            else:
+                api.sell_order_limit(symbol, 1, close * (1 + rng.uniform(0, 0.01)))
+            orders += 1
+
+    return {"ticks": len(index), "orders": orders}
+
+
+def cancel_replace(symbols, rng: random.Random, depth: int = 10, step: float = 0.002) -> dict:
+    # requotes every resting limit order on every bar, so nearly every order ends up cancelled
+    clock, api, index, closes = _setup(symbols)
+    resting = {symbol: [] for symbol in closes}
+    orders = 0
+
+    for number, period in enumerate(index):
+        clock.now = period
+        for symbol, symbol_closes in closes.items():
+            api.get_position(symbol)
+            for order_id in resting[symbol]:
+                if not api.get_order(order_id).closed:
+                    api.cancel_order(order_id)
+
+            close = symbol_closes[number]
+            quotes = []
+            for level in range(1, depth + 1):
+                offset = step * level * rng.uniform(0.9, 1.1)
+                quotes.append(api.buy_order_limit(symbol, 1, close * (1 - offset)).order_id)
+                quotes.append(api.sell_order_limit(symbol, 1, close * (1 + offset)).order_id)
+                orders += 2
+            resting[symbol] = quotes
+
+    return {"ticks": len(index), "orders": orders}
+
+
+def rebalance(symbols, rng: random.Random, every: int = 10, band: float = 0.005) -> dict:
+    # every few bars pulls whatever didn't fill last time and sends a whole portfolio's worth of
+    # orders as one batch, selling some symbols and buying others
+    clock, api, index, closes = _setup(symbols)
+    resting = []
+    orders = 0
+
+    for number, period in enumerate(index):
+        clock.now = period
+        if number % every:
+            continue
+
+        api.cancel_orders(resting)
+        batch = []
+        for symbol, symbol_closes in closes.items():
+            close = symbol_closes[number]
+            if api.get_position(symbol).quantity and rng.random() < 0.5:
+                batch.append({"symbol": symbol, "order_type": "MARKET_SELL", "units": 1})
+            else:
+                batch.append(
+                    {
+                        "symbol": symbol,
+                        "order_type": "LIMIT_BUY",
+                        "units": 1,
+                        "unit_price": close * (1 - rng.uniform(0, band)),
+                    }
+                )
+        results = api.submit_orders(batch)
+        resting = [order.order_id for order in results if not order.closed]
+        orders += len(batch)
+
+    return {"ticks": len(index), "orders": orders}
+
+
+# name: (scenario, default number of symbols)
+SCENARIOS = {
+    "market_churn": (market_churn, 2),
+    "limit_grid": (limit_grid, 2),
+    "sparse_symbols": (sparse_symbols, 200),
+    "cancel_replace": (cancel_replace, 4),
+    "rebalance": (rebalance, 50),
+}
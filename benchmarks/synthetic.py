@@ -0,0 +1,61 @@
+from pandas import DataFrame, date_range
+import numpy as np
+
+
+class SyntheticOHLC:
+    bars: DataFrame
+
+    def __init__(self, bars: DataFrame):
+        self.bars = bars
+
+
+class SyntheticSymbol:
+    # quacks like the symbol objects BackTestAPI._put_symbol expects
+    def __init__(self, yf_symbol: str, bars: DataFrame, min_price_increment: float = 0.0001):
+        self.yf_symbol = yf_symbol
+        self.ohlc = SyntheticOHLC(bars)
+        self.min_price_increment = min_price_increment
+
+    def align_price(self, price):
+        return round(price, 4)
+
+
+def generate_bars(
+    bar_count: int,
+    interval: str = "1min",
+    start: str = "2022-01-01",
+    start_price: float = 100,
+    volatility: float = 0.002,
+    seed: int = 0,
+) -> DataFrame:
+    # geometric random walk for Close, with Open at the previous Close and High/Low pushed out
+    # past both by a random fraction of a step
+    rng = np.random.default_rng(seed)
+    index = date_range(start, periods=bar_count, freq=interval, tz="UTC")
+
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, bar_count)))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, volatility, bar_count))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, volatility, bar_count))
+    volume = rng.lognormal(mean=6, sigma=1, size=bar_count)
+
+    return DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index
+    )
+
+
+def make_symbols(
+    symbol_count: int, bar_count: int, interval: str = "1min", seed: int = 0
+) -> list:
+    rng = np.random.default_rng(seed)
+    symbols = []
+    for number in range(symbol_count):
+        bars = generate_bars(
+            bar_count=bar_count,
+            interval=interval,
+            start_price=float(rng.uniform(1, 1000)),
+            seed=seed * 10007 + number,
+        )
+        symbols.append(SyntheticSymbol(f"SYN{number}-USD", bars))
+
+    return symbols
@@ -16,6 +16,7 @@ from alpaca_trade_api.rest import APIError
 import pandas as pd
 import logging
 import math
+import sys
 from dateutil.relativedelta import relativedelta
 
 log = logging.getLogger(__name__)
@@ -95,6 +96,8 @@ INTERVAL_MAP = {
 
 
 class OrderResult(IOrderResult):
+    __slots__ = ()
+
     def __init__(self, response: entity.Order, alpaca_to_yf_symbol_map: dict):
         self._raw_response = response
 
@@ -105,7 +108,7 @@ class OrderResult(IOrderResult):
         self.order_type_text = ORDER_MAP_INVERTED[self.order_type]
 
         self.order_id = response.id
-        self.symbol = self._to_yf(response.symbol, alpaca_to_yf_symbol_map)
+        self.symbol = sys.intern(self._to_yf(response.symbol, alpaca_to_yf_symbol_map))
 
         if response.type == "limit":
             self.ordered_unit_quantity = float(response.qty)
@@ -128,7 +131,7 @@ class OrderResult(IOrderResult):
             self.filled_total_value = None
 
         self.status = ORDER_STATUS_TEXT_INVERTED[response.status]
-        self.status_text = response.status
+        self.status_text = sys.intern(response.status)
         self.status_summary = ORDER_STATUS_ID_TO_SUMMARY[self.status]
 
         self.success = (
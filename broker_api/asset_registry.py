@@ -0,0 +1,167 @@
+from decimal import Decimal
+import csv
+import math
+import os
+import numpy as np
+
+from .ibroker_api import Asset
+
+ASSETS_PATH = os.path.join(os.path.dirname(__file__), "data", "back_test_assets.csv")
+
+# what BackTestAPI has always assumed for symbols it doesn't know about
+DEFAULT_MIN_ORDER_SIZE = 1
+DEFAULT_QUANTITY_INCREMENT = 1
+DEFAULT_PRICE_INCREMENT = 0.001
+
+# quantities within this many increments below a whole one are taken to be that whole one, so
+# float noise like 0.3 / 0.1 = 2.9999999999999996 doesn't lose an increment
+QUANTITY_TOLERANCE = 1e-9
+
+_registry = None
+
+
+def price_decimals(increment: float) -> int:
+    return max(0, -Decimal(str(increment)).normalize().as_tuple().exponent)
+
+
+class AssetRegistry:
+    # minimum order size, quantity increment and price increment for every known symbol, in read
+    # only arrays indexed by symbol id. unknown symbols all map to one extra row of defaults.
+    #
+    # values are aligned as round(value / increment) * units / 10**decimals, where units is the
+    # increment expressed in those decimals. that's exact integer arithmetic right up to the
+    # final division, so the scalar and vectorised versions always agree to the last bit
+    def __init__(
+        self,
+        symbols: list,
+        min_order_size: list,
+        min_quantity_increment: list,
+        min_price_increment: list,
+        crypto: list = None,
+    ):
+        self.symbols = tuple(symbols)
+        self._ids = {symbol: symbol_id for symbol_id, symbol in enumerate(self.symbols)}
+        self._crypto = tuple(
+            symbol for symbol, is_crypto in zip(self.symbols, crypto or []) if is_crypto
+        )
+
+        self.min_order_size = self._freeze(list(min_order_size) + [DEFAULT_MIN_ORDER_SIZE])
+        self.min_quantity_increment = self._freeze(
+            list(min_quantity_increment) + [DEFAULT_QUANTITY_INCREMENT]
+        )
+        self.min_price_increment = self._freeze(
+            list(min_price_increment) + [DEFAULT_PRICE_INCREMENT]
+        )
+
+        self._price_units, self._price_scale = self._scales(self.min_price_increment)
+        self._quantity_units, self._quantity_scale = self._scales(self.min_quantity_increment)
+
+        # the same as plain floats per symbol id, for aligning one value at a time
+        self._price_steps = list(
+            zip(
+                self.min_price_increment.tolist(),
+                self._price_units.tolist(),
+                self._price_scale.tolist(),
+            )
+        )
+        self._quantity_steps = list(
+            zip(
+                self.min_quantity_increment.tolist(),
+                self._quantity_units.tolist(),
+                self._quantity_scale.tolist(),
+            )
+        )
+
+    @classmethod
+    def from_csv(cls, path: str = ASSETS_PATH):
+        # columns: symbol, min_order_size, min_quantity_increment, min_price_increment and
+        # optionally crypto (1/0)
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+
+        return cls(
+            symbols=[row["symbol"] for row in rows],
+            min_order_size=[float(row["min_order_size"]) for row in rows],
+            min_quantity_increment=[float(row["min_quantity_increment"]) for row in rows],
+            min_price_increment=[float(row["min_price_increment"]) for row in rows],
+            crypto=[row.get("crypto", "0") == "1" for row in rows],
+        )
+
+    @staticmethod
+    def _freeze(values: list) -> np.ndarray:
+        array = np.array(values, dtype="float64")
+        array.flags.writeable = False
+        return array
+
+    @classmethod
+    def _scales(cls, increments: np.ndarray):
+        decimals = [price_decimals(increment) for increment in increments]
+        scale = cls._freeze([10.0**places for places in decimals])
+        units = cls._freeze(
+            [round(increment * 10**places) for increment, places in zip(increments, decimals)]
+        )
+        return units, scale
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str):
+        return symbol in self._ids
+
+    def symbol_id(self, symbol: str) -> int:
+        # the defaults row for unknown symbols
+        return self._ids.get(symbol, len(self.symbols))
+
+    def ids(self, symbols) -> np.ndarray:
+        if isinstance(symbols, str):
+            return np.array([self.symbol_id(symbols)])
+        return np.array([self.symbol_id(symbol) for symbol in symbols], dtype=np.int64)
+
+    def crypto_symbols(self) -> list:
+        return list(self._crypto)
+
+    def get_asset(self, symbol: str) -> Asset:
+        symbol_id = self.symbol_id(symbol)
+        return Asset(
+            symbol=symbol,
+            min_quantity=self.min_order_size[symbol_id].item(),
+            min_quantity_increment=self.min_quantity_increment[symbol_id].item(),
+            min_price_increment=self.min_price_increment[symbol_id].item(),
+        )
+
+    def align_price(self, symbol: str, price: float) -> float:
+        increment, units, scale = self._price_steps[self.symbol_id(symbol)]
+        return round(price / increment) * units / scale
+
+    def align_quantity(self, symbol: str, quantity: float) -> float:
+        # rounds down, since you can't trade a part of an increment
+        increment, units, scale = self._quantity_steps[self.symbol_id(symbol)]
+        return math.floor(quantity / increment + QUANTITY_TOLERANCE) * units / scale
+
+    def align_prices(self, symbols, prices) -> np.ndarray:
+        # symbols is either one symbol for every price, or a symbol per price
+        ids = self.ids(symbols)
+        prices = np.asarray(prices, dtype="float64")
+        return (
+            np.rint(prices / self.min_price_increment[ids])
+            * self._price_units[ids]
+            / self._price_scale[ids]
+        )
+
+    def align_quantities(self, symbols, quantities) -> np.ndarray:
+        ids = self.ids(symbols)
+        quantities = np.asarray(quantities, dtype="float64")
+        increments = quantities / self.min_quantity_increment[ids]
+        return (
+            np.floor(increments + QUANTITY_TOLERANCE)
+            * self._quantity_units[ids]
+            / self._quantity_scale[ids]
+        )
+
+
+def get_registry() -> AssetRegistry:
+    # the bundled assets, loaded the first time they're asked for and shared from then on
+    global _registry
+    if _registry is None:
+        _registry = AssetRegistry.from_csv()
+    return _registry
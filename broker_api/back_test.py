@@ -3,11 +3,27 @@ from .ibroker_api import (
     IOrderResult,
     Account,
     Position,
-    Asset,
     NotImplementedError,
+    ZeroUnitsOrderedError,
 )
-from pandas import Timestamp
+from .asset_registry import AssetRegistry, get_registry
+from .bar_cache import BarCache
+from .equity_recorder import EquityRecorder
+from .fx_rates import FxRates, quote_currency
+from .ledger import DUST_UNITS, LotLedger
+from .order_archive import OrderArchive
+from .order_book import PriceLadder
+from .settlement_stats import SettlementStats
+from collections import OrderedDict
+from functools import partial
+from pandas import DataFrame, DatetimeIndex, Timestamp
+import numpy as np
+import heapq
 import logging
+import os
+import pickle
+import struct
+import sys
 import uuid
 
 # update fixtures to match new OrderResults spec
@@ -67,6 +83,41 @@ ORDER_MAP = {
 }
 ORDER_MAP_INVERTED = {y: x for x, y in ORDER_MAP.items()}
 
+BUY_ORDER_TYPES = {MARKET_BUY, LIMIT_BUY, STOP_LIMIT_BUY}
+SELL_ORDER_TYPES = {MARKET_SELL, LIMIT_SELL, STOP_LIMIT_SELL}
+PRICED_ORDER_TYPES = {LIMIT_BUY, LIMIT_SELL, STOP_LIMIT_BUY, STOP_LIMIT_SELL}
+
+# stop buys trigger once a bar's High reaches the stop price, stop sells once its Low does.
+# after that they're limit orders like any other
+STOP_BUY_TRIGGER = "High"
+STOP_SELL_TRIGGER = "Low"
+
+# snapshot files are SNAPSHOT_MAGIC, then the format version as a little endian uint16, then a
+# pickle of the simulation state. bump the version whenever that state changes shape, and have
+# _upgrade_snapshot bring older versions up to date
+SNAPSHOT_MAGIC = b"BTSNAP"
+SNAPSHOT_VERSION = 2
+
+# BackTestAPI attributes that are re-attached on restore rather than written to a snapshot
+SNAPSHOT_EXCLUDED = {
+    "_time_manager",
+    "_symbols",
+    "_bar_cache",
+    "_rows",
+    "_intrabar_source",
+    "_intrabar_cache",
+    "_stats",
+    "_asset_registry",
+    "_align_price",
+}
+
+# how many bars worth of intrabar data to hold on to
+INTRABAR_CACHE_SIZE = 64
+
+# closed orders kept in memory when spilling to an order archive. once twice this many have
+# closed, the oldest half get written out
+CLOSED_ORDER_WINDOW = 10000
+
 INTERVAL_MAP = {
     "1m": "1Min",
     "5m": "5Min",
@@ -76,22 +127,76 @@ INTERVAL_MAP = {
 
 
 class OrderResult(IOrderResult):
+    # _currency is the cash currency the order settles in, which is all that's needed on top of
+    # the other fields to rebuild the raw response
+    __slots__ = ("_currency", "stop_price")
+
     def __init__(self, response: dict):
-        self._raw_response = response
+        self._raw = response
+        self._currency = response.get("quantity_asset")
+        self.stop_price = response.get("stop_price")
+        self._populate(
+            order_type=response["order_type"],
+            order_id=response["orderUuid"],
+            symbol=response["symbol"],
+            quantity=response["quantity"],
+            limit_price=response.get("limit_price"),
+            status=response["status"],
+            fees=response["feeAmount"],
+            create_time=response["created_time"],
+            update_time=response["updated_time"],
+        )
 
-        self.order_type = response["order_type"]
+    @classmethod
+    def place(
+        cls,
+        order_type: int,
+        order_id: str,
+        symbol: str,
+        quantity: float,
+        limit_price: float = None,
+        currency: str = "USD",
+        period=None,
+        status: int = 1,
+        fees: float = 0,
+        update_time=None,
+        stop_price: float = None,
+    ):
+        # same as building the response dict BackTestAPI used to make and passing it in, but the
+        # dict only gets built if something asks for _raw_response
+        order = cls.__new__(cls)
+        order._raw = None
+        order._currency = currency
+        order.stop_price = None if stop_price is None else float(stop_price)
+        order._populate(
+            order_type=order_type,
+            order_id=order_id,
+            symbol=symbol,
+            quantity=quantity,
+            limit_price=limit_price,
+            status=status,
+            fees=fees,
+            create_time=period,
+            update_time=period if update_time is None else update_time,
+        )
+        return order
+
+    def _populate(
+        self, order_type, order_id, symbol, quantity, limit_price, status, fees, create_time, update_time
+    ):
+        self.order_type = order_type
         self.order_type_text = ORDER_MAP_INVERTED[self.order_type]
-        self.order_id = response["orderUuid"]
-        self.symbol = response["symbol"]
+        self.order_id = order_id
+        self.symbol = sys.intern(symbol)
 
-        if self.order_type == LIMIT_BUY or self.order_type == LIMIT_SELL:
-            self.ordered_unit_quantity = float(response["quantity"])
-            self.ordered_unit_price = float(response["limit_price"])
+        if self.order_type in PRICED_ORDER_TYPES:
+            self.ordered_unit_quantity = float(quantity)
+            self.ordered_unit_price = float(limit_price)
             self.ordered_total_value = self.ordered_unit_quantity * self.ordered_unit_price
 
         else:
             # market orders - so there is only quantity is known, not price or total value
-            self.ordered_unit_quantity = float(response["quantity"])
+            self.ordered_unit_quantity = float(quantity)
             self.ordered_unit_price = None
             self.ordered_total_value = None
 
@@ -99,18 +204,18 @@ class OrderResult(IOrderResult):
         self.filled_unit_price = None
         self.filled_total_value = None
 
-        self.status = response["status"]
+        self.status = status
         self.status_text = ORDER_STATUS_TEXT[self.status]
         self.status_summary = ORDER_STATUS_ID_TO_SUMMARY[self.status]
         self.success = (
-            response["status"] in ORDER_STATUS_SUMMARY_TO_ID["open"]
-            or response["status"] in ORDER_STATUS_SUMMARY_TO_ID["filled"]
+            status in ORDER_STATUS_SUMMARY_TO_ID["open"]
+            or status in ORDER_STATUS_SUMMARY_TO_ID["filled"]
         )
 
-        self.fees = response["feeAmount"]
+        self.fees = fees
 
-        self.create_time = response["created_time"]
-        self.update_time = response["updated_time"]
+        self.create_time = create_time
+        self.update_time = update_time
 
         open_statuses = ["open", "pending"]
         if self.status_summary in open_statuses:
@@ -120,6 +225,53 @@ class OrderResult(IOrderResult):
 
         self.validate()
 
+    def _materialize_raw_response(self) -> dict:
+        # the response for the order as it was placed, but at its current status - so a bracket
+        # exit that's still being held back shows as pending, same as its status does
+        stop_price = getattr(self, "stop_price", None)
+        if self.order_type in BUY_ORDER_TYPES:
+            secondary_asset, primary_asset = self._currency, self.symbol
+        else:
+            secondary_asset, primary_asset = self.symbol, self._currency
+
+        response = {
+            "order_type": self.order_type,
+            "orderUuid": self.order_id,
+            "secondary_asset": secondary_asset,
+            "primary_asset": primary_asset,
+            "symbol": self.symbol,
+            "quantity": self.ordered_unit_quantity,
+            "quantity_asset": self._currency,
+            "status": self.status,
+            "fees": 0,
+            "feeAmount": 0,
+            "created_time": self.create_time,
+            "updated_time": self.create_time,
+        }
+        if self.ordered_unit_price is not None:
+            response["limit_price"] = self.ordered_unit_price
+        if stop_price is not None:
+            response["stop_price"] = stop_price
+        return response
+
+
+class OrderGroup:
+    # orders that close together - once one of them fills or is cancelled, the rest get cancelled
+    # by the system, and a partial fill shrinks the rest by what filled. a bracket also has an
+    # entry, and its exits only go live (released) once that starts filling, covering whatever
+    # it's filled so far
+    def __init__(self, group_id: str, order_ids: list, entry: str = None):
+        self.group_id = group_id
+        self.order_ids = order_ids
+        self.entry = entry
+        self.released = entry is None
+
+
+class BackTestClock:
+    # bare minimum time manager for BackTestAPI - anything with a settable 'now' will do
+    def __init__(self, now=None):
+        self.now = now
+
 
 # concrete implementation of trade api for alpaca
 class BackTestAPI(ITradeAPI):
@@ -131,7 +283,18 @@ class BackTestAPI(ITradeAPI):
         back_testing_balance: float = 100000,
         sell_metric: str = "Low",
         buy_metric: str = "High",
-        symbol_objects:set=None
+        symbol_objects:set=None,
+        intrabar_source=None,
+        instrument: bool = False,
+        order_archive: str = None,
+        closed_order_window: int = CLOSED_ORDER_WINDOW,
+        asset_registry=None,
+        align_to_registry: bool = False,
+        fill_model=None,
+        participation_rate: float = None,
+        default_currency: str = "USD",
+        fx_rates=None,
+        keep_closed_lots: bool = False,
     ):
         # set up asset lists
         #self.assets = {
@@ -144,75 +307,381 @@ class BackTestAPI(ITradeAPI):
         #}
         
 
-        self._balance = back_testing_balance
+        # order size and increment details for get_asset, shared by every instance unless one is
+        # passed in. with align_to_registry, fill prices are aligned to its price increments
+        # instead of by the symbol objects' align_price
+        self._asset_registry = asset_registry or get_registry()
+        self._align_to_registry = align_to_registry
+        self._align_price = {}
 
         #self.asset_list_by_symbol = self.assets
         self.supported_crypto_symbols = self._get_crypto_symbols()
 
-        self.default_currency = "USD"
+        self.default_currency = default_currency
 
+        # symbol -> LotLedger of the units bought and not yet sold. sold out lots are dropped
+        # unless keep_closed_lots, which get_lot_pnl needs to list them
         self._assets_held = {}
+        self._keep_closed_lots = keep_closed_lots
         self._orders = {}
         self._inactive_orders = []
+        # order_id -> order for every order ever placed, active or not, plus the same thing
+        # split out by symbol so that get_order and list_orders don't have to scan
+        self._all_orders = {}
+        self._orders_by_symbol = {}
+
+        # if order_archive is a directory, closed orders beyond closed_order_window get moved out
+        # of the three above and into an OrderArchive there, so memory doesn't keep growing
+        if order_archive and closed_order_window < 1:
+            raise ValueError(f"closed_order_window must be at least 1, got {closed_order_window}")
+        self._archive = OrderArchive(order_archive) if order_archive else None
+        self._closed_order_window = closed_order_window
+
+        # the period that _update_order_status last swept, and the orders placed since then.
+        # while the clock stays on the same period only those new orders need settling
+        self._settled_period = None
+        self._unsettled_orders = {}
+
+        # bar row for each symbol at the period being settled, so it's looked up once per symbol
+        self._rows = {}
+
+        # open orders are settled in the order they were placed. market orders waiting on a bar
+        # are kept as order_id -> sequence, and limit orders sit in a price sorted ladder per
+        # symbol per side so a bar only has to look at the ones it actually crosses
+        self._order_sequence = 0
+        self._book_keys = {}
+        self._market_orders = {}
+        self._limit_buys = {}
+        self._limit_sells = {}
+
+        # stop limit orders that haven't triggered yet (status 5), in ladders sorted by stop
+        # price, with order_id -> (sequence, stop price). once triggered they move into the limit
+        # ladders above, keeping their sequence
+        self._stop_keys = {}
+        self._stop_buys = {}
+        self._stop_sells = {}
+
+        # group_id -> OrderGroup for OCO and bracket orders that are still open, and order_id ->
+        # group_id for their members, so closing a group only touches its own orders
+        self._groups = {}
+        self._order_group = {}
+
+        # heap of (nanoseconds, period) that fast_forward must not jump past
+        self._wake_periods = []
+
+        # optional callable (symbol, start, end) -> DataFrame of finer bars covering [start, end).
+        # when a bar triggers more than one order for a symbol, its finer bars get streamed in
+        # and settled in order so we know which order would actually have filled first
+        self._intrabar_source = intrabar_source
+        self._intrabar_cache = OrderedDict()
+
+        # cash and marked to market positions at every settled period. _marks holds the last
+        # price each held symbol was marked at, for periods where it has no bar
+        self._equity = EquityRecorder()
+        self._marks = {}
+        self._period_ns = None
+
+        # settlement phase timings and order counts, see stats(). None unless instrumented, and
+        # the hot path only ever checks it for truthiness
+        self._stats = SettlementStats() if instrument else None
+
+        # optional FillModel that slips market order prices and charges fees. without one, fills
+        # are at exactly the bar's buy/sell metric (or limit price) and free
+        self._fill_model = fill_model
+
+        # optional cap on how much of a bar's Volume orders can fill against, eg. 0.1 for 10%.
+        # whatever doesn't fit carries forward to the next bar as a partially filled order.
+        # what's left this bar is kept per symbol in _capacity, indexed by _capacity_ids, and is
+        # NaN until the first order for that symbol looks at it
+        if participation_rate is not None and not 0 < participation_rate <= 1:
+            raise ValueError(f"participation_rate must be in (0, 1], got {participation_rate}")
+        self._participation_rate = participation_rate
+        self._capacity_ids = {}
+        self._capacity = np.zeros(0)
+        self._capacity_time = None
+
+        # cash in each currency, as an array indexed by _currency_ids with default_currency always
+        # at 0. back_testing_balance is either a default_currency amount, in which case everything
+        # settles in default_currency as it always has, or a dict of {currency: amount} to start
+        # with, in which case symbols settle in whatever they're quoted in (BTC-AUD in AUD).
+        #
+        # fx_rates (an FxRates, or what one is built from) values the other currencies in
+        # default_currency. _fx_rates is what one unit of each is worth at the current tick, looked
+        # up once per tick from _fx_matrix
+        self._multi_currency = isinstance(back_testing_balance, dict)
+        if fx_rates is not None and not isinstance(fx_rates, FxRates):
+            fx_rates = FxRates(fx_rates, base=default_currency)
+        self._fx = fx_rates
+        self._quote_currencies = {}
+        if self._multi_currency:
+            self._set_up_cash(back_testing_balance)
+        else:
+            self._set_up_cash({default_currency: back_testing_balance})
+
         self._symbols = {}
+        self._bar_cache = {}
+
+        # needs to be set before symbols are registered, since the bar cache is built from them
+        self.sell_metric = sell_metric
+        self.buy_metric = buy_metric
 
         if symbol_objects:
             for symbol_obj in symbol_objects:
                 self._put_symbol(symbol_obj)
 
-        self.sell_metric = sell_metric
-        self.buy_metric = buy_metric
-
         self._time_manager = time_manager
 
     @property
     def period(self):
         return self._time_manager.now
 
+    @property
+    def _balance(self):
+        # cash in default_currency
+        return self._cash.item(0)
+
+    @_balance.setter
+    def _balance(self, balance):
+        self._cash[0] = balance
+
     def get_broker_name(self):
         return "back_test"
 
-    def _get_crypto_symbols(self):
-        # crypto_symbols = ["BTC", "SOL", "ADA", "SHIB"]
-        crypto_symbols = [
-            "AAVE-USD",
-            "AVAX-USD",
-            "BAT-USD",
-            "BTC-USD",
-            "BCH-USD",
-            "LINK-USD",
-            "DAI-USD",
-            "DOGE-USD",
-            "ETH-USD",
-            "GRT-USD",
-            "LTC-USD",
-            "MKR-USD",
-            "MATIC-USD",
-            "PAXG-USD",
-            "SHIB-USD",
-            "SOL-USD",
-            "SUSHI-USD",
-            "USDT-USD",
-            "TRX-USD",
-            "UNI-USD",
-            "WBTC-USD",
-            "YFI-USD",
-        ]
+    def snapshot(self, path: str):
+        # writes balance, orders, held lots, the current period and which symbols are registered.
+        # bars, symbol objects and the time manager are not included - restore() is handed those
+        self._update_order_status()
+
+        state = {
+            "period": self.period,
+            "symbols": list(self._symbols),
+            "attributes": {
+                name: value for name, value in self.__dict__.items() if name not in SNAPSHOT_EXCLUDED
+            },
+        }
 
-        return crypto_symbols
+        # write then rename, so being killed mid-write never leaves a truncated checkpoint
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<H", SNAPSHOT_VERSION))
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def restore(
+        cls, path: str, time_manager, symbol_objects, intrabar_source=None, asset_registry=None
+    ):
+        # rebuilds a BackTestAPI from snapshot(). symbol_objects must cover every symbol that was
+        # registered when the snapshot was taken, and time_manager.now gets set back to the
+        # snapshot's period
+        with open(path, "rb") as f:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a BackTestAPI snapshot")
+
+            version = struct.unpack("<H", f.read(2))[0]
+            if version > SNAPSHOT_VERSION:
+                raise ValueError(
+                    f"{path} is snapshot version {version}, but only up to "
+                    f"{SNAPSHOT_VERSION} is supported"
+                )
+
+            state = pickle.load(f)
+
+        api = cls.__new__(cls)
+        api.__dict__.update(cls._upgrade_snapshot(version, state["attributes"]))
+
+        api._time_manager = time_manager
+        api._symbols = {}
+        api._bar_cache = {}
+        api._rows = {}
+        api._intrabar_source = intrabar_source
+        api._intrabar_cache = OrderedDict()
+        api._stats = None
+        api._asset_registry = asset_registry or get_registry()
+        api._align_price = {}
+
+        for symbol_obj in symbol_objects:
+            api._put_symbol(symbol_obj)
+
+        missing = set(state["symbols"]) - set(api._symbols)
+        if missing:
+            raise ValueError(f"Snapshot needs symbols that weren't supplied: {sorted(missing)}")
+
+        time_manager.now = state["period"]
+        return api
+
+    @staticmethod
+    def _upgrade_snapshot(version: int, attributes: dict) -> dict:
+        # brings the attributes of an older snapshot version up to the current shape
+        if version < 2:
+            # version 1 was written by every build up to the multi currency cash ledger, so any
+            # attribute added along the way might be missing
+            upgraded = {
+                "_equity": EquityRecorder(),
+                "_marks": {},
+                "_period_ns": None,
+                "_archive": None,
+                "_closed_order_window": CLOSED_ORDER_WINDOW,
+                "_align_to_registry": False,
+                "_fill_model": None,
+                "_stop_keys": {},
+                "_stop_buys": {},
+                "_stop_sells": {},
+                "_groups": {},
+                "_order_group": {},
+                "_participation_rate": None,
+                "_capacity_ids": {},
+                "_capacity": np.zeros(0),
+                "_capacity_time": None,
+                "_multi_currency": False,
+                "_fx": None,
+                "_fx_matrix": None,
+                "_fx_rates": np.ones(1),
+                "_quote_currencies": {},
+                "_keep_closed_lots": False,
+            }
+            upgraded.update(attributes)
+
+            # one float balance in default_currency rather than the cash ledger
+            upgraded["_currency_ids"] = {upgraded["default_currency"]: 0}
+            upgraded["_cash"] = np.array([upgraded.pop("_balance")], dtype="float64")
+
+            # lots that were fully sold were always dropped
+            for ledger in upgraded["_assets_held"].values():
+                if not hasattr(ledger, "closed_lots"):
+                    ledger.closed_lots = None
+            attributes = upgraded
+
+        return attributes
+
+    def set_instrumentation(self, enabled: bool):
+        # turning it on starts from zero, turning it off throws away what was collected
+        self._stats = SettlementStats() if enabled else None
+
+    def stats(self, per_tick: bool = False) -> dict:
+        # phase timings and order counts collected since instrumentation was turned on.
+        # per_tick adds a DataFrame of evaluated/filled/cancelled orders for every settled period
+        if not self._stats:
+            return {}
+
+        summary = self._stats.summary()
+        if per_tick:
+            summary["per_tick"] = self._stats.per_tick()
+        return summary
+
+    def wake_at(self, period):
+        # stops fast_forward at period even if no order would fill there
+        heapq.heappush(self._wake_periods, (Timestamp(period).value, period))
+
+    def next_fill_period(self):
+        # the first bar after now where an open order could fill, or the first wake_at period if
+        # that comes sooner. None if there's nothing to wait for
+        now = Timestamp(self.period).value
+        while self._wake_periods and self._wake_periods[0][0] <= now:
+            heapq.heappop(self._wake_periods)
+
+        best = self._wake_periods[0] if self._wake_periods else None
+
+        # only the best priced order on each side of a ladder can be the first to trigger
+        # likewise for pending stops, where triggering is what we're waiting on
+        candidates = []
+        for order_id in self._market_orders:
+            candidates.append((self._orders[order_id].symbol, None, None, None, False))
+        for symbol, ladder in self._limit_buys.items():
+            if ladder:
+                candidates.append((symbol, "below", self.buy_metric, ladder.highest_price(), False))
+        for symbol, ladder in self._limit_sells.items():
+            if ladder:
+                candidates.append((symbol, "above", self.sell_metric, ladder.lowest_price(), False))
+        for symbol, ladder in self._stop_buys.items():
+            if ladder:
+                candidates.append((symbol, "above", STOP_BUY_TRIGGER, ladder.lowest_price(), True))
+        for symbol, ladder in self._stop_sells.items():
+            if ladder:
+                candidates.append(
+                    (symbol, "below", STOP_SELL_TRIGGER, ladder.highest_price(), True)
+                )
+
+        for symbol, direction, metric, price, inclusive in candidates:
+            bars = self._bar_cache[symbol]
+            row = bars.row_at_or_before(self.period)
+            row = 0 if row is None else row + 1
+
+            # market orders still waiting on a bar fill at the next one
+            if direction == "below":
+                row = int(bars.first_below(metric, [row], [price], inclusive=inclusive)[0])
+            elif direction == "above":
+                row = int(bars.first_above(metric, [row], [price], inclusive=inclusive)[0])
+
+            if row < len(bars) and (best is None or bars.timestamps[row] < best[0]):
+                best = (int(bars.timestamps[row]), bars.timestamp(row))
+
+        if best is None:
+            return None
+        return best[1]
+
+    def fast_forward(self, until=None):
+        # jumps the clock straight to next_fill_period (but no further than until) and settles
+        # there, instead of ticking through bars where nothing can happen. needs a time manager
+        # whose 'now' can be set. returns the new period, or None if the clock didn't move
+        target = self.next_fill_period()
+        if until is not None and (target is None or Timestamp(until) < Timestamp(target)):
+            target = until
+        if target is None:
+            return None
+
+        self._time_manager.now = target
+        self._update_order_status()
+        return target
+
+    def _get_crypto_symbols(self):
+        return self._asset_registry.crypto_symbols()
 
     # not implemented
     def _structure_asset_dict_by_id(self, asset_dict):
         raise NotImplementedError("Back Trade API does not order assets with a int key")
 
     def get_account(self) -> Account:
-        account = Account({"USD": self._balance})
+        account = Account(
+            {
+                currency: self._cash.item(currency_id)
+                for currency, currency_id in self._currency_ids.items()
+            }
+        )
         return account
 
+    def convert_currency(self, from_currency: str, to_currency: str, amount: float) -> float:
+        # exchanges amount of from_currency for to_currency at this tick's FX rates, and returns
+        # how much to_currency that came to
+        self._update_order_status()
+
+        for currency in (from_currency, to_currency):
+            if currency not in self._currency_ids:
+                raise KeyError(f"{currency} is not in the cash ledger {list(self._currency_ids)}")
+        from_id = self._currency_ids[from_currency]
+        to_id = self._currency_ids[to_currency]
+
+        if not amount or amount < 0:
+            raise ValueError(f"Can't convert {amount} {from_currency}")
+        if amount > self._cash.item(from_id):
+            raise ValueError(
+                f"Can't convert {amount} {from_currency}, only hold {self._cash.item(from_id)}"
+            )
+
+        converted = amount * self._fx_rates.item(from_id) / self._fx_rates.item(to_id)
+        self._cash[from_id] = round(self._cash.item(from_id) - amount, 15)
+        self._cash[to_id] = round(self._cash.item(to_id) + converted, 15)
+
+        log.info(f"Converted {amount} {from_currency} to {converted} {to_currency}")
+        self._record_equity()
+        return converted
+
     def get_position(self, symbol):
-        for position in self.list_positions():
-            if position.symbol == symbol:
-                return position
+        self._update_order_status()
+
+        if symbol in self._assets_held:
+            return Position(symbol=symbol, quantity=self._assets_held[symbol].quantity)
         return Position(symbol=symbol, quantity=0)
 
     def list_positions(self):
@@ -220,15 +689,45 @@ class BackTestAPI(ITradeAPI):
         self._update_order_status()
         positions = []
 
-        for symbol in self._assets_held:
-            quantity = 0
-            for order in self._assets_held[symbol]:
-                quantity += order["units"]
-
-            positions.append(Position(symbol=symbol, quantity=quantity))
+        for symbol, ledger in self._assets_held.items():
+            positions.append(Position(symbol=symbol, quantity=ledger.quantity))
 
         return positions
 
+    def get_realized_pnl(self, symbol: str = None) -> float:
+        if symbol:
+            if symbol not in self._assets_held:
+                return 0
+            return self._assets_held[symbol].realized_pnl
+
+        return sum(ledger.realized_pnl for ledger in self._assets_held.values())
+
+    def get_lot_pnl(self, symbol: str = None) -> DataFrame:
+        # one row per lot bought, oldest first within each symbol - its buy price, the units of it
+        # still held, the pnl realized on the units sold so far and whether it's been sold out.
+        # sold out lots are only listed if the back test was created with keep_closed_lots
+        self._update_order_status()
+
+        symbols = [symbol] if symbol else list(self._assets_held)
+        rows = []
+        for this_symbol in symbols:
+            ledger = self._assets_held.get(this_symbol)
+            if ledger is None:
+                continue
+            for closed, lots in ((True, ledger.closed_lots or ()), (False, ledger.lots)):
+                for lot in lots:
+                    rows.append(
+                        {
+                            "symbol": this_symbol,
+                            "unit_price": lot.unit_price,
+                            "units": lot.units,
+                            "realized_pnl": lot.realized_pnl,
+                            "closed": closed,
+                        }
+                    )
+
+        return DataFrame(rows, columns=["symbol", "unit_price", "units", "realized_pnl", "closed"])
+
     def get_last_close(self, symbol: str):
         raise NotImplementedError
 
@@ -241,51 +740,18 @@ class BackTestAPI(ITradeAPI):
         units: float,
         unit_price: float,
     ):
-        order_id = "buy-" + BackTestAPI.generate_id()
-        response = {
-            "order_type": LIMIT_BUY,
-            "orderUuid": order_id,
-            "secondary_asset": self.default_currency,
-            "primary_asset": symbol,
-            "symbol": symbol,
-            "quantity": units,
-            "quantity_asset": self.default_currency,
-            "limit_price": unit_price,
-            "status": 1,
-            "fees": 0,
-            "feeAmount": 0,
-            "created_time": self.period,
-            "updated_time": self.period,
-        }
-
-        self._save_order(response=response)
+        order = self._place_order(LIMIT_BUY, symbol, units, unit_price)
 
         # get the order status so it can be returned
-        order_result = self.get_order(order_id=order_id)
+        order_result = self.get_order(order_id=order.order_id)
 
         return order_result
 
     def buy_order_market(self, symbol: str, units: float):
-        order_id = "buy-" + BackTestAPI.generate_id()
-        response = {
-            "order_type": MARKET_BUY,
-            "orderUuid": order_id,
-            "secondary_asset": self.default_currency,
-            "primary_asset": symbol,
-            "symbol": symbol,
-            "quantity": units,
-            "quantity_asset": self.default_currency,
-            "status": 1,
-            "fees": 0,
-            "feeAmount": 0,
-            "created_time": self.period,
-            "updated_time": self.period,
-        }
-
-        self._save_order(response=response)
+        order = self._place_order(MARKET_BUY, symbol, units)
 
         # get the order status so it can be returned
-        order_result = self.get_order(order_id=order_id)
+        order_result = self.get_order(order_id=order.order_id)
 
         return order_result
 
@@ -295,53 +761,262 @@ class BackTestAPI(ITradeAPI):
         units: float,
         unit_price: float,
     ):
-        order_id = "sell-" + BackTestAPI.generate_id()
-        response = {
-            "order_type": LIMIT_SELL,
-            "orderUuid": order_id,
-            "secondary_asset": symbol,
-            "primary_asset": self.default_currency,
-            "symbol": symbol,
-            "quantity": units,
-            "quantity_asset": self.default_currency,
-            "limit_price": unit_price,
-            "status": 1,
-            "fees": 0,
-            "feeAmount": 0,
-            "created_time": self.period,
-            "updated_time": self.period,
-        }
+        order = self._place_order(LIMIT_SELL, symbol, units, unit_price)
 
-        self._save_order(response=response)
-
-        order_result = self.get_order(order_id=order_id)
+        order_result = self.get_order(order_id=order.order_id)
 
         return order_result
 
     def sell_order_market(self, symbol: str, units: float):
+        order = self._place_order(MARKET_SELL, symbol, units)
 
-        order_id = "sell-" + BackTestAPI.generate_id()
-        response = {
-            "order_type": MARKET_SELL,
-            "orderUuid": order_id,
-            "secondary_asset": symbol,
-            "primary_asset": self.default_currency,
-            "symbol": symbol,
-            "quantity": units,
-            "quantity_asset": self.default_currency,
-            "created_time": self.period,
-            "updated_time": self.period,
-            "status": 1,
-            "fees": 0,
-            "feeAmount": 0,
-        }
+        order_result = self.get_order(order_id=order.order_id)
 
-        self._save_order(response=response)
+        return order_result
 
-        order_result = self.get_order(order_id=order_id)
+    def buy_order_stop_limit(self, symbol: str, units: float, stop_price: float, unit_price: float):
+        # pending until a bar's High reaches stop_price, then a limit buy at unit_price
+        order = self._place_order(STOP_LIMIT_BUY, symbol, units, unit_price, stop_price)
+
+        order_result = self.get_order(order_id=order.order_id)
 
         return order_result
 
+    def sell_order_stop_limit(
+        self, symbol: str, units: float, stop_price: float, unit_price: float
+    ):
+        # pending until a bar's Low reaches stop_price, then a limit sell at unit_price
+        order = self._place_order(STOP_LIMIT_SELL, symbol, units, unit_price, stop_price)
+
+        order_result = self.get_order(order_id=order.order_id)
+
+        return order_result
+
+    def _place_order(
+        self,
+        order_type: int,
+        symbol: str,
+        units: float,
+        unit_price: float = None,
+        stop_price: float = None,
+        hold: bool = False,
+    ):
+        prefix = "buy-" if order_type in BUY_ORDER_TYPES else "sell-"
+        order = OrderResult.place(
+            order_type=order_type,
+            order_id=self._new_order_id(prefix),
+            symbol=symbol,
+            quantity=units,
+            limit_price=unit_price,
+            currency=self._quote_currencies.get(symbol, self.default_currency),
+            period=self.period,
+            status=5 if stop_price is not None else 1,
+            stop_price=stop_price,
+        )
+
+        self._save_order(order, hold=hold)
+        return order
+
+    def submit_orders(self, orders: list) -> list:
+        # places a batch of orders and settles them in one go rather than once per order. each
+        # order is a dict of symbol, order_type (constant or name, eg. "LIMIT_BUY"), units,
+        # unit_price (limit and stop limit orders) and stop_price (stop limit orders). the whole
+        # batch is checked before anything is placed, so a bad order raises without leaving the
+        # rest half submitted.
+        #
+        # sells are placed ahead of buys so that cash they free up is there for the buys, and
+        # otherwise orders keep the order they were given in. results come back in that same
+        # order too
+        batch = self._validate_batch(orders)
+
+        placed = [None] * len(batch)
+        sells_first = sorted(
+            range(len(batch)), key=lambda position: batch[position][0] in BUY_ORDER_TYPES
+        )
+        for position in sells_first:
+            placed[position] = self._place_order(*batch[position]).order_id
+
+        self._update_order_status()
+        return [self._lookup_order(order_id) for order_id in placed]
+
+    def _validate_batch(self, orders: list) -> list:
+        # (order_type, symbol, units, unit_price, stop_price) for each order dict, raising if
+        # any of them is no good
+        batch = []
+        for order in orders:
+            order_type = ORDER_MAP.get(order["order_type"], order["order_type"])
+            symbol = order["symbol"]
+            units = order["units"]
+            unit_price = order.get("unit_price")
+            stop_price = order.get("stop_price")
+
+            if order_type not in BUY_ORDER_TYPES and order_type not in SELL_ORDER_TYPES:
+                raise NotImplementedError(f"Unsupported order type {order['order_type']}")
+            if symbol not in self._symbols:
+                raise KeyError(f"{symbol} is not registered in {self}")
+            if not units or units < 0:
+                raise ZeroUnitsOrderedError(f"{symbol}: Can't order {units} units")
+            if order_type in PRICED_ORDER_TYPES and unit_price is None:
+                raise ValueError(f"{symbol}: Limit orders need a unit_price")
+            if order_type in (STOP_LIMIT_BUY, STOP_LIMIT_SELL) and stop_price is None:
+                raise ValueError(f"{symbol}: Stop limit orders need a stop_price")
+            if order_type not in (STOP_LIMIT_BUY, STOP_LIMIT_SELL):
+                stop_price = None
+
+            batch.append((order_type, symbol, units, unit_price, stop_price))
+
+        return batch
+
+    def place_oco(self, orders: list) -> list:
+        # one-cancels-other - places orders (dicts as per submit_orders) as a group where the
+        # first to fill, or be cancelled, cancels the rest in the same settlement pass. a partial
+        # fill shrinks the rest by what filled instead
+        if len(orders) < 2:
+            raise ValueError("An OCO group needs at least two orders")
+
+        placed = [self._place_order(*order) for order in self._validate_batch(orders)]
+        self._add_group([order.order_id for order in placed])
+
+        self._update_order_status()
+        return [self._lookup_order(order.order_id) for order in placed]
+
+    def place_bracket(
+        self,
+        symbol: str,
+        units: float,
+        take_profit: float,
+        stop_loss: float,
+        stop_loss_limit: float = None,
+        entry_price: float = None,
+    ) -> list:
+        # a buy (market, or limit at entry_price) that as it fills is wrapped in a limit sell at
+        # take_profit and a stop limit sell at stop_loss (with a limit of stop_loss_limit, or the
+        # stop price itself), which cancel each other. the exits cover whatever the entry has
+        # filled, so cancelling a partly filled entry leaves them in place for that much.
+        # returns [entry, take profit, stop loss]
+        if stop_loss_limit is None:
+            stop_loss_limit = stop_loss
+
+        if entry_price is None:
+            entry = self._place_order(MARKET_BUY, symbol, units, hold=True)
+        else:
+            entry = self._place_order(LIMIT_BUY, symbol, units, entry_price, hold=True)
+        take_profit_order = self._place_order(LIMIT_SELL, symbol, units, take_profit, hold=True)
+        stop_loss_order = self._place_order(
+            STOP_LIMIT_SELL, symbol, units, stop_loss_limit, stop_loss, hold=True
+        )
+
+        # exits wait on the entry as pending
+        for exit_order in (take_profit_order, stop_loss_order):
+            self._set_status(exit_order, 5)
+
+        self._add_group(
+            [entry.order_id, take_profit_order.order_id, stop_loss_order.order_id],
+            entry=entry.order_id,
+        )
+        self._release_order(entry)
+
+        self._update_order_status()
+        return [
+            self._lookup_order(order.order_id)
+            for order in (entry, take_profit_order, stop_loss_order)
+        ]
+
+    def _add_group(self, order_ids: list, entry: str = None):
+        group = OrderGroup(order_ids[0], order_ids, entry=entry)
+        self._groups[group.group_id] = group
+        for order_id in order_ids:
+            self._order_group[order_id] = group.group_id
+
+    def _group_fill(self, order, quantity: float):
+        # called for every fill of a grouped order, whether it completes the order or not
+        group = self._groups[self._order_group[order.order_id]]
+
+        if group.entry == order.order_id:
+            # the exits cover whatever the entry has filled so far
+            for order_id in group.order_ids:
+                if order_id == order.order_id:
+                    continue
+                exit_order = self._orders[order_id]
+                if group.released:
+                    self._resize_order(exit_order, exit_order.ordered_unit_quantity + quantity)
+                    continue
+
+                self._resize_order(exit_order, quantity)
+                if exit_order.order_type != STOP_LIMIT_SELL:
+                    self._set_status(exit_order, 1)
+                exit_order.update_time = self.period
+                self._release_order(exit_order)
+
+            if not group.released:
+                group.released = True
+                log.debug(f"{group.group_id}: Entry filling, exits are live")
+            if order.status == 4:
+                self._close_group(order)
+            return
+
+        # once an exit starts filling, whatever's left of the entry isn't wanted
+        if group.entry is not None:
+            self._cancel(group.entry, status=8)
+
+        if order.status == 4:
+            self._close_group(order)
+            return
+
+        # the rest of the group only has to cover what's still open
+        for order_id in list(group.order_ids):
+            if order_id == order.order_id or order_id not in self._orders:
+                continue
+            sibling = self._orders[order_id]
+            remaining = sibling.ordered_unit_quantity - quantity
+            if remaining <= (sibling.filled_unit_quantity or 0) + DUST_UNITS:
+                self._cancel(order_id, status=8)
+            else:
+                self._resize_order(sibling, remaining)
+
+    def _resize_order(self, order, quantity: float):
+        order.ordered_unit_quantity = quantity
+        if order.ordered_unit_price is not None:
+            order.ordered_total_value = quantity * order.ordered_unit_price
+
+    def _close_group(self, order):
+        # called as soon as a grouped order fills or is cancelled
+        group_id = self._order_group.pop(order.order_id)
+        group = self._groups.get(group_id)
+        if group is None:
+            # already being closed, ie. this is a sibling getting cancelled
+            return
+
+        if group.entry == order.order_id and order.filled_unit_quantity:
+            # the entry's done filling, whether it completed or not, and the exits carry on as an
+            # OCO pair covering what it filled
+            group.entry = None
+            group.order_ids.remove(order.order_id)
+            log.debug(f"{group_id}: Entry closed, exits {group.order_ids} carry on")
+            return
+
+        del self._groups[group_id]
+        for order_id in group.order_ids:
+            if order_id != order.order_id and order_id in self._orders:
+                self._cancel(order_id, status=8)
+        log.debug(f"{group_id}: Closed by {order.order_id} ({order.status_text})")
+
+    def _set_status(self, order, status: int):
+        order.status = status
+        order.status_text = ORDER_STATUS_TEXT[status]
+        order.status_summary = ORDER_STATUS_ID_TO_SUMMARY[status]
+
+    def cancel_orders(self, order_ids: list) -> list:
+        # cancels a batch of orders and settles once afterwards. like cancel_order, an order that
+        # isn't open gets False rather than raising
+        cancelled = [self._cancel(order_id) for order_id in order_ids]
+
+        self._update_order_status()
+        return [
+            self._lookup_order(order_id) if was_cancelled else False
+            for order_id, was_cancelled in zip(order_ids, cancelled)
+        ]
+
     def close_position(self, symbol: str):
         held_position = self.get_position(symbol)
         return self.sell_order_market(
@@ -356,74 +1031,197 @@ class BackTestAPI(ITradeAPI):
         if after:
             raise NotImplementedError(f"Parameter 'after' is not implemented in back_test_wrapper")
 
-        return_orders = []
-        for ordered_symbol in self._orders:
-            return_orders.append(self._orders[ordered_symbol])
-
-        for order in self._inactive_orders:
-            return_orders.append(order)
-
+        # archived orders come first, and are read back in as new objects each time
         if symbol or symbols:
             if symbol:
                 symbols = [symbol]
 
-            new_return_orders = []
-            for order in return_orders:
-                if order.symbol in symbols:
-                    new_return_orders.append(order)
+            return_orders = []
+            if self._archive is not None:
+                return_orders.extend(self._archive.orders(self._archived_order, symbols=symbols))
+            for this_symbol in symbols:
+                return_orders.extend(self._orders_by_symbol.get(this_symbol, {}).values())
 
-            return_orders = new_return_orders
+            return return_orders
 
-        return return_orders
+        if self._archive is not None:
+            return self._archive.orders(self._archived_order) + list(self._all_orders.values())
+        return list(self._all_orders.values())
 
     def get_order(self, order_id: str):
         # refresh order status first
         self._update_order_status()
+        return self._lookup_order(order_id)
+
+    def _lookup_order(self, order_id: str):
+        order = self._all_orders.get(order_id)
+        if order is None and self._archive is not None:
+            order = self._archive.get(order_id, self._archived_order)
+
+        return order if order is not None else False
+
+    def _archived_order(self, record: dict):
+        order = OrderResult.place(
+            order_type=record["order_type"],
+            order_id=record["order_id"],
+            symbol=record["symbol"],
+            quantity=record["ordered_unit_quantity"],
+            limit_price=record["ordered_unit_price"],
+            currency=record["currency"],
+            period=record["create_time"],
+            status=record["status"],
+            fees=record["fees"],
+            update_time=record["update_time"],
+            stop_price=record.get("stop_price"),
+        )
+        order.filled_unit_quantity = record["filled_unit_quantity"]
+        order.filled_unit_price = record["filled_unit_price"]
+        order.filled_total_value = record["filled_total_value"]
+        return order
 
-        all_orders = self.list_orders()
-        for order in all_orders:
-            if order.order_id == order_id:
-                return order
+    def _retire_order(self, order):
+        self._inactive_orders.append(order)
 
-        return False
+        if (
+            self._archive is not None
+            and len(self._inactive_orders) >= 2 * self._closed_order_window
+        ):
+            self._spill_closed_orders()
+
+    def _spill_closed_orders(self):
+        # writes out the oldest closed orders and forgets them, leaving closed_order_window behind
+        spilled = self._inactive_orders[: -self._closed_order_window]
+        self._archive.append(spilled)
 
-    def _save_order(self, response):
-        # if self._orders.get(response["symbol"]):
+        for order in spilled:
+            del self._all_orders[order.order_id]
+            del self._orders_by_symbol[order.symbol][order.order_id]
+
+        self._inactive_orders = self._inactive_orders[-self._closed_order_window :]
+
+    def _save_order(self, order, hold: bool = False):
+        # if self._orders.get(order.symbol):
         #    raise ValueError(
-        #        f'{response["symbol"]}: Already have an order open for this symbol'
+        #        f'{order.symbol}: Already have an order open for this symbol'
         #    )
-        self._orders[response["orderUuid"]] = OrderResult(response=response)
+        self._orders[order.order_id] = order
+        self._all_orders[order.order_id] = order
+
+        if order.symbol not in self._orders_by_symbol:
+            self._orders_by_symbol[order.symbol] = {}
+        self._orders_by_symbol[order.symbol][order.order_id] = order
+
+        # held orders (bracket exits waiting on their entry) stay out of the book until released
+        if not hold:
+            self._release_order(order)
+
+    def _release_order(self, order):
+        self._unsettled_orders[order.order_id] = order
+        self._add_to_book(order)
+
+    def _add_to_book(self, order):
+        self._order_sequence += 1
+        sequence = self._order_sequence
+
+        if order.status == 5:
+            ladders = self._stop_buys if order.order_type == STOP_LIMIT_BUY else self._stop_sells
+            if order.symbol not in ladders:
+                ladders[order.symbol] = PriceLadder()
+            ladders[order.symbol].add(order.stop_price, sequence, order.order_id)
+            self._stop_keys[order.order_id] = (sequence, order.stop_price)
+            return
+
+        self._add_to_ladder(order, sequence)
+
+    def _add_to_ladder(self, order, sequence: int):
+        if order.order_type == LIMIT_BUY or order.order_type == STOP_LIMIT_BUY:
+            ladders = self._limit_buys
+        elif order.order_type == LIMIT_SELL or order.order_type == STOP_LIMIT_SELL:
+            ladders = self._limit_sells
+        else:
+            self._market_orders[order.order_id] = sequence
+            self._book_keys[order.order_id] = (sequence, None)
+            return
+
+        if order.symbol not in ladders:
+            ladders[order.symbol] = PriceLadder()
+        ladders[order.symbol].add(order.ordered_unit_price, sequence, order.order_id)
+        self._book_keys[order.order_id] = (sequence, order.ordered_unit_price)
+
+    def _remove_from_book(self, order):
+        if order.order_id in self._stop_keys:
+            sequence, stop_price = self._stop_keys.pop(order.order_id)
+            ladders = self._stop_buys if order.order_type == STOP_LIMIT_BUY else self._stop_sells
+            ladders[order.symbol].remove(stop_price, sequence, order.order_id)
+            return
+
+        if order.order_id not in self._book_keys:
+            return
+
+        sequence, price = self._book_keys.pop(order.order_id)
+        if order.order_type == LIMIT_BUY or order.order_type == STOP_LIMIT_BUY:
+            self._limit_buys[order.symbol].remove(price, sequence, order.order_id)
+        elif order.order_type == LIMIT_SELL or order.order_type == STOP_LIMIT_SELL:
+            self._limit_sells[order.symbol].remove(price, sequence, order.order_id)
+        else:
+            del self._market_orders[order.order_id]
+
+    def _stop_triggered(self, order, bars, row) -> bool:
+        if order.order_type == STOP_LIMIT_BUY:
+            return bars.value(STOP_BUY_TRIGGER, row) >= order.stop_price
+        return bars.value(STOP_SELL_TRIGGER, row) <= order.stop_price
+
+    def _trigger_stop(self, order, trigger_time):
+        # pending stop -> open limit order, keeping its place in the queue
+        sequence, _ = self._stop_keys[order.order_id]
+        self._remove_from_book(order)
+
+        order.status = 1
+        order.status_text = ORDER_STATUS_TEXT[1]
+        order.status_summary = ORDER_STATUS_ID_TO_SUMMARY[1]
+        order.update_time = trigger_time
+        self._add_to_ladder(order, sequence)
+
+        log.debug(f"{order.order_id}: Stop triggered at {order.stop_price}, now a limit order")
 
     def cancel_order(self, order_id):
+        if self._cancel(order_id):
+            return self.get_order(order_id=order_id)
+        return False
+
+    def _cancel(self, order_id, status: int = 6) -> bool:
         order_to_delete = None
-        for _order_id in self._orders:
-            if self._orders[_order_id].order_id == order_id:
-                if (
-                    self._orders[_order_id].status in ORDER_STATUS_SUMMARY_TO_ID["cancelled"]
-                    or self._orders[_order_id].status in ORDER_STATUS_SUMMARY_TO_ID["filled"]
-                ):
-                    log.debug(
-                        f"{order_to_delete}: Unable to delete order_id {order_id} from "
-                        f"self._orders list since its already in {self._orders[_order_id].status_summary} state"
-                    )
-                    return False
-                order_to_delete = _order_id
+        if order_id in self._orders:
+            if (
+                self._orders[order_id].status in ORDER_STATUS_SUMMARY_TO_ID["cancelled"]
+                or self._orders[order_id].status in ORDER_STATUS_SUMMARY_TO_ID["filled"]
+            ):
+                log.debug(
+                    f"{order_to_delete}: Unable to delete order_id {order_id} from "
+                    f"self._orders list since its already in {self._orders[order_id].status_summary} state"
+                )
+                return False
+            order_to_delete = order_id
 
         if order_to_delete:
             # need to update the order to cancelled
-            self._orders[order_to_delete].status = 6
+            self._orders[order_to_delete].status = status
             self._orders[order_to_delete].closed = True
-            self._orders[order_to_delete].status_summary = ORDER_STATUS_ID_TO_SUMMARY[6]
-            self._orders[order_to_delete].status_text = ORDER_STATUS_TEXT[6]
+            self._orders[order_to_delete].status_summary = ORDER_STATUS_ID_TO_SUMMARY[status]
+            self._orders[order_to_delete].status_text = ORDER_STATUS_TEXT[status]
             self._orders[order_to_delete].success = False
             self._orders[order_to_delete].update_time = self.period
 
             # need to move the order to self._inactive_orders
-            self._inactive_orders.append(self._orders[order_to_delete])
-            del self._orders[order_to_delete]
+            self._remove_from_book(self._orders[order_to_delete])
+            order = self._orders.pop(order_to_delete)
+            self._retire_order(order)
 
             log.debug(f"{order_to_delete}: Moved from self._orders to self._inactive_orders")
-            return self.get_order(order_id=order_id)
+
+            if order_to_delete in self._order_group:
+                self._close_group(order)
+            return True
         else:
             log.warning(
                 f"Tried to remove order_id {order_id} from self._orders but did not "
@@ -431,33 +1229,379 @@ class BackTestAPI(ITradeAPI):
             )
             return False
 
+    def _bar_columns(self) -> tuple:
+        # columns settlement reads beyond the usual OHLCV
+        fill_columns = self._fill_model.columns if self._fill_model else ()
+        if self._participation_rate is not None and "Volume" not in fill_columns:
+            fill_columns = tuple(fill_columns) + ("Volume",)
+        return (self.buy_metric, self.sell_metric) + tuple(fill_columns)
+
     def _put_symbol(self, symbol):
+        if hasattr(symbol, "bar_cache"):
+            # already cached somewhere else, eg. attached from a BarStore
+            bar_cache = symbol.bar_cache
+        else:
+            bar_cache = BarCache.from_frame(symbol.ohlc.bars, extra_columns=self._bar_columns())
+
+        for column in self._bar_columns():
+            if column not in bar_cache.columns:
+                raise ValueError(f"{symbol.yf_symbol}: Bars have no {column} column")
+
         self._symbols[symbol.yf_symbol] = symbol
+        self._bar_cache[symbol.yf_symbol] = bar_cache
+
+        if self._multi_currency:
+            currency = quote_currency(symbol.yf_symbol, self.default_currency)
+            self._add_currency(currency)
+        else:
+            currency = self.default_currency
+        self._quote_currencies[symbol.yf_symbol] = currency
+
+        if symbol.yf_symbol not in self._capacity_ids:
+            self._capacity_ids[symbol.yf_symbol] = len(self._capacity_ids)
+            self._capacity = np.full(len(self._capacity_ids), np.nan)
+
+        if self._align_to_registry:
+            self._align_price[symbol.yf_symbol] = partial(
+                self._asset_registry.align_price, symbol.yf_symbol
+            )
+        else:
+            self._align_price[symbol.yf_symbol] = symbol.align_price
+
+    def _set_up_cash(self, balances: dict):
+        self._currency_ids = {}
+        self._cash = np.zeros(0)
+        self._add_currency(self.default_currency)
+        for currency, balance in balances.items():
+            self._add_currency(currency)
+            self._cash[self._currency_ids[currency]] = balance
+
+    def _add_currency(self, currency: str):
+        if currency in self._currency_ids:
+            return
+
+        self._currency_ids[currency] = len(self._currency_ids)
+        self._cash = np.append(self._cash, 0.0)
+        self._set_fx_matrix()
+
+    def _set_fx_matrix(self):
+        currencies = list(self._currency_ids)
+        if self._fx is None:
+            if len(currencies) > 1:
+                raise ValueError(
+                    f"Need fx_rates to value {currencies[1:]} in {self.default_currency}"
+                )
+            self._fx_matrix = None
+            self._fx_rates = np.ones(1)
+            return
+
+        self._fx_matrix = self._fx.matrix(currencies, self.default_currency)
+        self._fx_rates = np.full(len(currencies), np.nan)
+        if getattr(self, "_period_ns", None) is not None:
+            self._update_fx_rates()
+
+    def _update_fx_rates(self):
+        if self._fx_matrix is None:
+            return
+
+        row = self._fx.row(self._period_ns)
+        if row is None:
+            raise ValueError(f"No FX rates at or before {self.period}")
+        self._fx_rates = self._fx_matrix[row]
 
     def _put_bars(self, symbol, bars):
         raise RuntimeError
         self._bars[symbol] = bars
 
     def _get_held_units(self, symbol):
-        unit_count = 0
-        paid = 0
-
-        if not self._assets_held.get(symbol):
+        if symbol not in self._assets_held:
             return 0, 0
 
-        for order in self._assets_held[symbol]:
-            unit_count += order["units"]
-            paid += order["units"] * order["unit_price"]
-
-        return unit_count, paid
+        ledger = self._assets_held[symbol]
+        return ledger.quantity, ledger.cost
 
     def _update_order_status(self):
+        stats = self._stats
+        if stats:
+            stats.calls += 1
+
+        # anything that was open at the last sweep got checked against this same bar already, so
+        # unless the clock has moved only the orders placed since then can change state
+        if self._settled_period is not None and self._settled_period == self.period:
+            if not self._unsettled_orders:
+                return
+            if stats:
+                stats.start()
+            order_ids = self._unsettled_orders
+        else:
+            if stats:
+                stats.start()
+            self._rows = {}
+            self._period_ns = Timestamp(self.period).value
+            self._update_fx_rates()
+            if self._equity.tz is None and getattr(self.period, "tz", None) is not None:
+                self._equity.tz = str(self.period.tz)
+
+            order_ids = self._triggered_orders()
+            if stats:
+                stats.lap("matching")
+
+        full_sweep = order_ids is not self._unsettled_orders
+
+        # set before settling - cancel_order calls back in here via get_order
+        self._settled_period = self.period
+        self._unsettled_orders = {}
+
+        if full_sweep and self._intrabar_source:
+            order_ids = self._settle_intrabar(order_ids)
+            if stats:
+                stats.lap("intrabar")
+
+        self._settle_orders(order_ids)
+
+        # bracket exits that went live while settling get checked against this same bar, just as
+        # they would if they'd been placed by hand straight after the entry filled. ones released
+        # by an intrabar fill have already been through the rest of its sub bars instead
+        while self._unsettled_orders:
+            order_ids = self._unsettled_orders
+            self._unsettled_orders = {}
+            self._settle_orders(order_ids)
+
+        self._record_equity()
+        if stats:
+            stats.lap("equity")
+
+    def _record_equity(self):
+        position_value = 0.0
+        gross_exposure = 0.0
+        fx_rates = None if self._fx_matrix is None else self._fx_rates
+
+        for symbol, ledger in self._assets_held.items():
+            if not ledger.quantity:
+                continue
+
+            bars = self._bar_cache[symbol]
+            column = "Close" if "Close" in bars.columns else self.sell_metric
+            row = self._get_row(symbol)
+            if row is None and symbol not in self._marks:
+                row = bars.row_at_or_before(self.period)
+            if row is not None:
+                self._marks[symbol] = bars.columns[column][row]
+
+            value = ledger.quantity * self._marks[symbol]
+            if fx_rates is not None:
+                # in default_currency, whatever the symbol's quoted in
+                value *= fx_rates.item(self._currency_ids[self._quote_currencies[symbol]])
+            position_value += value
+            gross_exposure += abs(value)
+
+        if fx_rates is None:
+            cash = self._cash.item(0)
+        else:
+            cash = float(self._cash @ fx_rates)
+        self._equity.record(self._period_ns, cash, position_value, gross_exposure)
+
+    def equity_curve(self) -> DataFrame:
+        # one row per settled period: cash, position_value, gross_exposure and equity
+        return self._equity.to_frame()
+
+    def get_equity(self) -> dict:
+        # cash, position_value, gross_exposure and equity right now, all in default_currency -
+        # the same as the last row of equity_curve() once this period has settled
+        self._update_order_status()
+        return self._equity.latest()
+
+    def value_balances(self, balances: dict, period=None) -> float:
+        # what {currency: amount} (eg. a starting back_testing_balance) is worth in
+        # default_currency at the FX rates at or before period, or the current ones
+        if self._fx_matrix is None:
+            rates = self._fx_rates
+        else:
+            if period is None:
+                period = self.period
+            row = self._fx.row(Timestamp(period).value)
+            if row is None:
+                raise ValueError(f"No FX rates at or before {period}")
+            rates = self._fx_matrix[row]
+
+        value = 0.0
+        for currency, amount in balances.items():
+            if currency not in self._currency_ids:
+                raise KeyError(f"{currency} is not in the cash ledger {list(self._currency_ids)}")
+            value += amount * rates.item(self._currency_ids[currency])
+        return value
+
+    def _get_row(self, symbol):
+        if symbol not in self._rows:
+            if symbol not in self._symbols:
+                raise KeyError(f"{symbol} is not registered in {self}")
+            self._rows[symbol] = self._bar_cache[symbol].row(self.period)
+        return self._rows[symbol]
+
+    def _triggered_orders(self) -> list:
+        # every order that could fill on this bar, in the order they were placed - market orders
+        # still waiting on a bar, plus whichever end of each limit ladder the bar crosses
+        stats = self._stats
+        candidates = [(sequence, order_id) for order_id, sequence in self._market_orders.items()]
+
+        for symbol, ladder in self._limit_buys.items():
+            if stats:
+                stats.lap("matching")
+            row = self._get_row(symbol) if ladder else None
+            if stats:
+                stats.lap("bar_lookup")
+            if row is None:
+                continue
+
+            # limit buys fill once the buy metric drops below the limit price
+            metric = self._bar_cache[symbol].value(self.buy_metric, row)
+            if metric == metric:
+                candidates.extend(ladder.priced_above(metric))
+
+        for symbol, ladder in self._limit_sells.items():
+            if stats:
+                stats.lap("matching")
+            row = self._get_row(symbol) if ladder else None
+            if stats:
+                stats.lap("bar_lookup")
+            if row is None:
+                continue
+
+            # limit sells fill once the sell metric rises above the limit price
+            metric = self._bar_cache[symbol].value(self.sell_metric, row)
+            if metric == metric:
+                candidates.extend(ladder.priced_below(metric))
+
+        for symbol, ladder in self._stop_buys.items():
+            row = self._get_row(symbol) if ladder else None
+            if row is None:
+                continue
+
+            # stop buys trigger once the High reaches the stop price
+            metric = self._bar_cache[symbol].value(STOP_BUY_TRIGGER, row)
+            if metric == metric:
+                candidates.extend(ladder.priced_below(metric, inclusive=True))
+
+        for symbol, ladder in self._stop_sells.items():
+            row = self._get_row(symbol) if ladder else None
+            if row is None:
+                continue
+
+            # stop sells trigger once the Low falls to the stop price
+            metric = self._bar_cache[symbol].value(STOP_SELL_TRIGGER, row)
+            if metric == metric:
+                candidates.extend(ladder.priced_above(metric, inclusive=True))
+
+        candidates.sort()
+        return [order_id for _, order_id in candidates]
+
+    def _settle_intrabar(self, order_ids) -> list:
+        # settles symbols with more than one triggered order bar by finer bar, and hands back the
+        # orders that should just be settled against the coarse bar as usual. a bracket entry
+        # counts as more than one, since its exits could go live and fill within the same bar
+        order_ids = list(order_ids)
+        symbols = [self._orders[order_id].symbol for order_id in order_ids]
+
+        order_ids_by_symbol = {}
+        for order_id, symbol in zip(order_ids, symbols):
+            if symbol not in order_ids_by_symbol:
+                order_ids_by_symbol[symbol] = []
+            order_ids_by_symbol[symbol].append(order_id)
+
+        intrabar = {}
+        for symbol, symbol_order_ids in order_ids_by_symbol.items():
+            if len(symbol_order_ids) < 2 and not self._is_bracket_entry(symbol_order_ids[0]):
+                continue
+            sub_bars = self._get_intrabar(symbol)
+            if sub_bars is not None and len(sub_bars):
+                intrabar[symbol] = (sub_bars, symbol_order_ids)
+
+        for symbol, (sub_bars, symbol_order_ids) in intrabar.items():
+            for sub_row in range(len(sub_bars)):
+                remaining = [order_id for order_id in symbol_order_ids if order_id in self._orders]
+                if not remaining:
+                    break
+
+                self._settle_orders(
+                    remaining,
+                    bars=sub_bars,
+                    row=sub_row,
+                    fill_time=sub_bars.timestamp(sub_row),
+                )
+
+                # exits released by an entry filling on this sub bar carry on from the next one,
+                # rather than being settled against the whole coarse bar afterwards
+                for order_id in [
+                    order_id
+                    for order_id, order in self._unsettled_orders.items()
+                    if order.symbol == symbol
+                ]:
+                    del self._unsettled_orders[order_id]
+                    symbol_order_ids.append(order_id)
+
+        return [
+            order_id for order_id, symbol in zip(order_ids, symbols) if symbol not in intrabar
+        ]
+
+    def _is_bracket_entry(self, order_id) -> bool:
+        group_id = self._order_group.get(order_id)
+        return group_id is not None and self._groups[group_id].entry == order_id
+
+    def _get_intrabar(self, symbol):
+        row = self._get_row(symbol)
+        if row is None:
+            return None
+
+        key = (symbol, row)
+        if key not in self._intrabar_cache:
+            bars = self._bar_cache[symbol]
+            end = bars.timestamp(row + 1) if row + 1 < len(bars) else None
+            sub_bars = self._intrabar_source(symbol, bars.timestamp(row), end)
+
+            if sub_bars is None:
+                self._intrabar_cache[key] = None
+            else:
+                self._intrabar_cache[key] = BarCache.from_frame(
+                    sub_bars, extra_columns=self._bar_columns()
+                )
+
+            if len(self._intrabar_cache) > INTRABAR_CACHE_SIZE:
+                self._intrabar_cache.popitem(last=False)
+
+        return self._intrabar_cache[key]
+
+    def _settle_orders(self, order_ids, bars=None, row=None, fill_time=None):
+        # bars/row/fill_time override the current period's bar for every order, which is how
+        # intrabar settlement feeds finer bars through the same fill rules
+        if fill_time is None:
+            fill_time = self.period
+        stats = self._stats
+
+        # volume left to fill against is per bar, so it starts over whenever the bar does
+        participation_rate = self._participation_rate
+        if participation_rate is not None and fill_time != self._capacity_time:
+            self._capacity.fill(np.nan)
+            self._capacity_time = fill_time
+
         # loop through all the orders looking for whether they've been filled
         # assumes that this gets called with back_testing_date for every index in bars, since it only checks this index/back_testing_date
         filled_symbols = []
 
         # hacky way of avoiding deleting orders and raising RuntimeError for dict changed size during iteration
-        orders_copy = self._orders.copy()
+        orders_copy = {
+            _order_id: self._orders[_order_id] for _order_id in order_ids if _order_id in self._orders
+        }
+        if stats:
+            stats.lap("copying")
+
+        # order_id -> (unit price before alignment, fee rate), or None to fill at bar prices. with
+        # volume capped fills each order gets priced for its own slice further down instead
+        fills = None
+        if self._fill_model and participation_rate is None:
+            fills = self._model_fills(orders_copy, bars, row)
+            if stats:
+                stats.lap("matching")
+
         for _order_id in orders_copy:
             this_order = orders_copy[_order_id]
             this_symbol = this_order.symbol
@@ -466,7 +1610,6 @@ class BackTestAPI(ITradeAPI):
                 this_order.status in ORDER_STATUS_SUMMARY_TO_ID["cancelled"]
                 or this_order.status in ORDER_STATUS_SUMMARY_TO_ID["filled"]
             ):
-                self._inactive_orders.append(this_order)
                 filled_symbols.append(_order_id)
                 log.debug(
                     f"{_order_id}: Skipping this symbol in _inactive_orders since the "
@@ -477,257 +1620,490 @@ class BackTestAPI(ITradeAPI):
             if this_symbol not in self._symbols:
                 raise KeyError(f"{this_symbol} is not registered in {self}")
 
-            try:
-                # check_index = self._bars[_order_id].loc[self._period]
-                check_index = self._symbols[this_symbol].ohlc.bars.loc[self.period]
-            except KeyError as e:
+            if bars is None:
+                order_bars = self._bar_cache[this_symbol]
+                order_row = self._get_row(this_symbol)
+            else:
+                order_bars = bars
+                order_row = row
+
+            if stats:
+                stats.lap("bar_lookup")
+
+            if order_row is None:
                 log.debug(f"{_order_id}: No {this_symbol} data for {self.period}")
+                if stats:
+                    stats.lap("logging")
                 continue
 
+            # stop limits that trigger on this bar get checked as limit orders on it straight away
+            order_type = this_order.order_type
+            if order_type == STOP_LIMIT_BUY or order_type == STOP_LIMIT_SELL:
+                if this_order.status == 5:
+                    if not self._stop_triggered(this_order, order_bars, order_row):
+                        continue
+                    self._trigger_stop(this_order, fill_time)
+                order_type = LIMIT_BUY if order_type == STOP_LIMIT_BUY else LIMIT_SELL
+
+            # how much of the order this bar can fill, which is all of it unless fills are capped
+            # at a share of the bar's volume
+            if participation_rate is None:
+                quantity = this_order.ordered_unit_quantity
+                unfilled = quantity
+            else:
+                unfilled = this_order.ordered_unit_quantity - (this_order.filled_unit_quantity or 0)
+                quantity = self._fillable_quantity(this_order, order_bars, order_row)
+                if quantity <= 0:
+                    log.debug(f"{_order_id}: No {this_symbol} volume left to fill against")
+                    continue
+                if self._fill_model:
+                    fills = self._model_fills(
+                        {_order_id: this_order}, order_bars, order_row, quantity
+                    )
+                    if stats:
+                        stats.lap("matching")
+
+            # cash moves in the currency the order was placed in
+            currency_id = self._currency_ids[this_order._currency]
+
             # if we got here, the order is not yet actioned
-            if this_order.order_type == MARKET_BUY:
+            if order_type == MARKET_BUY:
                 # immediate fill - its just a question of how many units they bought
                 log.debug(f"{_order_id}: Starting fill for MARKET_BUY order for {this_symbol}")
-
-                unit_price = self._symbols[this_symbol].align_price(
-                    self._symbols[this_symbol].ohlc.bars[self.buy_metric].loc[self.period]
-                )
-
-                units_purchased = this_order.ordered_unit_quantity
+                if stats:
+                    stats.lap("logging")
+
+                if fills is None:
+                    unit_price = order_bars.value(self.buy_metric, order_row)
+                    fee_rate = 0
+                else:
+                    unit_price, fee_rate = fills[_order_id]
+                unit_price = self._align_price[this_symbol](unit_price)
+                if stats:
+                    stats.lap("matching")
+
+                units_purchased = quantity
                 order_value = unit_price * units_purchased
+                fees = fee_rate * order_value
 
                 # don't process this order if it would send balance to negative
-                if order_value > self._balance:
+                if order_value + fees > self._cash.item(currency_id):
+                    if stats:
+                        stats.lap("balance")
                     log.warning(
                         f"{_order_id}: Unable to fill {this_order.order_id} - order value "
-                        f"is {order_value} but balance is only {self._balance}"
+                        f"is {order_value} but balance is only {self._cash.item(currency_id)}"
                     )
-                    self.cancel_order(order_id=this_order.order_id)
+                    if stats:
+                        stats.lap("logging")
+                    self._cancel(this_order.order_id)
+                    if stats:
+                        stats.lap("bookkeeping")
                     continue
+                if stats:
+                    stats.lap("balance")
 
                 # mark this order as filled
-                this_order.status = 4
-                this_order.closed = True
-                this_order.status_text = ORDER_STATUS_TEXT[this_order.status]
-                this_order.status_summary = ORDER_STATUS_ID_TO_SUMMARY[this_order.status]
-                this_order.filled_unit_quantity = units_purchased
-                this_order.filled_unit_price = unit_price
-                this_order.filled_total_value = (
-                    this_order.filled_unit_quantity * this_order.filled_unit_price
-                )
+                filled = self._record_fill(this_order, units_purchased, unit_price, fees, fill_time)
 
-                # instantiate this symbol in the held array - it gets populated in a couple lines
-                if self._assets_held.get(this_symbol) == None:
-                    self._assets_held[this_symbol] = []
+                if stats:
+                    stats.lap("bookkeeping")
 
-                self._assets_held[this_symbol].append(
-                    {
-                        "units": this_order.filled_unit_quantity,
-                        "unit_price": this_order.filled_unit_price,
-                    }
+                self._do_buy(
+                    quantity_to_buy=units_purchased,
+                    symbol=this_symbol,
+                    unit_price=unit_price,
                 )
 
                 # update balance
-                self._balance = round(
-                    self._balance
-                    - (this_order.filled_unit_price * this_order.filled_unit_quantity),
-                    15,
+                self._cash[currency_id] = round(
+                    self._cash.item(currency_id) - (unit_price * units_purchased) - fees, 15
                 )
+                if stats:
+                    stats.lap("balance")
 
-                filled_symbols.append(_order_id)
+                if filled:
+                    filled_symbols.append(_order_id)
+                if _order_id in self._order_group:
+                    self._group_fill(this_order, quantity)
+                if stats:
+                    stats.lap("bookkeeping")
 
                 log.debug(
                     f"{_order_id}: market_buy filled, {this_order.filled_unit_quantity} "
-                    f"units at {this_order.filled_unit_price}, balance {self._balance}"
+                    f"units at {this_order.filled_unit_price}, "
+                    f"balance {self._cash.item(currency_id)} {this_order._currency}"
                 )
+                if stats:
+                    stats.lap("logging")
 
-            elif this_order.order_type == MARKET_SELL:
+            elif order_type == MARKET_SELL:
                 log.debug(f"{_order_id}: Starting fill for MARKET_SELL order {this_order.order_id}")
+                if stats:
+                    stats.lap("logging")
 
                 # how many of this symbol do we own? is it >= than the requested amount to sell?
+                # a volume capped sell has to be covered for the rest of the order, not just
+                # this bar's slice of it
                 held, paid = self._get_held_units(this_symbol)
 
-                if held < this_order.ordered_unit_quantity:
+                if held < quantity or held + DUST_UNITS < unfilled:
+                    if stats:
+                        stats.lap("balance")
                     log.warning(
                         f"{_order_id}: Failed to fill order {this_order.order_id} - trying to "
-                        f"sell {this_order.ordered_unit_quantity} units but only hold {held}"
+                        f"sell {unfilled} units but only hold {held}"
                     )
-                    self.cancel_order(order_id=this_order.order_id)
+                    if stats:
+                        stats.lap("logging")
+                    self._cancel(this_order.order_id)
+                    if stats:
+                        stats.lap("bookkeeping")
                     continue
                     # raise ValueError(
                     #    f"{symbol}: Hold {held} so can't sell {this_order.ordered_unit_quantity} units"
                     # )
-
-                unit_price = self._symbols[this_symbol].align_price(
-                    self._symbols[this_symbol].ohlc.bars[self.sell_metric].loc[self.period]
-                )
+                if stats:
+                    stats.lap("balance")
+
+                if fills is None:
+                    unit_price = order_bars.value(self.sell_metric, order_row)
+                    fee_rate = 0
+                else:
+                    unit_price, fee_rate = fills[_order_id]
+                unit_price = self._align_price[this_symbol](unit_price)
+                if stats:
+                    stats.lap("matching")
 
                 # mark this order as filled
-                this_order.status = 4
-                this_order.closed = True
-                this_order.status_text = ORDER_STATUS_TEXT[this_order.status]
-                this_order.status_summary = ORDER_STATUS_ID_TO_SUMMARY[this_order.status]
-                this_order.filled_unit_quantity = this_order.ordered_unit_quantity
-                this_order.filled_unit_price = unit_price
-                this_order.filled_total_value = (
-                    this_order.filled_unit_quantity * this_order.filled_unit_price
-                )
+                fill_value = quantity * unit_price
+                fees = fee_rate * fill_value
+                filled = self._record_fill(this_order, quantity, unit_price, fees, fill_time)
 
-                self._do_sell(quantity_to_sell=this_order.filled_unit_quantity, symbol=_order_id)
+                if stats:
+                    stats.lap("bookkeeping")
+
+                self._do_sell(
+                    quantity_to_sell=quantity,
+                    symbol=this_symbol,
+                    unit_price=unit_price,
+                )
 
                 # update balance
-                self._balance = round(self._balance + round(this_order.filled_total_value, 2), 15)
+                self._cash[currency_id] = round(
+                    self._cash.item(currency_id) + round(fill_value, 2) - fees, 15
+                )
+                if stats:
+                    stats.lap("balance")
 
-                filled_symbols.append(_order_id)
+                if filled:
+                    filled_symbols.append(_order_id)
+                if _order_id in self._order_group:
+                    self._group_fill(this_order, quantity)
+                if stats:
+                    stats.lap("bookkeeping")
 
                 log.info(
                     f"{_order_id}: market_sell filled, {this_order.filled_unit_quantity} "
-                    f"units at {this_order.filled_unit_price}, balance {self._balance}"
+                    f"units at {this_order.filled_unit_price}, "
+                    f"balance {self._cash.item(currency_id)} {this_order._currency}"
                 )
+                if stats:
+                    stats.lap("logging")
 
-            elif this_order.order_type == LIMIT_BUY:
-                last_low = self._symbols[this_symbol].ohlc.bars[self.buy_metric].loc[self.period]
+            elif order_type == LIMIT_BUY:
+                last_low = order_bars.value(self.buy_metric, order_row)
+                if stats:
+                    stats.lap("matching")
                 if last_low < this_order.ordered_unit_price:
                     log.debug(
                         f"{_order_id}: Starting fill for LIMIT_BUY order {this_order.order_id}"
                     )
+                    if stats:
+                        stats.lap("logging")
+
+                    if fills is None:
+                        unit_price = this_order.ordered_unit_price
+                        fee_rate = 0
+                    else:
+                        unit_price, fee_rate = fills[_order_id]
 
                     # don't process this order if it would send balance to negative
-                    order_value = this_order.ordered_unit_quantity * this_order.ordered_unit_price
-                    if order_value > self._balance:
+                    order_value = quantity * this_order.ordered_unit_price
+                    if order_value + fee_rate * order_value > self._cash.item(currency_id):
+                        if stats:
+                            stats.lap("balance")
                         log.warning(
                             f"{_order_id}: Unable to fill {this_order.order_id} - order "
-                            f"value is {order_value} but balance is only {self._balance}"
-                        )
-                        self.cancel_order(
-                            order_id=this_order.order_id,
+                            f"value is {order_value} but balance is only "
+                            f"{self._cash.item(currency_id)} {this_order._currency}"
                         )
+                        if stats:
+                            stats.lap("logging")
+                        self._cancel(this_order.order_id)
+                        if stats:
+                            stats.lap("bookkeeping")
                         continue
+                    if stats:
+                        stats.lap("balance")
 
                     # mark this order as filled
-                    this_order.status = 4
-                    this_order.closed = True
-                    this_order.status_text = ORDER_STATUS_TEXT[this_order.status]
-                    this_order.status_summary = ORDER_STATUS_ID_TO_SUMMARY[this_order.status]
-                    this_order.filled_unit_quantity = this_order.ordered_unit_quantity
-                    this_order.filled_unit_price = self._symbols[this_symbol].align_price(
-                        this_order.ordered_unit_price
-                    )
-
-                    this_order.filled_total_value = (
-                        this_order.filled_unit_quantity * this_order.filled_unit_price
-                    )
-
-                    # instantiate this symbol in the held array - it gets populated in a couple lines
-                    if self._assets_held.get(this_symbol) == None:
-                        self._assets_held[this_symbol] = []
-
-                    self._assets_held[this_symbol].append(
-                        {
-                            "units": this_order.filled_unit_quantity,
-                            "unit_price": this_order.filled_unit_price,
-                        }
+                    unit_price = self._align_price[this_symbol](unit_price)
+                    fill_value = quantity * unit_price
+                    fees = fee_rate * fill_value
+                    filled = self._record_fill(this_order, quantity, unit_price, fees, fill_time)
+
+                    if stats:
+                        stats.lap("bookkeeping")
+
+                    self._do_buy(
+                        quantity_to_buy=quantity,
+                        symbol=this_symbol,
+                        unit_price=unit_price,
                     )
 
                     # update balance
-                    self._balance = round(
-                        self._balance
-                        - (this_order.filled_unit_price * this_order.filled_unit_quantity),
-                        15,
+                    self._cash[currency_id] = round(
+                        self._cash.item(currency_id) - (unit_price * quantity) - fees, 15
                     )
+                    if stats:
+                        stats.lap("balance")
 
-                    filled_symbols.append(_order_id)
+                    if filled:
+                        filled_symbols.append(_order_id)
+                    if _order_id in self._order_group:
+                        self._group_fill(this_order, quantity)
+                    if stats:
+                        stats.lap("bookkeeping")
 
                     log.info(
                         f"{_order_id}: limit_buy filled, {this_order.filled_unit_quantity} "
-                        f"units at {this_order.filled_unit_price}, balance {self._balance}"
+                        f"units at {this_order.filled_unit_price}, "
+                        f"balance {self._cash.item(currency_id)} {this_order._currency}"
                     )
+                    if stats:
+                        stats.lap("logging")
 
-            elif this_order.order_type == LIMIT_SELL:
-                last_high = self._symbols[this_symbol].ohlc.bars[self.sell_metric].loc[self.period]
+            elif order_type == LIMIT_SELL:
+                last_high = order_bars.value(self.sell_metric, order_row)
+                if stats:
+                    stats.lap("matching")
                 if last_high > this_order.ordered_unit_price:
                     log.debug(
                         f"{_order_id}: Starting fill for LIMIT_SELL order {this_order.order_id}"
                     )
+                    if stats:
+                        stats.lap("logging")
                     # how many of this symbol do we own? is it >= than the requested amount to sell?
                     held, paid = self._get_held_units(this_symbol)
 
-                    if held < this_order.ordered_unit_quantity:
+                    if held < quantity or held + DUST_UNITS < unfilled:
+                        if stats:
+                            stats.lap("balance")
                         log.debug(
                             f"{_order_id}: Failed to fill order {this_order.order_id} - "
-                            f"trying to sell {this_order.ordered_unit_quantity} units "
-                            f"but only hold {held}"
-                        )
-                        self.cancel_order(
-                            order_id=this_order.order_id,
+                            f"trying to sell {unfilled} units but only hold {held}"
                         )
+                        if stats:
+                            stats.lap("logging")
+                        self._cancel(this_order.order_id)
+                        if stats:
+                            stats.lap("bookkeeping")
                         continue
                         # raise ValueError(
                         #    f"{symbol}: Hold {held} so can't sell {this_order.ordered_unit_quantity} units"
                         # )
+                    if stats:
+                        stats.lap("balance")
 
                     # mark this order as filled
-                    this_order.status = 4
-                    this_order.closed = True
-                    this_order.status_text = ORDER_STATUS_TEXT[this_order.status]
-                    this_order.status_summary = ORDER_STATUS_ID_TO_SUMMARY[this_order.status]
-                    this_order.filled_unit_quantity = this_order.ordered_unit_quantity
-                    this_order.filled_unit_price = self._symbols[this_symbol].align_price(
-                        self._symbols[this_symbol].ohlc.bars[self.sell_metric].loc[self.period]
-                    )
-
-                    this_order.filled_total_value = (
-                        this_order.filled_unit_quantity * this_order.filled_unit_price
-                    )
+                    if fills is None:
+                        unit_price = order_bars.value(self.sell_metric, order_row)
+                        fee_rate = 0
+                    else:
+                        unit_price, fee_rate = fills[_order_id]
+                    unit_price = self._align_price[this_symbol](unit_price)
+                    fill_value = quantity * unit_price
+                    fees = fee_rate * fill_value
+                    filled = self._record_fill(this_order, quantity, unit_price, fees, fill_time)
+
+                    if stats:
+                        stats.lap("bookkeeping")
 
                     self._do_sell(
-                        quantity_to_sell=this_order.filled_unit_quantity, symbol=_order_id
+                        quantity_to_sell=quantity,
+                        symbol=this_symbol,
+                        unit_price=unit_price,
                     )
 
                     # update balance
-                    self._balance = round(self._balance + this_order.filled_total_value, 15)
+                    self._cash[currency_id] = round(
+                        self._cash.item(currency_id) + fill_value - fees, 15
+                    )
+                    if stats:
+                        stats.lap("balance")
 
-                    filled_symbols.append(_order_id)
+                    if filled:
+                        filled_symbols.append(_order_id)
+                    if _order_id in self._order_group:
+                        self._group_fill(this_order, quantity)
+                    if stats:
+                        stats.lap("bookkeeping")
 
                     log.info(
                         f"{_order_id}: limit_sell filled, {this_order.filled_unit_quantity} "
-                        f"units at {this_order.filled_unit_price}, balance {self._balance}"
+                        f"units at {this_order.filled_unit_price}, "
+                        f"balance {self._cash.item(currency_id)} {this_order._currency}"
                     )
+                    if stats:
+                        stats.lap("logging")
 
         for _order_id in filled_symbols:
-            self._inactive_orders.append(orders_copy[_order_id])
             if _order_id in self._orders:
-                del self._orders[_order_id]
-
-    def _do_sell(self, quantity_to_sell, symbol):
-        # if we don't hold any, return False
-        if not self._assets_held.get(symbol):
-            return False
+                self._remove_from_book(self._orders[_order_id])
+                self._retire_order(self._orders.pop(_order_id))
+
+        if stats:
+            stats.lap("bookkeeping")
+            statuses = [order.status for order in orders_copy.values()]
+            stats.count(
+                self._period_ns,
+                evaluated=len(statuses),
+                filled=statuses.count(4),
+                cancelled=sum(
+                    1 for status in statuses if status in ORDER_STATUS_SUMMARY_TO_ID["cancelled"]
+                ),
+            )
 
-        # check that we aren't trying to sell more than we actually hold
-        actual_held = 0
-        for order in self._assets_held[symbol]:
-            actual_held += order["units"]
-        if actual_held < quantity_to_sell:
-            raise ValueError(
-                f"{symbol}: Unable to remove {quantity_to_sell} units from holding of "
-                f'{order["units"]}, since that would be less than 0'
+    def _fillable_quantity(self, order, bars, row) -> float:
+        # the rest of the order, capped at what's left of participation_rate of the bar's volume
+        # once earlier orders this bar have taken their share
+        symbol_id = self._capacity_ids[order.symbol]
+        capacity = self._capacity[symbol_id]
+        if np.isnan(capacity):
+            # bars without a volume can't be filled against at all
+            capacity = np.nan_to_num(self._participation_rate * bars.value("Volume", row))
+            self._capacity[symbol_id] = capacity
+
+        remaining = order.ordered_unit_quantity - (order.filled_unit_quantity or 0)
+        return min(remaining, float(capacity))
+
+    def _record_fill(self, order, quantity, unit_price, fees, fill_time) -> bool:
+        # adds a fill of quantity at unit_price to order, and returns whether that completes it.
+        # repeated fills average out to one filled_unit_price weighted by quantity
+        filled_quantity = order.filled_unit_quantity or 0
+        filled = quantity >= order.ordered_unit_quantity - filled_quantity
+
+        if not filled_quantity:
+            order.filled_unit_quantity = quantity
+            order.filled_unit_price = unit_price
+            order.filled_total_value = quantity * unit_price
+            order.fees = fees
+        else:
+            order.filled_total_value = order.filled_total_value + quantity * unit_price
+            order.filled_unit_quantity = (
+                order.ordered_unit_quantity if filled else filled_quantity + quantity
             )
+            order.filled_unit_price = order.filled_total_value / order.filled_unit_quantity
+            order.fees = order.fees + fees
+
+        if self._participation_rate is not None:
+            self._capacity[self._capacity_ids[order.symbol]] -= quantity
+
+        order.status = 4 if filled else 3
+        order.closed = filled
+        order.status_text = ORDER_STATUS_TEXT[order.status]
+        order.status_summary = ORDER_STATUS_ID_TO_SUMMARY[order.status]
+        order.update_time = fill_time
+
+        if not filled:
+            log.debug(
+                f"{order.order_id}: Partially filled, {order.filled_unit_quantity} of "
+                f"{order.ordered_unit_quantity} units at an average of {order.filled_unit_price}"
+            )
+        return filled
+
+    def _model_fills(self, orders, bars=None, row=None, quantity=None) -> dict:
+        # runs every open order in orders that has a bar through the fill model in one go. the
+        # prices are what each order would fill at if it filled, slipped but not yet aligned.
+        # quantity is how much of a single order fills on this bar when fills are volume capped,
+        # otherwise each order is priced for whatever it has left
+        model = self._fill_model
+        order_ids = []
+        prices = []
+        quantities = []
+        buys = []
+        columns = {column: [] for column in model.columns}
+
+        for order_id, order in orders.items():
+            if order.closed or order.symbol not in self._symbols:
+                continue
 
-        # now start popping units from held
-        # self._assets_held[symbol] is a list of objects that represent buy orders. when we sell, we need to pop/update these buy orders to remove them
-        for order in self._assets_held[symbol]:
-            if order["units"] - quantity_to_sell >= 0:
-                # more units in this order than we need to sell
-                order["units"] -= quantity_to_sell
-                quantity_to_sell = 0
+            if bars is None:
+                order_bars = self._bar_cache[order.symbol]
+                order_row = self._get_row(order.symbol)
             else:
-                quantity_to_sell -= order["units"]
-                order["units"] = 0
+                order_bars = bars
+                order_row = row
+            if order_row is None:
+                continue
+
+            if order.order_type == MARKET_BUY:
+                price = order_bars.value(self.buy_metric, order_row)
+            elif order.order_type == LIMIT_BUY or order.order_type == STOP_LIMIT_BUY:
+                price = order.ordered_unit_price
+            else:
+                price = order_bars.value(self.sell_metric, order_row)
+
+            order_ids.append(order_id)
+            prices.append(price)
+            if quantity is None:
+                quantities.append(order.ordered_unit_quantity - (order.filled_unit_quantity or 0))
+            else:
+                quantities.append(quantity)
+            buys.append(order.order_type in BUY_ORDER_TYPES)
+            for column, values in columns.items():
+                values.append(order_bars.value(column, order_row))
+
+        if not order_ids:
+            return {}
+
+        order_types = np.array([orders[order_id].order_type for order_id in order_ids])
+        prices, fee_rates = model.apply(
+            prices,
+            quantities,
+            buys,
+            takers=(order_types == MARKET_BUY) | (order_types == MARKET_SELL),
+            columns={column: np.array(values) for column, values in columns.items()},
+        )
+        return dict(zip(order_ids, zip(prices.tolist(), fee_rates.tolist())))
 
-            # nothing left to sell, no point iterating over remaining orders
-            if quantity_to_sell == 0:
-                break
+    def _do_buy(self, quantity_to_buy, symbol, unit_price):
+        if symbol not in self._assets_held:
+            self._assets_held[symbol] = LotLedger(symbol, keep_closed_lots=self._keep_closed_lots)
+
+        lot = self._assets_held[symbol].buy(units=quantity_to_buy, unit_price=unit_price)
+        if self._stats:
+            self._stats.lap("lot_update")
+        return lot
+
+    def _do_sell(self, quantity_to_sell, symbol, unit_price):
+        stats = self._stats
+
+        # if we don't hold any, return False
+        if symbol not in self._assets_held:
+            if stats:
+                stats.lap("bookkeeping")
+            return False
+
+        ledger = self._assets_held[symbol]
+        if stats:
+            stats.lap("bookkeeping")
+
+        # lots are consumed oldest first, and raises ValueError if we'd go below 0 units
+        ledger.sell(units=quantity_to_sell, unit_price=unit_price)
+        if stats:
+            stats.lap("lot_update")
 
         return True
 
@@ -737,136 +2113,9 @@ class BackTestAPI(ITradeAPI):
         return 3
 
     def get_asset(self, symbol: str):
-        hardcoded_assets = {}
-        hardcoded_assets["AAVE-USD"] = {
-            "min_order_size": 0.01,
-            "min_quantity_increment": 0.01,
-            "min_price_increment": 0.1,
-        }
-        hardcoded_assets["AVAX-USD"] = {
-            "min_order_size": 0.1,
-            "min_quantity_increment": 0.1,
-            "min_price_increment": 0.0005,
-        }
-        hardcoded_assets["BAT-USD"] = {
-            "min_order_size": 1,
-            "min_quantity_increment": 1,
-            "min_price_increment": 0.000025,
-        }
-        hardcoded_assets["BTC-USD"] = {
-            "min_order_size": 0.0001,
-            "min_quantity_increment": 0.0001,
-            "min_price_increment": 1,
-        }
-        hardcoded_assets["BCH-USD"] = {
-            "min_order_size": 0.001,
-            "min_quantity_increment": 0.0001,
-            "min_price_increment": 0.025,
-        }
-        hardcoded_assets["LINK-USD"] = {
-            "min_order_size": 0.1,
-            "min_quantity_increment": 0.1,
-            "min_price_increment": 0.0005,
-        }
-        hardcoded_assets["DAI-USD"] = {
-            "min_order_size": 0.1,
-            "min_quantity_increment": 0.1,
-            "min_price_increment": 0.0001,
-        }
-        hardcoded_assets["DOGE-USD"] = {
-            "min_order_size": 1,
-            "min_quantity_increment": 1,
-            "min_price_increment": 0.0000005,
-        }
-        hardcoded_assets["ETH-USD"] = {
-            "min_order_size": 0.001,
-            "min_quantity_increment": 0.001,
-            "min_price_increment": 0.1,
-        }
-        hardcoded_assets["GRT-USD"] = {
-            "min_order_size": 1,
-            "min_quantity_increment": 1,
-            "min_price_increment": 0.00005,
-        }
-        hardcoded_assets["LTC-USD"] = {
-            "min_order_size": 0.01,
-            "min_quantity_increment": 0.01,
-            "min_price_increment": 0.005,
-        }
-        hardcoded_assets["MKR-USD"] = {
-            "min_order_size": 0.001,
-            "min_quantity_increment": 0.001,
-            "min_price_increment": 0.5,
-        }
-        hardcoded_assets["MATIC-USD"] = {
-            "min_order_size": 10,
-            "min_quantity_increment": 10,
-            "min_price_increment": 0.000001,
-        }
-        hardcoded_assets["PAXG-USD"] = {
-            "min_order_size": 0.0001,
-            "min_quantity_increment": 0.0001,
-            "min_price_increment": 0.1,
-        }
-        hardcoded_assets["SHIB-USD"] = {
-            "min_order_size": 100000,
-            "min_quantity_increment": 100000,
-            "min_price_increment": 0.00000001,
-        }
-        hardcoded_assets["SOL-USD"] = {
-            "min_order_size": 0.01,
-            "min_quantity_increment": 0.01,
-            "min_price_increment": 0.0025,
-        }
-        hardcoded_assets["SUSHI-USD"] = {
-            "min_order_size": 0.5,
-            "min_quantity_increment": 0.5,
-            "min_price_increment": 0.0001,
-        }
-        hardcoded_assets["USDT-USD"] = {
-            "min_order_size": 0.01,
-            "min_quantity_increment": 0.01,
-            "min_price_increment": 0.0001,
-        }
-        hardcoded_assets["TRX-USD"] = {
-            "min_order_size": 1,
-            "min_quantity_increment": 1,
-            "min_price_increment": 0.0000025,
-        }
-        hardcoded_assets["UNI-USD"] = {
-            "min_order_size": 0.1,
-            "min_quantity_increment": 0.1,
-            "min_price_increment": 0.001,
-        }
-        hardcoded_assets["WBTC-USD"] = {
-            "min_order_size": 0.0001,
-            "min_quantity_increment": 0.0001,
-            "min_price_increment": 1,
-        }
-        hardcoded_assets["YFI-USD"] = {
-            "min_order_size": 0.001,
-            "min_quantity_increment": 0.001,
-            "min_price_increment": 5,
-        }
-
-        # asset = self.get_asset(symbol=symbol)
-
-        # if hasattr(asset, "min_order_size"):
-        if symbol in hardcoded_assets.keys():
-            min_order_size = hardcoded_assets[symbol]["min_order_size"]
-            min_trade_increment = hardcoded_assets[symbol]["min_quantity_increment"]
-            min_price_increment = hardcoded_assets[symbol]["min_price_increment"]
-        else:
-            min_order_size = 1
-            min_trade_increment = 1
-            min_price_increment = 0.001
-
-        return Asset(
-            symbol=symbol,
-            min_quantity=min_order_size,
-            min_quantity_increment=min_trade_increment,
-            min_price_increment=min_price_increment,
-        )
+        # symbols the registry doesn't know about get a min order size and quantity increment of
+        # 1, and a price increment of 0.001
+        return self._asset_registry.get_asset(symbol)
 
     def validate_symbol(self, symbol: str):
         # TODO: this is not right - but the whole handling of symbols is busted in back testing
@@ -875,6 +2124,450 @@ class BackTestAPI(ITradeAPI):
     def generate_id(length: int = 6):
         return uuid.uuid4().hex[:length].upper()
 
+    def _new_order_id(self, prefix: str) -> str:
+        # 6 hex characters collide often enough over a long back test to clobber another order
+        order_id = prefix + BackTestAPI.generate_id()
+        while order_id in self._all_orders or (
+            self._archive is not None and self._archive.contains(order_id)
+        ):
+            order_id = prefix + BackTestAPI.generate_id()
+        return order_id
+
     @property
     def back_testing(self):
         return True
+
+
+class VectorBackTestResult:
+    orders: DataFrame
+    balance: float
+    positions: dict
+    realized_pnl: float
+
+    def __init__(self, orders: DataFrame, balance: float, positions: dict, realized_pnl: float):
+        self.orders = orders
+        self.balance = balance
+        self.positions = positions
+        self.realized_pnl = realized_pnl
+
+    def get_account(self) -> Account:
+        return Account({"USD": self.balance})
+
+    def list_positions(self) -> list:
+        return [
+            Position(symbol=symbol, quantity=quantity) for symbol, quantity in self.positions.items()
+        ]
+
+    def order_results(self) -> list:
+        # materialises the orders frame as the same OrderResult objects BackTestAPI hands out
+        results = []
+        for record in self.orders.itertuples(index=False):
+            order = OrderResult.place(
+                order_type=record.order_type,
+                order_id=record.order_id,
+                symbol=record.symbol,
+                quantity=record.ordered_unit_quantity,
+                limit_price=record.ordered_unit_price,
+                period=record.create_time,
+                status=record.status,
+                fees=record.fees,
+                update_time=record.update_time,
+                stop_price=None if np.isnan(record.stop_price) else record.stop_price,
+            )
+
+            if record.status == 4:
+                order.filled_unit_quantity = record.filled_unit_quantity
+                order.filled_unit_price = record.filled_unit_price
+                order.filled_total_value = record.filled_total_value
+
+            results.append(order)
+
+        return results
+
+
+class VectorBackTest:
+    # whole-run counterpart to BackTestAPI. rather than stepping a clock and placing orders one at
+    # a time, it takes every signal up front and works out when each order would trigger with
+    # array searches over the bars. only the orders that trigger then get walked in time order
+    # to apply the same balance/holding checks and fill prices as BackTestAPI._update_order_status
+    def __init__(
+        self,
+        bars,
+        back_testing_balance: float = 100000,
+        sell_metric: str = "Low",
+        buy_metric: str = "High",
+        align_price=None,
+        fill_model=None,
+    ):
+        # bars is either {symbol: DataFrame} or a DataFrame with (symbol, column) MultiIndex
+        # columns. align_price is an optional callable, or {symbol: callable}, that rounds fill
+        # prices the same way the symbol objects given to BackTestAPI would. it can also be an
+        # AssetRegistry (or "registry" for the bundled one) to align whole arrays of fill prices
+        # at once, which matches a BackTestAPI with align_to_registry. fill_model is applied to
+        # every symbol's fills as one array, the same as BackTestAPI's fill_model
+        if isinstance(bars, DataFrame):
+            bars = {
+                symbol: bars[symbol].dropna(how="all")
+                for symbol in bars.columns.get_level_values(0).unique()
+            }
+
+        self.back_testing_balance = back_testing_balance
+        self.sell_metric = sell_metric
+        self.buy_metric = buy_metric
+        self.fill_model = fill_model
+
+        extra_columns = (buy_metric, sell_metric)
+        if fill_model:
+            extra_columns += tuple(fill_model.columns)
+
+        self._bar_index = {}
+        self._bar_cache = {}
+        for symbol, symbol_bars in bars.items():
+            self._bar_index[symbol] = symbol_bars.index
+            self._bar_cache[symbol] = BarCache.from_frame(symbol_bars, extra_columns=extra_columns)
+            for column in extra_columns:
+                if column not in self._bar_cache[symbol].columns:
+                    raise ValueError(f"{symbol}: Bars have no {column} column")
+
+        if align_price == "registry":
+            align_price = get_registry()
+
+        self._asset_registry = None
+        if isinstance(align_price, AssetRegistry):
+            self._asset_registry = align_price
+            self._align_price = {}
+        elif align_price is None or callable(align_price):
+            self._align_price = {symbol: align_price for symbol in self._bar_cache}
+        else:
+            self._align_price = align_price
+
+    @classmethod
+    def from_symbols(cls, symbol_objects, **kwargs):
+        # same symbol objects as BackTestAPI takes, including their align_price
+        symbol_objects = list(symbol_objects)
+        return cls(
+            bars={symbol.yf_symbol: symbol.ohlc.bars for symbol in symbol_objects},
+            align_price={symbol.yf_symbol: symbol.align_price for symbol in symbol_objects},
+            **kwargs,
+        )
+
+    def run(self, signals: DataFrame) -> VectorBackTestResult:
+        # signals has one row per order, placed at the row's index timestamp (or a 'timestamp'
+        # column if there is one), with columns symbol, order_type (constant or name, eg.
+        # "LIMIT_BUY"), quantity, limit_price (ignored for market orders) and stop_price (only
+        # needed for stop limits). rows with the same timestamp are placed in the order they
+        # appear
+        if "timestamp" in signals.columns:
+            created = DatetimeIndex(signals["timestamp"])
+        else:
+            created = DatetimeIndex(signals.index)
+
+        sequence = np.argsort(created.values.astype("datetime64[ns]").view("int64"), kind="stable")
+        created = created[sequence]
+        symbols = signals["symbol"].to_numpy()[sequence]
+        order_types = np.array(
+            [ORDER_MAP.get(order_type, order_type) for order_type in signals["order_type"]],
+            dtype=np.int64,
+        )[sequence]
+        quantities = signals["quantity"].to_numpy(dtype="float64")[sequence]
+        if "limit_price" in signals.columns:
+            limit_prices = signals["limit_price"].to_numpy(dtype="float64")[sequence]
+        else:
+            limit_prices = np.full(len(signals), np.nan)
+        if "stop_price" in signals.columns:
+            stop_prices = signals["stop_price"].to_numpy(dtype="float64")[sequence]
+        else:
+            stop_prices = np.full(len(signals), np.nan)
+
+        self._validate_signals(symbols, order_types, limit_prices, stop_prices)
+
+        created_ns = created.values.astype("datetime64[ns]").view("int64")
+        count = len(symbols)
+        stop_orders = (order_types == STOP_LIMIT_BUY) | (order_types == STOP_LIMIT_SELL)
+        limit_orders = (order_types == LIMIT_BUY) | (order_types == LIMIT_SELL) | stop_orders
+        limit_prices[~limit_orders] = np.nan
+        stop_prices[~stop_orders] = np.nan
+
+        # row each stop limit triggers on, and whether it never does so is still pending
+        trigger_rows = np.full(count, -1, dtype=np.int64)
+        pending = stop_orders.copy()
+
+        # row each order triggers on within its symbol's bars, or -1 if it never does
+        fill_rows = np.full(count, -1, dtype=np.int64)
+        fill_ns = np.zeros(count, dtype=np.int64)
+        raw_prices = np.full(count, np.nan)
+        fee_rates = np.zeros(count)
+
+        for symbol in np.unique(symbols):
+            positions = np.flatnonzero(symbols == symbol)
+            bars = self._bar_cache[symbol]
+            length = len(bars)
+
+            # an order placed between bars first gets looked at on the next bar
+            starts = np.searchsorted(bars.timestamps, created_ns[positions], side="left")
+            rows = np.full(len(positions), length, dtype=np.int64)
+            types = order_types[positions]
+
+            market = (types == MARKET_BUY) | (types == MARKET_SELL)
+            rows[market] = starts[market]
+
+            limit_buy = types == LIMIT_BUY
+            rows[limit_buy] = bars.first_below(
+                self.buy_metric, starts[limit_buy], limit_prices[positions][limit_buy]
+            )
+
+            limit_sell = types == LIMIT_SELL
+            rows[limit_sell] = bars.first_above(
+                self.sell_metric, starts[limit_sell], limit_prices[positions][limit_sell]
+            )
+
+            # stop limits are limit orders from the bar their stop triggers on, inclusive
+            triggers = np.full(len(positions), length, dtype=np.int64)
+            stop_buy = types == STOP_LIMIT_BUY
+            triggers[stop_buy] = bars.first_above(
+                STOP_BUY_TRIGGER, starts[stop_buy], stop_prices[positions][stop_buy], inclusive=True
+            )
+            rows[stop_buy] = bars.first_below(
+                self.buy_metric, triggers[stop_buy], limit_prices[positions][stop_buy]
+            )
+
+            stop_sell = types == STOP_LIMIT_SELL
+            triggers[stop_sell] = bars.first_below(
+                STOP_SELL_TRIGGER,
+                starts[stop_sell],
+                stop_prices[positions][stop_sell],
+                inclusive=True,
+            )
+            rows[stop_sell] = bars.first_above(
+                self.sell_metric, triggers[stop_sell], limit_prices[positions][stop_sell]
+            )
+
+            stopped = (stop_buy | stop_sell) & (triggers < length)
+            trigger_rows[positions[stopped]] = triggers[stopped]
+            pending[positions[stopped]] = False
+
+            triggered = rows < length
+            positions = positions[triggered]
+            rows = rows[triggered]
+            types = types[triggered]
+
+            fill_rows[positions] = rows
+            fill_ns[positions] = bars.timestamps[rows]
+
+            # limit buys fill at their limit, everything else at the bar's buy/sell metric
+            prices = np.where(
+                types == MARKET_BUY,
+                bars.columns[self.buy_metric][rows],
+                bars.columns[self.sell_metric][rows],
+            )
+            limit_buys = (types == LIMIT_BUY) | (types == STOP_LIMIT_BUY)
+            prices[limit_buys] = limit_prices[positions][limit_buys]
+
+            if self.fill_model:
+                prices, fee_rates[positions] = self.fill_model.apply(
+                    prices,
+                    quantities[positions],
+                    buys=(types == MARKET_BUY) | limit_buys,
+                    takers=market[triggered],
+                    columns={
+                        column: bars.columns[column][rows] for column in self.fill_model.columns
+                    },
+                )
+            raw_prices[positions] = self._align(symbol, prices)
+
+        return self._settle(
+            created=created,
+            symbols=symbols,
+            order_types=order_types,
+            quantities=quantities,
+            limit_prices=limit_prices,
+            stop_prices=stop_prices,
+            trigger_rows=trigger_rows,
+            pending=pending,
+            fill_rows=fill_rows,
+            fill_ns=fill_ns,
+            fill_prices=raw_prices,
+            fee_rates=fee_rates,
+        )
+
+    def _validate_signals(self, symbols, order_types, limit_prices, stop_prices):
+        for symbol in np.unique(symbols):
+            if symbol not in self._bar_cache:
+                raise KeyError(f"{symbol} is not registered in {self}")
+
+        supported = np.isin(order_types, list(BUY_ORDER_TYPES | SELL_ORDER_TYPES))
+        if not supported.all():
+            raise NotImplementedError(
+                f"Unsupported order types in signals: {set(order_types[~supported].tolist())}"
+            )
+
+        limit_orders = np.isin(order_types, list(PRICED_ORDER_TYPES))
+        if np.isnan(limit_prices[limit_orders]).any():
+            raise ValueError("Limit orders in signals must have a limit_price")
+
+        stop_orders = (order_types == STOP_LIMIT_BUY) | (order_types == STOP_LIMIT_SELL)
+        if np.isnan(stop_prices[stop_orders]).any():
+            raise ValueError("Stop limit orders in signals must have a stop_price")
+
+    def _align(self, symbol, prices):
+        if self._asset_registry is not None:
+            return self._asset_registry.align_prices(symbol, prices)
+
+        align_price = self._align_price.get(symbol)
+        if align_price is None:
+            return prices
+        return np.array([align_price(price) for price in prices], dtype="float64")
+
+    def _settle(
+        self,
+        created,
+        symbols,
+        order_types,
+        quantities,
+        limit_prices,
+        stop_prices,
+        trigger_rows,
+        pending,
+        fill_rows,
+        fill_ns,
+        fill_prices,
+        fee_rates,
+    ) -> VectorBackTestResult:
+        count = len(symbols)
+        statuses = np.ones(count, dtype=np.int64)
+        filled_quantities = np.full(count, np.nan)
+        filled_prices = np.full(count, np.nan)
+        fees = np.zeros(count)
+
+        # stops that never triggered are still pending, and triggering counts as an update
+        statuses[pending] = 5
+        update_rows = trigger_rows.copy()
+
+        balance = self.back_testing_balance
+        held = {}
+
+        # cash and holdings depend on what filled before, so walk the triggered orders in time
+        # order, with orders placed earlier going first when they trigger on the same bar
+        triggered = np.flatnonzero(fill_rows >= 0)
+        triggered = triggered[np.lexsort((triggered, fill_ns[triggered]))]
+
+        # plain python floats, so that round() behaves exactly as it does in BackTestAPI
+        quantity_values = quantities.tolist()
+        price_values = fill_prices.tolist()
+        limit_values = limit_prices.tolist()
+        row_values = fill_rows.tolist()
+        fee_rate_values = fee_rates.tolist()
+
+        for position in triggered.tolist():
+            symbol = symbols[position]
+            order_type = order_types[position]
+            quantity = quantity_values[position]
+            unit_price = price_values[position]
+            fee_rate = fee_rate_values[position]
+            update_rows[position] = row_values[position]
+
+            if order_type == MARKET_BUY or order_type == LIMIT_BUY or order_type == STOP_LIMIT_BUY:
+                if order_type == MARKET_BUY:
+                    order_value = unit_price * quantity
+                else:
+                    order_value = quantity * limit_values[position]
+
+                if order_value + fee_rate * order_value > balance:
+                    statuses[position] = 6
+                    continue
+
+                fee = fee_rate * (quantity * unit_price)
+                if symbol not in held:
+                    held[symbol] = LotLedger(symbol)
+                held[symbol].buy(units=quantity, unit_price=unit_price)
+                balance = round(balance - (unit_price * quantity) - fee, 15)
+
+            else:
+                if symbol not in held or held[symbol].quantity < quantity:
+                    statuses[position] = 6
+                    continue
+
+                fee = fee_rate * (quantity * unit_price)
+                held[symbol].sell(units=quantity, unit_price=unit_price)
+                if order_type == MARKET_SELL:
+                    balance = round(balance + round(quantity * unit_price, 2) - fee, 15)
+                else:
+                    balance = round(balance + quantity * unit_price - fee, 15)
+
+            statuses[position] = 4
+            fees[position] = fee
+            filled_quantities[position] = quantity
+            filled_prices[position] = unit_price
+
+        orders = self._build_orders_frame(
+            created=created,
+            symbols=symbols,
+            order_types=order_types,
+            quantities=quantities,
+            limit_prices=limit_prices,
+            stop_prices=stop_prices,
+            statuses=statuses,
+            filled_quantities=filled_quantities,
+            filled_prices=filled_prices,
+            fees=fees,
+            update_rows=update_rows,
+        )
+
+        return VectorBackTestResult(
+            orders=orders,
+            balance=balance,
+            positions={symbol: ledger.quantity for symbol, ledger in held.items()},
+            realized_pnl=sum(ledger.realized_pnl for ledger in held.values()),
+        )
+
+    def _build_orders_frame(
+        self,
+        created,
+        symbols,
+        order_types,
+        quantities,
+        limit_prices,
+        stop_prices,
+        statuses,
+        filled_quantities,
+        filled_prices,
+        fees,
+        update_rows,
+    ) -> DataFrame:
+        buys = np.isin(order_types, list(BUY_ORDER_TYPES))
+        order_ids = []
+        used = set()
+        for buy in buys.tolist():
+            prefix = "buy-" if buy else "sell-"
+            order_id = prefix + BackTestAPI.generate_id()
+            while order_id in used:
+                order_id = prefix + BackTestAPI.generate_id()
+            used.add(order_id)
+            order_ids.append(order_id)
+
+        update_times = list(created)
+        for position in np.flatnonzero(update_rows >= 0).tolist():
+            update_times[position] = self._bar_index[symbols[position]][update_rows[position]]
+
+        return DataFrame(
+            {
+                "symbol": symbols,
+                "order_id": order_ids,
+                "order_type": order_types,
+                "order_type_text": [ORDER_MAP_INVERTED[x] for x in order_types.tolist()],
+                "status": statuses,
+                "status_summary": [ORDER_STATUS_ID_TO_SUMMARY[x] for x in statuses.tolist()],
+                "status_text": [ORDER_STATUS_TEXT[x] for x in statuses.tolist()],
+                "ordered_unit_quantity": quantities,
+                "ordered_unit_price": limit_prices,
+                "stop_price": stop_prices,
+                "ordered_total_value": quantities * limit_prices,
+                "filled_unit_quantity": filled_quantities,
+                "filled_unit_price": filled_prices,
+                "filled_total_value": filled_quantities * filled_prices,
+                "fees": fees,
+                "success": np.isin(statuses, [1, 3, 4, 5]),
+                "create_time": list(created),
+                "update_time": update_times,
+            }
+        )
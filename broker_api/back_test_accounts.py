@@ -0,0 +1,232 @@
+from pandas import DataFrame
+import logging
+import os
+import numpy as np
+
+from .back_test import BackTestAPI
+from .fx_rates import ledger_currencies
+
+log = logging.getLogger(__name__)
+
+
+class AccountBook:
+    # cash and held quantity for every account, as an (accounts, currencies) array and an
+    # (accounts, symbols) array, so whole-portfolio numbers for every account come out of one
+    # array operation. each account's cash ledger is a view of its row
+    def __init__(
+        self, account_count: int, symbols: list, back_testing_balance=100000, currencies=None
+    ):
+        if account_count < 1:
+            raise ValueError(f"Need at least one account, got {account_count}")
+
+        self.symbols = list(symbols)
+        self._symbol_ids = {symbol: symbol_id for symbol_id, symbol in enumerate(self.symbols)}
+
+        # the first currency is the default one
+        self.currencies = list(currencies or ["USD"])
+        self.currency_ids = {
+            currency: currency_id for currency_id, currency in enumerate(self.currencies)
+        }
+
+        # back_testing_balance is either one starting balance for everyone, or one per account, in
+        # the default currency - or a dict of {currency: either of those}
+        if not isinstance(back_testing_balance, dict):
+            back_testing_balance = {self.currencies[0]: back_testing_balance}
+
+        self.cash = np.zeros((account_count, len(self.currencies)), dtype="float64")
+        for currency, balance in back_testing_balance.items():
+            self.cash[:, self.currency_ids[currency]] = np.broadcast_to(
+                np.asarray(balance, dtype="float64"), (account_count,)
+            )
+        self.quantities = np.zeros((account_count, len(self.symbols)), dtype="float64")
+
+    def __len__(self):
+        return len(self.cash)
+
+    def set_quantity(self, account: int, symbol: str, quantity: float):
+        self.quantities[account, self._symbol_ids[symbol]] = quantity
+
+    def position_values(self, marks: np.ndarray) -> np.ndarray:
+        # marks is a price per symbol, in the same order as symbols
+        return self.quantities @ marks
+
+
+class BackTestAccount(BackTestAPI):
+    # one account within a MultiAccountBackTest. it's a full BackTestAPI - orders, positions and
+    # everything else behave exactly the same - except that its cash and quantities live in the
+    # shared AccountBook, and bars and the row each symbol is at this tick come from the
+    # simulator rather than each account loading and looking them up for itself
+    def __init__(self, simulator, account: int, **kwargs):
+        # needed before BackTestAPI.__init__ sets the starting balance
+        self._simulator = simulator
+        self._book = simulator.book
+        self._account = account
+
+        super().__init__(
+            simulator._time_manager,
+            back_testing_balance=simulator._back_testing_balance,
+            **kwargs,
+        )
+
+        # straight to the simulator's row cache rather than through a method that calls it
+        self._get_row = simulator._get_row
+
+    @property
+    def account(self) -> int:
+        return self._account
+
+    def _set_up_cash(self, balances: dict):
+        # the book already has the starting balances, and the currencies every account can hold
+        self._currency_ids = self._book.currency_ids
+        self._cash = self._book.cash[self._account]
+        self._set_fx_matrix()
+
+    def _add_currency(self, currency: str):
+        if currency not in self._currency_ids:
+            raise KeyError(f"{currency} is not in the book's currencies {self._book.currencies}")
+
+    def _share_bars(self, account):
+        self._symbols = account._symbols
+        self._bar_cache = account._bar_cache
+        self._align_price = account._align_price
+        self._capacity_ids = account._capacity_ids
+        self._quote_currencies = account._quote_currencies
+        self._capacity = np.full(len(self._capacity_ids), np.nan)
+
+    def _do_buy(self, quantity_to_buy, symbol, unit_price):
+        lot = super()._do_buy(quantity_to_buy, symbol, unit_price)
+        self._book.set_quantity(self._account, symbol, self._assets_held[symbol].quantity)
+        return lot
+
+    def _do_sell(self, quantity_to_sell, symbol, unit_price):
+        sold = super()._do_sell(quantity_to_sell, symbol, unit_price)
+        if sold:
+            self._book.set_quantity(self._account, symbol, self._assets_held[symbol].quantity)
+        return sold
+
+    def snapshot(self, path: str):
+        raise NotImplementedError("Accounts in a MultiAccountBackTest can't be snapshotted alone")
+
+
+class MultiAccountBackTest:
+    # N independent accounts stepping through the same bars on one clock, eg. one per strategy
+    # variant. bars are loaded once, and each symbol's bar row is looked up once per tick no
+    # matter how many accounts ask for it. every account is a BackTestAccount, so strategies
+    # trade against accounts[i] just like they would a BackTestAPI
+    def __init__(
+        self,
+        time_manager,
+        account_count: int,
+        back_testing_balance=100000,
+        symbol_objects: set = None,
+        order_archive: str = None,
+        **kwargs,
+    ):
+        # kwargs are passed on to every account, eg. sell_metric, buy_metric, instrument. if
+        # order_archive is given, each account archives into its own directory under it
+        symbol_objects = list(symbol_objects or [])
+        symbols = [symbol.yf_symbol for symbol in symbol_objects]
+        self._time_manager = time_manager
+        self._back_testing_balance = back_testing_balance
+
+        # with a dict of starting balances, the book holds every currency the symbols are quoted
+        # in too, the same as a multi currency BackTestAPI would
+        default_currency = kwargs.get("default_currency", "USD")
+        if isinstance(back_testing_balance, dict):
+            currencies = ledger_currencies(default_currency, back_testing_balance, symbols)
+        else:
+            currencies = [default_currency]
+
+        self.book = AccountBook(
+            account_count,
+            symbols=symbols,
+            back_testing_balance=back_testing_balance,
+            currencies=currencies,
+        )
+
+        # the row each symbol is at for _rows_period
+        self._rows = {}
+        self._rows_period = None
+
+        self.accounts = []
+        for account in range(account_count):
+            if order_archive:
+                kwargs["order_archive"] = os.path.join(order_archive, f"account-{account:04d}")
+
+            if account == 0:
+                self.accounts.append(
+                    BackTestAccount(self, account, symbol_objects=symbol_objects, **kwargs)
+                )
+                self._bar_cache = self.accounts[0]._bar_cache
+                continue
+
+            this_account = BackTestAccount(self, account, **kwargs)
+            this_account._share_bars(self.accounts[0])
+            self.accounts.append(this_account)
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def __getitem__(self, account: int) -> BackTestAccount:
+        return self.accounts[account]
+
+    def __iter__(self):
+        return iter(self.accounts)
+
+    @property
+    def period(self):
+        return self._time_manager.now
+
+    def _get_row(self, symbol):
+        period = self._time_manager.now
+        if period is not self._rows_period:
+            self._rows = {}
+            self._rows_period = period
+
+        if symbol not in self._rows:
+            if symbol not in self._bar_cache:
+                raise KeyError(f"{symbol} is not registered in {self}")
+            self._rows[symbol] = self._bar_cache[symbol].row(period)
+        return self._rows[symbol]
+
+    def settle(self):
+        # settles every account against the current period, eg. before reading balances
+        for account in self.accounts:
+            account._update_order_status()
+
+    def balances(self) -> np.ndarray:
+        # cash in the default currency
+        self.settle()
+        return self.book.cash[:, 0].copy()
+
+    def cash(self) -> DataFrame:
+        # cash held, one row per account and one column per currency
+        self.settle()
+        return DataFrame(self.book.cash.copy(), columns=self.book.currencies)
+
+    def positions(self) -> DataFrame:
+        # held quantity, one row per account and one column per symbol
+        self.settle()
+        return DataFrame(self.book.quantities.copy(), columns=self.book.symbols)
+
+    def equity(self) -> np.ndarray:
+        # cash plus positions marked at each symbol's last close at or before the clock, all in
+        # the default currency at this tick's FX rates
+        self.settle()
+        account = self.accounts[0]
+        rates = account._fx_rates
+
+        marks = np.zeros(len(self.book.symbols))
+        for symbol_id, symbol in enumerate(self.book.symbols):
+            bars = self._bar_cache[symbol]
+            column = "Close" if "Close" in bars.columns else account.sell_metric
+            row = bars.row_at_or_before(self.period)
+            if row is not None:
+                rate = rates.item(self.book.currency_ids[account._quote_currencies[symbol]])
+                marks[symbol_id] = bars.value(column, row) * rate
+
+        if len(self.book.currencies) == 1:
+            cash = self.book.cash[:, 0]
+        else:
+            cash = self.book.cash @ rates
+        return cash + self.book.position_values(marks)
@@ -0,0 +1,155 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pandas import DataFrame
+import logging
+import random
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # windows
+    resource = None
+
+log = logging.getLogger(__name__)
+
+# symbol objects loaded by this worker process, so each worker only reads the bars once
+_worker_symbols = None
+
+
+def expand_param_grid(param_grid) -> list:
+    # accepts either a list of param dicts, or a dict of {param: [values]} to take the product of
+    if isinstance(param_grid, dict):
+        names = list(param_grid)
+        return [dict(zip(names, values)) for values in product(*param_grid.values())]
+    return list(param_grid)
+
+
+def run_seed(seed: int, run_index: int) -> int:
+    # independent, reproducible seed for each run regardless of which worker picks it up
+    return int(np.random.SeedSequence([seed, run_index]).generate_state(1)[0])
+
+
+def summarise_run(api, back_testing_balance) -> dict:
+    # back_testing_balance is whatever the BackTestAPI started with, including a dict of
+    # {currency: balance}. everything is reported in the default currency
+    orders = api.list_orders()
+    filled = [order for order in orders if order.status_summary == "filled"]
+    cancelled = [order for order in orders if order.status_summary == "cancelled"]
+
+    final = api.get_equity()
+    equity_curve = api.equity_curve()
+    peaks = equity_curve["equity"].cummax()
+
+    # a dict of starting balances is valued at the FX rates of the first period that settled
+    starting_equity = back_testing_balance
+    if isinstance(back_testing_balance, dict):
+        starting_equity = api.value_balances(back_testing_balance, equity_curve.index[0])
+
+    return {
+        "final_balance": final["cash"],
+        "position_value": final["position_value"],
+        "final_equity": final["equity"],
+        "return": final["equity"] / starting_equity - 1,
+        "realized_pnl": api.get_realized_pnl(),
+        "max_drawdown": float((1 - equity_curve["equity"] / peaks).max()),
+        "max_gross_exposure": float(equity_curve["gross_exposure"].max()),
+        "orders": len(orders),
+        "fills": len(filled),
+        "cancelled": len(cancelled),
+        "filled_value": sum(order.filled_total_value for order in filled),
+    }
+
+
+def _init_worker(load_symbols, max_worker_memory):
+    global _worker_symbols
+
+    if max_worker_memory:
+        if resource is None:
+            log.warning("Unable to cap worker memory on this platform")
+        else:
+            resource.setrlimit(resource.RLIMIT_AS, (max_worker_memory, max_worker_memory))
+
+    _worker_symbols = load_symbols()
+
+
+def _run_one(strategy, run_index, params, back_testing_balance, seed):
+    row = {"run": run_index, "seed": seed}
+    row.update(params)
+
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+    try:
+        api = strategy(_worker_symbols, params, back_testing_balance, seed)
+        row.update(summarise_run(api, back_testing_balance))
+        row["error"] = None
+    except Exception as e:
+        log.exception(f"Run {run_index} failed with params {params}")
+        row["error"] = repr(e)
+
+    return row
+
+
+class SweepRunner:
+    # runs one strategy over many parameter sets in a process pool. load_symbols() is called once
+    # per worker to build the symbol objects that BackTestAPI._put_symbol takes, and
+    # strategy(symbol_objects, params, back_testing_balance, seed) runs one back test and returns
+    # the finished BackTestAPI. both need to be picklable, ie. module level functions
+    def __init__(
+        self,
+        strategy,
+        load_symbols,
+        back_testing_balance: float = 100000,
+        max_workers: int = None,
+        max_worker_memory: int = None,
+        max_tasks_per_child: int = None,
+        seed: int = 0,
+    ):
+        # max_workers=0 runs everything in this process, which is handy for debugging a strategy.
+        # max_worker_memory is the address space cap in bytes for each worker
+        self.strategy = strategy
+        self.load_symbols = load_symbols
+        self.back_testing_balance = back_testing_balance
+        self.max_workers = max_workers
+        self.max_worker_memory = max_worker_memory
+        self.max_tasks_per_child = max_tasks_per_child
+        self.seed = seed
+
+    def run(self, param_grid) -> DataFrame:
+        all_params = expand_param_grid(param_grid)
+        seeds = [run_seed(self.seed, run_index) for run_index in range(len(all_params))]
+
+        if self.max_workers == 0:
+            _init_worker(self.load_symbols, None)
+            rows = [
+                _run_one(self.strategy, run_index, params, self.back_testing_balance, seed)
+                for run_index, (params, seed) in enumerate(zip(all_params, seeds))
+            ]
+            return DataFrame(rows).set_index("run")
+
+        # max_tasks_per_child only exists from python 3.11, so it's only passed when it's used
+        pool_kwargs = {}
+        if self.max_tasks_per_child is not None:
+            pool_kwargs["max_tasks_per_child"] = self.max_tasks_per_child
+
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.load_symbols, self.max_worker_memory),
+            **pool_kwargs,
+        ) as pool:
+            futures = [
+                pool.submit(
+                    _run_one,
+                    self.strategy,
+                    run_index,
+                    params,
+                    self.back_testing_balance,
+                    seed,
+                )
+                for run_index, (params, seed) in enumerate(zip(all_params, seeds))
+            ]
+            rows = [future.result() for future in futures]
+
+        return DataFrame(rows).set_index("run")
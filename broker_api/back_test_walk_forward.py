@@ -0,0 +1,202 @@
+from pandas import DataFrame, DatetimeIndex, Timedelta, Timestamp, concat
+import logging
+import os
+import numpy as np
+
+from .back_test import BackTestAPI, BackTestClock
+from .back_test_sweep import summarise_run
+
+log = logging.getLogger(__name__)
+
+
+class WindowSymbol:
+    # stands in for a symbol object within one window, the same way StoredSymbol does for a
+    # BarStore - bar_cache is a view over the bars loaded for the whole run
+    yf_symbol: str
+    bar_cache: object
+
+    def __init__(self, yf_symbol: str, bar_cache, align_price):
+        self.yf_symbol = yf_symbol
+        self.bar_cache = bar_cache
+        self.align_price = align_price
+
+
+class Window:
+    # one train/test split. train is {symbol: BarCache view} of the training bars, periods is
+    # every bar time in the test range, and params is whatever fit() returned for this window
+    def __init__(self, number: int, train_start, train_end, test_start, test_end):
+        self.number = number
+        self.train_start = train_start
+        self.train_end = train_end
+        self.test_start = test_start
+        self.test_end = test_end
+        self.train = {}
+        self.periods = None
+        self.params = None
+
+    def as_dict(self) -> dict:
+        return {
+            "train_start": self.train_start,
+            "train_end": self.train_end,
+            "test_start": self.test_start,
+            "test_end": self.test_end,
+        }
+
+
+class WalkForwardRunner:
+    # rolling train/test windows over one load of the bars. every window trades a fresh
+    # BackTestAPI over views of the same bar caches, so nothing gets reparsed or copied and the
+    # price search levels built in one window are there for the next.
+    #
+    # fit(window) -> params is optional and gets the training bars in window.train. then
+    # strategy(api, clock, window) trades the test range, stepping clock through window.periods.
+    # each window starts flat with the previous window's final equity as cash, so the out of
+    # sample equity curves join up into one continuous record
+    def __init__(
+        self,
+        strategy,
+        symbol_objects,
+        train: str,
+        test: str,
+        step: str = None,
+        fit=None,
+        back_testing_balance: float = 100000,
+        order_archive: str = None,
+        **kwargs,
+    ):
+        # train, test and step are pandas timedeltas, eg. "30D". step defaults to test, so the
+        # test ranges sit end to end. kwargs are passed on to every window's BackTestAPI
+        self.strategy = strategy
+        self.fit = fit
+        self.train = Timedelta(train)
+        self.test = Timedelta(test)
+        self.step = Timedelta(step) if step else self.test
+        self.back_testing_balance = back_testing_balance
+        self.order_archive = order_archive
+        self.kwargs = kwargs
+
+        if self.step <= Timedelta(0) or self.test <= Timedelta(0):
+            raise ValueError("test and step need to be longer than zero")
+        if isinstance(back_testing_balance, dict):
+            raise ValueError("Equity carries forward in one currency, so give a single balance")
+
+        # registering everything with one BackTestAPI builds and checks the bar caches exactly
+        # the way each window's would, and gives the asset registry every window shares
+        loader = BackTestAPI(BackTestClock(), symbol_objects=symbol_objects, **kwargs)
+        self._bar_cache = loader._bar_cache
+        self._align_price = loader._align_price
+        self._asset_registry = loader._asset_registry
+
+        self._tz = next((bars.tz for bars in self._bar_cache.values() if bars.tz), None)
+        self._timestamps = np.unique(
+            np.concatenate([bars.timestamps for bars in self._bar_cache.values()])
+        )
+
+        self.results = None
+        self._equity = []
+
+    def _timestamp(self, value: int) -> Timestamp:
+        timestamp = Timestamp(value)
+        if self._tz:
+            return timestamp.tz_localize("UTC").tz_convert(self._tz)
+        return timestamp
+
+    def windows(self) -> list:
+        windows = []
+        if not len(self._timestamps):
+            return windows
+
+        first = self._timestamps[0]
+        last = self._timestamps[-1]
+        train_start = first
+        while train_start + self.train.value <= last:
+            train_end = train_start + self.train.value
+            test_end = train_end + self.test.value
+            windows.append(
+                Window(
+                    len(windows),
+                    self._timestamp(train_start),
+                    self._timestamp(train_end),
+                    self._timestamp(train_end),
+                    self._timestamp(test_end),
+                )
+            )
+            train_start += self.step.value
+
+        return windows
+
+    def _views(self, start, end) -> dict:
+        views = {}
+        for symbol, bars in self._bar_cache.items():
+            views[symbol] = bars.view(*bars.rows_between(start, end))
+        return views
+
+    def _run_window(self, window: Window, balance: float) -> tuple:
+        window.train = self._views(window.train_start, window.train_end)
+        if self.fit:
+            window.params = self.fit(window)
+
+        start, end = np.searchsorted(
+            self._timestamps, [window.test_start.value, window.test_end.value]
+        )
+        window.periods = DatetimeIndex(self._timestamps[start:end].view("datetime64[ns]"))
+        if self._tz:
+            window.periods = window.periods.tz_localize("UTC").tz_convert(self._tz)
+
+        symbols = [
+            WindowSymbol(symbol, bars, self._align_price[symbol])
+            for symbol, bars in self._views(window.test_start, window.test_end).items()
+        ]
+
+        kwargs = dict(self.kwargs)
+        kwargs.setdefault("asset_registry", self._asset_registry)
+        if self.order_archive:
+            kwargs["order_archive"] = os.path.join(
+                self.order_archive, f"window-{window.number:04d}"
+            )
+
+        clock = BackTestClock()
+        api = BackTestAPI(
+            clock,
+            back_testing_balance=balance,
+            symbol_objects=symbols,
+            **kwargs,
+        )
+        if len(window.periods):
+            clock.now = window.periods[0]
+
+        self.strategy(api, clock, window)
+        return api, summarise_run(api, balance)
+
+    def run(self) -> DataFrame:
+        # one row per window, with its dates, params (if fit returned a dict) and the same
+        # summary a sweep reports
+        rows = []
+        self._equity = []
+        balance = self.back_testing_balance
+
+        for window in self.windows():
+            api, summary = self._run_window(window, balance)
+            log.info(
+                f"Window {window.number} {window.test_start} to {window.test_end}: "
+                f"equity {balance} -> {summary['final_equity']}"
+            )
+
+            row = {"window": window.number, **window.as_dict()}
+            if isinstance(window.params, dict):
+                row.update(window.params)
+            row["starting_balance"] = balance
+            row.update(summary)
+            rows.append(row)
+
+            self._equity.append(api.equity_curve())
+            balance = summary["final_equity"]
+
+        self.results = DataFrame(rows).set_index("window") if rows else DataFrame()
+        return self.results
+
+    def equity_curve(self) -> DataFrame:
+        # every window's out of sample equity curve, end to end
+        if not self._equity:
+            return DataFrame(columns=["cash", "position_value", "gross_exposure", "equity"])
+        return concat(self._equity)
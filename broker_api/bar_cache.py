@@ -0,0 +1,217 @@
+import numpy as np
+from pandas import DatetimeIndex, Timestamp
+
+BAR_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# how many rows get summarised into one entry of the next level up when searching for the first
+# bar that crosses a price. 64 keeps the search structures at ~1/63rd the size of the column
+SEARCH_BLOCK = 64
+
+
+class BarCache:
+    # contiguous numpy copies of a symbol's OHLCV bars, so that order settlement can read a
+    # single float out of an array instead of going through DataFrame.loc for every order
+    timestamps: np.ndarray
+    columns: dict
+
+    def __init__(self, timestamps: np.ndarray, columns: dict, tz: str = None):
+        # timestamps are int64 nanoseconds since epoch (UTC if the source index was tz aware)
+        self.timestamps = timestamps
+        self.columns = columns
+        self.tz = tz
+
+        # bars get read in clock order, so remember where the last lookup landed
+        self._cursor = 0
+
+        # (column, "min"/"max") -> list of block reductions, built the first time they're needed
+        self._search_levels = {}
+
+        # (cache, first row) for views, which search through the cache they're a view of
+        self._base = None
+
+    @classmethod
+    def from_frame(cls, bars, extra_columns=()):
+        index = DatetimeIndex(bars.index)
+        timestamps = np.ascontiguousarray(index.values.astype("datetime64[ns]").view("int64"))
+
+        columns = {}
+        for column in BAR_COLUMNS + tuple(extra_columns):
+            if column in bars.columns and column not in columns:
+                columns[column] = np.ascontiguousarray(bars[column].to_numpy(dtype="float64"))
+
+        return cls(timestamps=timestamps, columns=columns, tz=str(index.tz) if index.tz else None)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def view(self, start: int, end: int):
+        # rows [start, end) without copying anything. price searches go through the full cache,
+        # so every view of it shares the one set of search levels
+        view = BarCache(
+            timestamps=self.timestamps[start:end],
+            columns={column: values[start:end] for column, values in self.columns.items()},
+            tz=self.tz,
+        )
+
+        start = min(max(start, 0), len(self))
+        if self._base is None:
+            view._base = (self, start)
+        else:
+            base, offset = self._base
+            view._base = (base, offset + start)
+        return view
+
+    def rows_between(self, start, end) -> tuple:
+        # first row at or after start, and first row at or after end - ie. the rows for a view
+        # of [start, end)
+        return (
+            int(np.searchsorted(self.timestamps, Timestamp(start).value)),
+            int(np.searchsorted(self.timestamps, Timestamp(end).value)),
+        )
+
+    def index(self) -> DatetimeIndex:
+        index = DatetimeIndex(self.timestamps.view("datetime64[ns]"))
+        if self.tz:
+            return index.tz_localize("UTC").tz_convert(self.tz)
+        return index
+
+    def row(self, period):
+        # returns the row number for period, or None if there is no bar at exactly that time
+        value = Timestamp(period).value
+        timestamps = self.timestamps
+        cursor = self._cursor
+
+        # fast path - same bar as last time, or the one straight after it
+        if cursor < len(timestamps) and timestamps[cursor] == value:
+            return cursor
+        if cursor + 1 < len(timestamps) and timestamps[cursor + 1] == value:
+            self._cursor = cursor + 1
+            return cursor + 1
+
+        position = int(np.searchsorted(timestamps, value))
+        if position < len(timestamps) and timestamps[position] == value:
+            self._cursor = position
+            return position
+
+        return None
+
+    def timestamp(self, row: int) -> Timestamp:
+        timestamp = Timestamp(int(self.timestamps[row]))
+        if self.tz:
+            return timestamp.tz_localize("UTC").tz_convert(self.tz)
+        return timestamp
+
+    def row_at_or_before(self, period):
+        # the last bar at or before period, or None if period is before the first bar
+        position = int(np.searchsorted(self.timestamps, Timestamp(period).value, side="right")) - 1
+        if position < 0:
+            return None
+        return position
+
+    def value(self, column: str, row: int) -> float:
+        return float(self.columns[column][row])
+
+    def first_below(self, column: str, starts, prices, inclusive: bool = False) -> np.ndarray:
+        # for each (start, price) pair, the first row >= start where column < price (or <= if
+        # inclusive). rows that never cross come back as len(self)
+        return self._search(column, "min", starts, prices, below=True, inclusive=inclusive)
+
+    def first_above(self, column: str, starts, prices, inclusive: bool = False) -> np.ndarray:
+        # as per first_below, but looking for column > price (or >= if inclusive)
+        return self._search(column, "max", starts, prices, below=False, inclusive=inclusive)
+
+    def _search(self, column, kind, starts, prices, below, inclusive) -> np.ndarray:
+        starts = np.asarray(starts, dtype=np.int64)
+        prices = np.asarray(prices, dtype="float64")
+
+        if self._base is not None:
+            # a crossing past the end of the view is no crossing at all
+            base, offset = self._base
+            rows = base._search(
+                column, kind, np.minimum(starts, len(self)) + offset, prices, below, inclusive
+            )
+            return np.minimum(rows - offset, len(self))
+
+        return _first_crossing(
+            self._get_search_levels(column, kind), starts, prices, below=below, inclusive=inclusive
+        )
+
+    def _get_search_levels(self, column: str, kind: str) -> list:
+        key = (column, kind)
+        if key not in self._search_levels:
+            if kind == "min":
+                reducer, padding = np.fmin, np.inf
+            else:
+                reducer, padding = np.fmax, -np.inf
+
+            levels = [self.columns[column]]
+            while len(levels[-1]) > SEARCH_BLOCK:
+                previous = levels[-1]
+                pad = -len(previous) % SEARCH_BLOCK
+                padded = np.concatenate([previous, np.full(pad, padding)])
+                levels.append(reducer.reduce(padded.reshape(-1, SEARCH_BLOCK), axis=1))
+
+            self._search_levels[key] = levels
+
+        return self._search_levels[key]
+
+
+def _crosses(values, prices, below, inclusive):
+    if below:
+        return values <= prices if inclusive else values < prices
+    return values >= prices if inclusive else values > prices
+
+
+def _scan(values, starts, ends, prices, below, inclusive):
+    # looks through values[start:end] for each row, where end - start <= SEARCH_BLOCK. returns
+    # the first crossing row, or -1 if there wasn't one
+    offsets = np.arange(SEARCH_BLOCK)
+    rows = starts[:, None] + offsets
+    in_range = rows < ends[:, None]
+    window = values[np.minimum(rows, len(values) - 1)]
+
+    hits = in_range & _crosses(window, prices[:, None], below, inclusive)
+    found = hits.any(axis=1)
+
+    result = np.full(len(starts), -1, dtype=np.int64)
+    result[found] = rows[found, hits[found].argmax(axis=1)]
+    return result
+
+
+def _first_crossing(levels, starts, prices, below, inclusive):
+    # levels[0] is the raw column and levels[k + 1] is levels[k] reduced over blocks of
+    # SEARCH_BLOCK rows. check the rest of the starting block, then find the first block that
+    # crosses one level up, then pinpoint the row inside that block
+    values = levels[0]
+    length = len(values)
+    result = np.full(len(starts), length, dtype=np.int64)
+    if length == 0 or len(starts) == 0:
+        return result
+
+    starts = np.minimum(starts, length)
+    block_ends = np.minimum((starts // SEARCH_BLOCK + 1) * SEARCH_BLOCK, length)
+    nearby = _scan(values, starts, block_ends, prices, below, inclusive)
+    found = nearby >= 0
+    result[found] = nearby[found]
+
+    if len(levels) == 1 or found.all():
+        return result
+
+    remaining = np.flatnonzero(~found)
+    blocks = _first_crossing(
+        levels[1:], starts[remaining] // SEARCH_BLOCK + 1, prices[remaining], below, inclusive
+    )
+    in_range = blocks < len(levels[1])
+    remaining = remaining[in_range]
+    blocks = blocks[in_range]
+
+    block_starts = blocks * SEARCH_BLOCK
+    result[remaining] = _scan(
+        values,
+        block_starts,
+        np.minimum(block_starts + SEARCH_BLOCK, length),
+        prices[remaining],
+        below,
+        inclusive,
+    )
+    return result
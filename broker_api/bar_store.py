@@ -0,0 +1,206 @@
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import logging
+import os
+import uuid
+import numpy as np
+
+from .asset_registry import price_decimals
+from .bar_cache import BarCache, BAR_COLUMNS
+
+log = logging.getLogger(__name__)
+
+# each symbol is stored as one contiguous block: int64 timestamps followed by one float64 array
+# per column, all the same length
+ITEM_SIZE = 8
+
+# whether this process shares the resource tracker of whoever created the shared memory
+_shared_tracker = None
+
+
+def _attach_shared_memory(name: str) -> SharedMemory:
+    try:
+        # python 3.13+ can be told not to track segments it didn't create
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+
+    global _shared_tracker
+    if _shared_tracker is None:
+        # pool workers share the resource tracker of the process that created the store, so
+        # attaching just re-registers the same name. an unrelated process would start its own
+        # tracker though, which unlinks the segment when this process exits and pulls it out from
+        # under everyone else. this has to be checked before the first attach starts a tracker
+        _shared_tracker = getattr(resource_tracker._resource_tracker, "_fd", None) is not None
+
+    shm = SharedMemory(name=name)
+    if not _shared_tracker:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class StoredSymbol:
+    # stands in for a symbol object when registering bars from a BarStore with
+    # BackTestAPI._put_symbol, so workers don't need to load and parse their own copy of the bars
+    yf_symbol: str
+    bar_cache: BarCache
+
+    def __init__(self, yf_symbol: str, bar_cache: BarCache, min_price_increment: float, store):
+        self.yf_symbol = yf_symbol
+        self.bar_cache = bar_cache
+        self.min_price_increment = min_price_increment
+
+        # keep the backing memory alive for as long as anything holds this symbol
+        self._store = store
+
+    def align_price(self, price):
+        if not self.min_price_increment:
+            return price
+
+        increment = self.min_price_increment
+        return round(round(price / increment) * increment, price_decimals(increment))
+
+
+class BarStore:
+    # OHLCV arrays and their timestamp index, written once into shared memory (or memory mapped
+    # files if given a directory) and attached to read-only from any number of processes. the
+    # manifest is a plain dict that can be pickled across to the attaching processes
+    manifest: dict
+
+    def __init__(self, manifest: dict, blocks: dict, owner: bool):
+        self.manifest = manifest
+        self._blocks = blocks
+        self._owner = owner
+        self._symbols = {}
+
+    @classmethod
+    def create(
+        cls,
+        symbol_objects=None,
+        bars: dict = None,
+        columns=BAR_COLUMNS,
+        price_increments: dict = None,
+        path: str = None,
+    ):
+        # takes either symbol objects (as per BackTestAPI) or {symbol: DataFrame}.
+        # price_increments is {symbol: min_price_increment}, used by StoredSymbol.align_price
+        if symbol_objects is not None:
+            bars = {symbol.yf_symbol: symbol.ohlc.bars for symbol in symbol_objects}
+        if not bars:
+            raise ValueError("Need either symbol_objects or bars to create a BarStore")
+
+        price_increments = price_increments or {}
+        kind = "mmap" if path else "shm"
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+        manifest = {"kind": kind, "symbols": {}}
+        blocks = {}
+
+        for symbol, symbol_bars in bars.items():
+            cache = BarCache.from_frame(symbol_bars, extra_columns=columns)
+            stored_columns = [column for column in columns if column in cache.columns]
+            length = len(cache)
+            size = max(1, length * ITEM_SIZE * (1 + len(stored_columns)))
+
+            if kind == "shm":
+                name = f"bars_{uuid.uuid4().hex[:16]}"
+                block = SharedMemory(name=name, create=True, size=size)
+                buffer = block.buf
+            else:
+                name = os.path.join(path, f"{symbol}.bars")
+                block = np.memmap(name, dtype=np.uint8, mode="w+", shape=(size,))
+                buffer = block
+
+            np.ndarray(length, dtype=np.int64, buffer=buffer)[:] = cache.timestamps
+            for number, column in enumerate(stored_columns):
+                offset = (number + 1) * length * ITEM_SIZE
+                np.ndarray(length, dtype="float64", buffer=buffer, offset=offset)[:] = cache.columns[
+                    column
+                ]
+
+            if kind == "mmap":
+                block.flush()
+
+            blocks[symbol] = block
+            manifest["symbols"][symbol] = {
+                "name": name,
+                "length": length,
+                "tz": cache.tz,
+                "columns": stored_columns,
+                "min_price_increment": price_increments.get(symbol),
+            }
+
+        return cls(manifest=manifest, blocks=blocks, owner=True)
+
+    @classmethod
+    def attach(cls, manifest: dict):
+        blocks = {}
+        for symbol, details in manifest["symbols"].items():
+            if manifest["kind"] == "shm":
+                blocks[symbol] = _attach_shared_memory(details["name"])
+            else:
+                blocks[symbol] = np.memmap(details["name"], dtype=np.uint8, mode="r")
+
+        return cls(manifest=manifest, blocks=blocks, owner=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    def bar_cache(self, symbol: str) -> BarCache:
+        # zero copy, read only views over the stored arrays
+        details = self.manifest["symbols"][symbol]
+        block = self._blocks[symbol]
+        buffer = block.buf if self.manifest["kind"] == "shm" else block
+        length = details["length"]
+
+        timestamps = np.ndarray(length, dtype=np.int64, buffer=buffer)
+        timestamps.flags.writeable = False
+
+        columns = {}
+        for number, column in enumerate(details["columns"]):
+            offset = (number + 1) * length * ITEM_SIZE
+            columns[column] = np.ndarray(length, dtype="float64", buffer=buffer, offset=offset)
+            columns[column].flags.writeable = False
+
+        return BarCache(timestamps=timestamps, columns=columns, tz=details["tz"])
+
+    def symbols(self) -> list:
+        for symbol, details in self.manifest["symbols"].items():
+            if symbol not in self._symbols:
+                self._symbols[symbol] = StoredSymbol(
+                    yf_symbol=symbol,
+                    bar_cache=self.bar_cache(symbol),
+                    min_price_increment=details["min_price_increment"],
+                    store=self,
+                )
+
+        return list(self._symbols.values())
+
+    def close(self):
+        self._symbols = {}
+        for symbol, block in self._blocks.items():
+            if self.manifest["kind"] != "shm":
+                continue
+            try:
+                block.close()
+            except BufferError:
+                log.debug(f"{symbol}: Bars still in use, leaving shared memory mapped")
+
+    def unlink(self):
+        # only the creating process should do this, once every worker is done with the bars
+        for symbol, details in self.manifest["symbols"].items():
+            if self.manifest["kind"] == "shm":
+                self._blocks[symbol].unlink()
+            else:
+                os.remove(details["name"])
+
+
+def attach_symbols(manifest: dict) -> list:
+    # for use as SweepRunner's load_symbols, eg. functools.partial(attach_symbols, store.manifest)
+    return BarStore.attach(manifest).symbols()
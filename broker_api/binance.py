@@ -18,6 +18,7 @@ import pandas as pd
 import boto3
 import logging
 import math
+import sys
 from dateutil.relativedelta import relativedelta
 
 
@@ -34,6 +35,8 @@ DUST_SELL = 8
 
 
 class OrderResult(IOrderResult):
+    __slots__ = ()
+
     def __init__(self, response, binance_to_yf_symbol_map: dict):
         self._raw_response = response
 
@@ -44,7 +47,7 @@ class OrderResult(IOrderResult):
         self.order_type_text = ORDER_MAP_INVERTED[self.order_type]
 
         self.order_id = response.id
-        self.symbol = self._to_yf(response.symbol, binance_to_yf_symbol_map)
+        self.symbol = sys.intern(self._to_yf(response.symbol, binance_to_yf_symbol_map))
 
         if response.type == "limit":
             self.ordered_unit_quantity = float(response.qty)
@@ -67,7 +70,7 @@ class OrderResult(IOrderResult):
             self.filled_total_value = None
 
         self.status = ORDER_STATUS_TEXT_INVERTED[response.status]
-        self.status_text = response.status
+        self.status_text = sys.intern(response.status)
         self.status_summary = ORDER_STATUS_ID_TO_SUMMARY[self.status]
 
         self.success = (
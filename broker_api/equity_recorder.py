@@ -0,0 +1,72 @@
+from pandas import DataFrame, DatetimeIndex
+import numpy as np
+
+
+class EquityRecorder:
+    # cash, marked to market position value and gross exposure for every settled period, written
+    # into preallocated arrays that double in size when they fill up
+    def __init__(self, capacity: int = 1024, tz: str = None):
+        self.tz = tz
+        self._size = 0
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._cash = np.empty(capacity, dtype="float64")
+        self._position_value = np.empty(capacity, dtype="float64")
+        self._gross_exposure = np.empty(capacity, dtype="float64")
+
+    def __len__(self):
+        return self._size
+
+    def record(self, timestamp: int, cash: float, position_value: float, gross_exposure: float):
+        # timestamp is nanoseconds. settling the same period again overwrites its row
+        size = self._size
+        if size and self._timestamps[size - 1] == timestamp:
+            size -= 1
+        elif size == len(self._timestamps):
+            self._grow()
+
+        self._timestamps[size] = timestamp
+        self._cash[size] = cash
+        self._position_value[size] = position_value
+        self._gross_exposure[size] = gross_exposure
+        self._size = size + 1
+
+    def _grow(self):
+        capacity = max(1, len(self._timestamps) * 2)
+        for name in ("_timestamps", "_cash", "_position_value", "_gross_exposure"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    def latest(self) -> dict:
+        # the last recorded row, as to_frame would have it
+        row = self._size - 1
+        if row < 0:
+            raise ValueError("No periods have been recorded yet")
+
+        cash = self._cash.item(row)
+        position_value = self._position_value.item(row)
+        return {
+            "cash": cash,
+            "position_value": position_value,
+            "gross_exposure": self._gross_exposure.item(row),
+            "equity": cash + position_value,
+        }
+
+    def to_frame(self) -> DataFrame:
+        size = self._size
+        index = DatetimeIndex(self._timestamps[:size].view("datetime64[ns]"), name="period")
+        if self.tz:
+            index = index.tz_localize("UTC").tz_convert(self.tz)
+
+        cash = self._cash[:size].copy()
+        position_value = self._position_value[:size].copy()
+        return DataFrame(
+            {
+                "cash": cash,
+                "position_value": position_value,
+                "gross_exposure": self._gross_exposure[:size].copy(),
+                "equity": cash + position_value,
+            },
+            index=index,
+        )
@@ -0,0 +1,112 @@
+import numpy as np
+
+# basis points per unit
+BPS = 1e-4
+
+
+class FixedSlippage:
+    # takers pay bps worse than the bar price, buying higher and selling lower
+    columns = ()
+
+    def __init__(self, bps: float):
+        self.bps = bps
+
+    def slippage(self, prices, quantities, buys, columns) -> np.ndarray:
+        return np.full(len(prices), self.bps * BPS)
+
+
+class SpreadSlippage:
+    # takers cross half the spread. the spread is either a fixed spread_bps, or read off the bar
+    # from column as an absolute price (eg. the average ask minus bid over the bar)
+    def __init__(self, spread_bps: float = None, column: str = None):
+        if (spread_bps is None) == (column is None):
+            raise ValueError("Give SpreadSlippage either spread_bps or column")
+
+        self.spread_bps = spread_bps
+        self.column = column
+        self.columns = (column,) if column else ()
+
+    def slippage(self, prices, quantities, buys, columns) -> np.ndarray:
+        if self.column is None:
+            return np.full(len(prices), self.spread_bps * BPS / 2)
+        return columns[self.column] / prices / 2
+
+
+class VolumeSlippage:
+    # square root market impact - slippage grows with the share of the bar's volume the order
+    # takes, as impact * (quantity / volume) ** exponent, and is capped at max_slippage. bars
+    # with no volume get max_slippage
+    columns = ("Volume",)
+
+    def __init__(self, impact: float = 0.1, exponent: float = 0.5, max_slippage: float = 0.05):
+        self.impact = impact
+        self.exponent = exponent
+        self.max_slippage = max_slippage
+
+    def slippage(self, prices, quantities, buys, columns) -> np.ndarray:
+        volumes = columns["Volume"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            participation = np.where(volumes > 0, quantities / volumes, np.inf)
+        return np.minimum(self.impact * participation**self.exponent, self.max_slippage)
+
+
+class FeeSchedule:
+    # fee as a fraction of the fill's value, for orders that add liquidity (maker) and those that
+    # take it (taker)
+    def __init__(self, maker: float, taker: float):
+        self.maker = maker
+        self.taker = taker
+
+    def rates(self, takers) -> np.ndarray:
+        return np.where(takers, self.taker, self.maker)
+
+
+# what the brokers charge at their lowest volume tier
+ALPACA_FEES = FeeSchedule(maker=0.0015, taker=0.0025)
+SWYFTX_FEES = FeeSchedule(maker=0.006, taker=0.006)
+
+FEE_SCHEDULES = {
+    "alpaca": ALPACA_FEES,
+    "swyftx": SWYFTX_FEES,
+}
+
+
+class FillModel:
+    # slippage and fees for a whole array of fills at once. market orders take liquidity, so they
+    # get slipped and pay taker fees. limit orders fill at their price and pay maker fees
+    def __init__(self, slippage=None, fees=None):
+        # fees is a FeeSchedule or the name of one in FEE_SCHEDULES
+        if isinstance(fees, str):
+            if fees not in FEE_SCHEDULES:
+                raise ValueError(f"Unknown fee schedule {fees}, choose from {list(FEE_SCHEDULES)}")
+            fees = FEE_SCHEDULES[fees]
+
+        self.slippage = slippage
+        self.fees = fees
+
+    @property
+    def columns(self) -> tuple:
+        # bar columns that apply() needs for each fill
+        return self.slippage.columns if self.slippage else ()
+
+    def apply(self, prices, quantities, buys, takers, columns: dict = None):
+        # prices are the fill prices before slippage, and columns is {column: value on each
+        # fill's bar} for whatever the slippage model asked for. returns the slipped prices and
+        # the fee rate for each fill
+        prices = np.asarray(prices, dtype="float64")
+        buys = np.asarray(buys, dtype=bool)
+        takers = np.asarray(takers, dtype=bool)
+
+        if self.slippage is not None:
+            slippage = self.slippage.slippage(
+                prices, np.asarray(quantities, dtype="float64"), buys, columns or {}
+            )
+            direction = np.where(buys, 1.0, -1.0)
+            prices = np.where(takers, prices * (1 + direction * slippage), prices)
+
+        if self.fees is None:
+            fee_rates = np.zeros(len(prices))
+        else:
+            fee_rates = self.fees.rates(takers)
+
+        return prices, fee_rates
@@ -0,0 +1,61 @@
+from pandas import DataFrame, DatetimeIndex
+import numpy as np
+
+
+def quote_currency(symbol: str, default: str) -> str:
+    # the currency a symbol is priced in, off its suffix, eg. BTC-USDT -> USDT. symbols without
+    # one (eg. AAPL) are priced in default
+    if "-" in symbol:
+        return symbol.rsplit("-", 1)[1]
+    return default
+
+
+def ledger_currencies(default: str, balances: dict, symbols) -> list:
+    # every currency a multi currency cash ledger needs - default first, then the ones there's a
+    # starting balance in, then whatever else symbols are quoted in
+    currencies = [default]
+    for currency in list(balances) + [quote_currency(symbol, default) for symbol in symbols]:
+        if currency not in currencies:
+            currencies.append(currency)
+    return currencies
+
+
+class FxRates:
+    # what one unit of each currency is worth in base over time. rates is a DataFrame indexed by
+    # time with a column per currency, or a dict of {currency: Series} which gets lined up and
+    # forward filled into one. base itself doesn't need a column. a tick uses the last rate at or
+    # before it, the same way a bar is marked
+    def __init__(self, rates, base: str = "USD"):
+        if isinstance(rates, dict):
+            rates = DataFrame(rates).sort_index().ffill()
+        else:
+            rates = rates.sort_index()
+
+        self.base = base
+        self.currencies = [base] + [currency for currency in rates.columns if currency != base]
+        self._ids = {currency: currency_id for currency_id, currency in enumerate(self.currencies)}
+
+        # nanoseconds since the epoch in UTC, the same as Timestamp(period).value
+        self.timestamps = np.ascontiguousarray(
+            DatetimeIndex(rates.index).values.astype("datetime64[ns]").view("int64")
+        )
+        self.values = np.ones((len(rates), len(self.currencies)), dtype="float64")
+        self.values[:, 1:] = rates[self.currencies[1:]].to_numpy(dtype="float64")
+
+    def __contains__(self, currency: str):
+        return currency in self._ids
+
+    def matrix(self, currencies: list, quote: str) -> np.ndarray:
+        # (times, currencies) array of what one unit of each of currencies is worth in quote,
+        # so a tick's rates for a ledger are one row of it
+        missing = [currency for currency in list(currencies) + [quote] if currency not in self]
+        if missing:
+            raise ValueError(f"No FX rates for {missing}, only {self.currencies}")
+
+        columns = [self._ids[currency] for currency in currencies]
+        return self.values[:, columns] / self.values[:, [self._ids[quote]]]
+
+    def row(self, period_ns: int):
+        # the last row at or before period_ns, or None if the rates start after it
+        row = int(np.searchsorted(self.timestamps, period_ns, side="right")) - 1
+        return row if row >= 0 else None
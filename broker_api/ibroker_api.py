@@ -62,6 +62,7 @@ class Account:
 
 
 class Position:
+    __slots__ = ("symbol", "quantity")
     symbol: str
     quantity: float
 
@@ -71,6 +72,9 @@ class Position:
 
 
 class Asset:
+    # id is only set by brokers that key their assets by one, eg. swyftx
+    __slots__ = ("symbol", "min_quantity", "min_quantity_increment", "min_price_increment", "id")
+
     def __init__(self, symbol, min_quantity, min_quantity_increment, min_price_increment):
         self.symbol = symbol
         self.min_quantity = min_quantity
@@ -78,8 +82,37 @@ class Asset:
         self.min_price_increment = min_price_increment
 
 
+def _slot_names(cls) -> list:
+    return [name for klass in cls.__mro__ for name in getattr(klass, "__slots__", ())]
+
+
 class IOrderResult(ABC):
-    _raw_response: dict
+    # long back tests hold on to millions of these, so they're slotted rather than carrying a
+    # __dict__ each. status and type text point at shared interned strings, and the broker's raw
+    # response lives in _raw - or if a subclass leaves that as None, gets rebuilt on demand by
+    # _materialize_raw_response()
+    __slots__ = (
+        "_raw",
+        "order_type",
+        "order_type_text",
+        "order_id",
+        "symbol",
+        "ordered_unit_quantity",
+        "ordered_unit_price",
+        "ordered_total_value",
+        "filled_unit_quantity",
+        "filled_unit_price",
+        "filled_total_value",
+        "status",
+        "status_text",
+        "status_summary",
+        "success",
+        "fees",
+        "create_time",
+        "update_time",
+        "closed",
+    )
+    _raw: dict
     order_type: int
     order_type_text: str
     order_id: str
@@ -103,10 +136,37 @@ class IOrderResult(ABC):
     def __init__(self, response: dict, orders_create_object):
         ...
 
+    @property
+    def _raw_response(self):
+        if self._raw is None:
+            self._raw = self._materialize_raw_response()
+        return self._raw
+
+    @_raw_response.setter
+    def _raw_response(self, response):
+        self._raw = response
+
+    def _materialize_raw_response(self):
+        return None
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in _slot_names(type(self)) if hasattr(self, name)}
+
+    def __setstate__(self, state):
+        # also takes the (__dict__, slots) state of results pickled before they were slotted
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **(state[1] or {})}
+
+        for name, value in state.items():
+            if name == "_raw_response":
+                name = "_raw"
+            setattr(self, name, value)
+
     def validate(self):
         failed = False
+        # checks _raw rather than _raw_response so that validating doesn't build the response
         required_attributes = [
-            "_raw_response",
+            "_raw",
             "status",
             "status_text",
             "status_summary",
@@ -129,6 +189,8 @@ class IOrderResult(ABC):
 
         for attribute in required_attributes:
             if not hasattr(self, attribute):
+                if attribute == "_raw":
+                    attribute = "_raw_response"
                 raise MalformedOrderResult(f"OrderResult is missing {attribute}")
         return True
 
@@ -0,0 +1,93 @@
+from collections import deque
+
+# anything smaller than this is float noise left over from partial lot sales
+DUST_UNITS = 1e-12
+
+
+class Lot:
+    __slots__ = ("units", "unit_price", "realized_pnl")
+
+    def __init__(self, units: float, unit_price: float):
+        self.units = units
+        self.unit_price = unit_price
+        self.realized_pnl = 0.0
+
+    def __repr__(self):
+        return (
+            f"Lot(units={self.units}, unit_price={self.unit_price}, "
+            f"realized_pnl={self.realized_pnl})"
+        )
+
+
+class LotLedger:
+    # FIFO holdings for a single symbol. quantity and cost are kept as running totals so that
+    # position queries don't need to walk the lots, and lots are dropped once fully sold so memory
+    # stays bounded. with keep_closed_lots they move to closed_lots instead, so each one's
+    # realized pnl can still be read
+    symbol: str
+    lots: deque
+    closed_lots: list  # None unless keep_closed_lots
+    quantity: float
+    cost: float
+    realized_pnl: float
+
+    def __init__(self, symbol: str, keep_closed_lots: bool = False):
+        self.symbol = symbol
+        self.lots = deque()
+        self.closed_lots = [] if keep_closed_lots else None
+        self.quantity = 0.0
+        self.cost = 0.0
+        self.realized_pnl = 0.0
+
+    def __len__(self):
+        return len(self.lots)
+
+    def buy(self, units: float, unit_price: float) -> Lot:
+        lot = Lot(units=units, unit_price=unit_price)
+        self.lots.append(lot)
+        self.quantity += units
+        self.cost += units * unit_price
+        return lot
+
+    def sell(self, units: float, unit_price: float) -> list:
+        # returns a list of (lot, units taken from that lot, realized pnl on those units)
+        if units > self.quantity + DUST_UNITS:
+            raise ValueError(
+                f"{self.symbol}: Unable to remove {units} units from holding of "
+                f"{self.quantity}, since that would be less than 0"
+            )
+
+        consumed = []
+        remaining = units
+        while remaining > DUST_UNITS and self.lots:
+            lot = self.lots[0]
+            taken = min(lot.units, remaining)
+            pnl = taken * (unit_price - lot.unit_price)
+
+            lot.units -= taken
+            lot.realized_pnl += pnl
+            self.cost -= taken * lot.unit_price
+            self.realized_pnl += pnl
+            remaining -= taken
+
+            consumed.append((lot, taken, pnl))
+
+            if lot.units <= DUST_UNITS:
+                lot = self.lots.popleft()
+                if self.closed_lots is not None:
+                    self.closed_lots.append(lot)
+
+        if self.lots:
+            self.quantity -= units
+        else:
+            # don't let float drift leave a phantom position behind
+            self.quantity = 0.0
+            self.cost = 0.0
+
+        return consumed
+
+    @property
+    def average_price(self) -> float:
+        if not self.quantity:
+            return 0.0
+        return self.cost / self.quantity
@@ -0,0 +1,186 @@
+from hashlib import blake2b
+from pandas import Timestamp
+import logging
+import os
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# column -> arrow type of what's written for every archived order
+ARCHIVE_COLUMNS = {
+    "order_id": "string",
+    "symbol": "string",
+    "currency": "string",
+    "order_type": "int8",
+    "status": "int8",
+    "ordered_unit_quantity": "float64",
+    "ordered_unit_price": "float64",
+    "stop_price": "float64",
+    "filled_unit_quantity": "float64",
+    "filled_unit_price": "float64",
+    "filled_total_value": "float64",
+    "fees": "float64",
+    "create_time": "int64",
+    "update_time": "int64",
+}
+
+# how many opened segments to keep around for repeated historical lookups
+SEGMENT_CACHE_SIZE = 4
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError("Spilling closed orders to disk needs pyarrow - pip install pyarrow")
+    return pyarrow
+
+
+def order_key(order_id: str) -> int:
+    # 64 bit hash of an order id. collisions just mean a wasted segment read, since every hit is
+    # checked against the stored order id
+    return int.from_bytes(blake2b(order_id.encode(), digest_size=8).digest(), "little")
+
+
+def _to_ns(period):
+    if period is None:
+        return None
+    return Timestamp(period).value
+
+
+class OrderArchive:
+    # closed orders that have been pushed out of BackTestAPI's memory, written as immutable Arrow
+    # IPC segments in path and never rewritten. the only thing kept in memory per archived order
+    # is a sorted 64 bit key and its row, so that get_order can go straight to the right segment
+    def __init__(self, path: str):
+        _import_pyarrow()
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.tz = None
+        self._segments = []
+        self._keys = []
+        self._rows = []
+        self._cache = {}
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._keys)
+
+    def __getstate__(self):
+        # opened segments are just a cache
+        state = self.__dict__.copy()
+        state["_cache"] = {}
+        return state
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.path, f"orders-{number:06d}.arrow")
+
+    def append(self, orders: list):
+        if not orders:
+            return
+
+        pa = _import_pyarrow()
+        if self.tz is None:
+            tz = getattr(orders[0].create_time, "tz", None)
+            self.tz = str(tz) if tz is not None else None
+
+        columns = {column: [] for column in ARCHIVE_COLUMNS}
+        for order in orders:
+            for column in ARCHIVE_COLUMNS:
+                if column == "currency":
+                    value = order._currency
+                elif column in ("create_time", "update_time"):
+                    value = _to_ns(getattr(order, column))
+                else:
+                    # orders restored from before a column existed won't have it
+                    value = getattr(order, column, None)
+                columns[column].append(value)
+
+        table = pa.table(
+            {
+                column: pa.array(values, type=getattr(pa, ARCHIVE_COLUMNS[column])())
+                for column, values in columns.items()
+            }
+        )
+
+        # write then rename, so a segment is either all there or not there at all
+        number = len(self._segments)
+        segment_path = self._segment_path(number)
+        temp_path = f"{segment_path}.tmp"
+        with pa.OSFile(temp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_path, segment_path)
+
+        keys = np.array([order_key(order_id) for order_id in columns["order_id"]], dtype=np.uint64)
+        rows = np.argsort(keys, kind="stable").astype(np.int32)
+        self._segments.append(segment_path)
+        self._keys.append(keys[rows])
+        self._rows.append(rows)
+
+        log.debug(f"Archived {len(orders)} closed orders to {segment_path}")
+
+    def _read_segment(self, number: int):
+        # memory mapped, so only the rows that get looked at are actually read
+        if number not in self._cache:
+            pa = _import_pyarrow()
+            source = pa.memory_map(self._segments[number], "r")
+            self._cache[number] = pa.ipc.open_file(source).read_all()
+            if len(self._cache) > SEGMENT_CACHE_SIZE:
+                del self._cache[next(iter(self._cache))]
+        return self._cache[number]
+
+    def _find(self, order_id: str):
+        key = np.uint64(order_key(order_id))
+        for number, keys in enumerate(self._keys):
+            position = np.searchsorted(keys, key)
+            while position < len(keys) and keys[position] == key:
+                row = int(self._rows[number][position])
+                if self._read_segment(number).column("order_id")[row].as_py() == order_id:
+                    return number, row
+                position += 1
+        return None
+
+    def contains(self, order_id: str) -> bool:
+        # might be true for an order id that was never archived, which is fine for checking
+        # whether a new id is free but not for anything else
+        key = np.uint64(order_key(order_id))
+        for keys in self._keys:
+            position = np.searchsorted(keys, key)
+            if position < len(keys) and keys[position] == key:
+                return True
+        return False
+
+    def get(self, order_id: str, build_order):
+        # build_order(record: dict) turns an archived row back into an order object
+        found = self._find(order_id)
+        if found is None:
+            return None
+
+        number, row = found
+        record = self._read_segment(number).slice(row, 1).to_pylist()[0]
+        return build_order(self._restore_times(record))
+
+    def orders(self, build_order, symbols: list = None) -> list:
+        # every archived order in the order they were archived, optionally only for symbols
+        pa = _import_pyarrow()
+        import pyarrow.compute
+
+        orders = []
+        for number in range(len(self._segments)):
+            table = self._read_segment(number)
+            if symbols:
+                table = table.filter(pyarrow.compute.is_in(table["symbol"], pa.array(symbols)))
+            for record in table.to_pylist():
+                orders.append(build_order(self._restore_times(record)))
+        return orders
+
+    def _restore_times(self, record: dict) -> dict:
+        for column in ("create_time", "update_time"):
+            if record[column] is None:
+                continue
+            if self.tz:
+                record[column] = Timestamp(record[column], tz="UTC").tz_convert(self.tz)
+            else:
+                record[column] = Timestamp(record[column])
+        return record
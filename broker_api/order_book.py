@@ -0,0 +1,45 @@
+from bisect import bisect_left, bisect_right, insort
+from math import inf
+
+
+class PriceLadder:
+    # resting orders for one side of one symbol, kept sorted by (price, sequence) so that the
+    # orders a bar triggers are a single slice off one end instead of a check against every order
+    def __init__(self):
+        self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, price: float, sequence: int, order_id: str):
+        insort(self._entries, (price, sequence, order_id))
+
+    def remove(self, price: float, sequence: int, order_id: str) -> bool:
+        entry = (price, sequence, order_id)
+        position = bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+            return True
+        return False
+
+    def priced_above(self, price: float, inclusive: bool = False) -> list:
+        # (sequence, order_id) for every order priced above price, or at/above if inclusive
+        if inclusive:
+            position = bisect_left(self._entries, (price, -inf))
+        else:
+            position = bisect_right(self._entries, (price, inf))
+        return [(sequence, order_id) for _, sequence, order_id in self._entries[position:]]
+
+    def priced_below(self, price: float, inclusive: bool = False) -> list:
+        # (sequence, order_id) for every order priced below price, or at/below if inclusive
+        if inclusive:
+            position = bisect_right(self._entries, (price, inf))
+        else:
+            position = bisect_left(self._entries, (price, -inf))
+        return [(sequence, order_id) for _, sequence, order_id in self._entries[:position]]
+
+    def highest_price(self) -> float:
+        return self._entries[-1][0]
+
+    def lowest_price(self) -> float:
+        return self._entries[0][0]
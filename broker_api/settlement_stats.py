@@ -0,0 +1,83 @@
+from pandas import DataFrame, to_datetime
+from time import perf_counter_ns
+
+# the phases settlement time is split into
+PHASES = (
+    "copying",
+    "matching",
+    "bar_lookup",
+    "balance",
+    "bookkeeping",
+    "lot_update",
+    "logging",
+    "intrabar",
+    "equity",
+)
+
+
+class SettlementStats:
+    # where BackTestAPI spends its settlement time, and how many orders each tick looked at,
+    # filled and cancelled. phases are timed as laps - lap(phase) books everything since the
+    # previous lap against phase - so the hot path only needs one call at each phase boundary
+    def __init__(self):
+        self.calls = 0
+        self.settles = 0
+        self._nanoseconds = dict.fromkeys(PHASES, 0)
+        self._laps = dict.fromkeys(PHASES, 0)
+        self._last = perf_counter_ns()
+
+        # [period in nanoseconds, evaluated, filled, cancelled] for every settled period
+        self._ticks = []
+
+    def start(self):
+        self.settles += 1
+        self._last = perf_counter_ns()
+
+    def lap(self, phase: str):
+        now = perf_counter_ns()
+        self._nanoseconds[phase] += now - self._last
+        self._laps[phase] += 1
+        self._last = now
+
+    def count(self, period: int, evaluated: int, filled: int, cancelled: int):
+        # settling the same period more than once adds to its counts
+        if self._ticks and self._ticks[-1][0] == period:
+            tick = self._ticks[-1]
+            tick[1] += evaluated
+            tick[2] += filled
+            tick[3] += cancelled
+        else:
+            self._ticks.append([period, evaluated, filled, cancelled])
+
+    def per_tick(self) -> DataFrame:
+        frame = DataFrame(self._ticks, columns=["period", "evaluated", "filled", "cancelled"])
+        frame["period"] = to_datetime(frame["period"], utc=True)
+        return frame.set_index("period")
+
+    def summary(self) -> dict:
+        per_tick = self.per_tick()
+        total_nanoseconds = sum(self._nanoseconds.values())
+
+        phases = {}
+        for phase in PHASES:
+            nanoseconds = self._nanoseconds[phase]
+            phases[phase] = {
+                "laps": self._laps[phase],
+                "seconds": nanoseconds / 1e9,
+                "share": nanoseconds / total_nanoseconds if total_nanoseconds else 0.0,
+            }
+
+        orders = {}
+        for column in per_tick.columns:
+            orders[column] = int(per_tick[column].sum())
+            orders[f"{column}_per_tick"] = float(per_tick[column].mean()) if len(per_tick) else 0.0
+            orders[f"max_{column}_per_tick"] = int(per_tick[column].max()) if len(per_tick) else 0
+
+        return {
+            "calls": self.calls,
+            "settles": self.settles,
+            "ticks": len(per_tick),
+            "seconds": total_nanoseconds / 1e9,
+            "phases": phases,
+            "orders": orders,
+        }
@@ -92,6 +92,8 @@ ORDER_MAP_INVERTED = {y: x for x, y in ORDER_MAP.items()}
 
 
 class OrderResult(IOrderResult):
+    __slots__ = ()
+
     def __init__(self, order_object, asset_list_by_id: dict):
         self._raw_response = order_object
         self.status = order_object["status"]
@@ -8,8 +8,10 @@ setup(
     author_email="chris.t.fernando@gmail.com",
     url="https://github.com/chris-t-fernando/broker-api",
     packages=["broker_api"],
+    package_data={"broker_api": ["data/*.csv"]},
     install_requires=[
         "alpaca_trade_api",
+        "numpy",
         "pandas",
         "yfinance",
         "pyswyft",
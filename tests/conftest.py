@@ -0,0 +1,11 @@
+import logging
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    # failed fills log a warning each, which is most of the output otherwise
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
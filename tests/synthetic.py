@@ -0,0 +1,42 @@
+from pandas import DataFrame, date_range
+import numpy as np
+
+
+class Ohlc:
+    def __init__(self, bars: DataFrame):
+        self.bars = bars
+
+
+class Symbol:
+    # stands in for the symbol objects BackTestAPI takes - just a name, bars and align_price
+    def __init__(self, yf_symbol: str, bars: DataFrame):
+        self.yf_symbol = yf_symbol
+        self.ohlc = Ohlc(bars)
+
+    def align_price(self, price):
+        return round(price, 4)
+
+
+def make_bars(
+    bar_count: int, seed: int = 0, interval: str = "1min", start: str = "2022-01-01"
+) -> DataFrame:
+    # random walk for Close, with Open at the previous Close and High/Low a little past both
+    rng = np.random.default_rng(seed)
+    index = date_range(start, periods=bar_count, freq=interval, tz="UTC")
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, bar_count)))
+    open_ = np.concatenate([[100], close[:-1]])
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.002, bar_count))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.002, bar_count))
+    volume = rng.lognormal(mean=6, sigma=1, size=bar_count)
+
+    return DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index
+    )
+
+
+def make_symbols(symbol_count: int, bar_count: int, seed: int = 0) -> list:
+    return [
+        Symbol(f"SYN{number}-USD", make_bars(bar_count, seed=seed * 10007 + number))
+        for number in range(symbol_count)
+    ]
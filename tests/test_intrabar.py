@@ -0,0 +1,117 @@
+from pandas import DataFrame, Timedelta, Timestamp, concat, date_range
+
+from broker_api.back_test import BackTestAPI, BackTestClock
+
+from .synthetic import Symbol
+
+DAY = Timestamp("2022-01-03", tz="UTC")
+
+
+def minute_bars(lows: list, highs: list) -> DataFrame:
+    index = date_range(DAY, periods=len(lows), freq="1min", tz="UTC")
+    return DataFrame(
+        {
+            "Open": lows,
+            "High": highs,
+            "Low": lows,
+            "Close": highs,
+            "Volume": [100.0] * len(lows),
+        },
+        index=index,
+    )
+
+
+def daily_bars(fine: DataFrame) -> DataFrame:
+    # the day before is flat, so only the day under test can trigger anything
+    day = fine.resample("1D").agg(
+        {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    )
+    before = DataFrame(
+        {"Open": [100.0], "High": [100.5], "Low": [99.5], "Close": [100.0], "Volume": [1e4]},
+        index=[DAY - Timedelta(days=1)],
+    )
+    return concat([before, day])
+
+
+def stop_first():
+    # the stop loss is hit at minute 4 and the target at minute 6
+    lows = [99.0, 99.5, 99.5, 99.5, 90.0, 99.5, 111.0, 100.0]
+    highs = [101.0, 100.5, 100.5, 100.5, 94.0, 100.5, 112.0, 100.5]
+    return minute_bars(lows, highs)
+
+
+def target_first():
+    # the same moves the other way around
+    lows = [99.0, 99.5, 99.5, 99.5, 111.0, 99.5, 90.0, 100.0]
+    highs = [101.0, 100.5, 100.5, 100.5, 112.0, 100.5, 94.0, 100.5]
+    return minute_bars(lows, highs)
+
+
+def back_test(fine: DataFrame, intrabar: bool = True):
+    def source(symbol, start, end):
+        return fine.loc[start : end - Timedelta(1) if end is not None else None]
+
+    clock = BackTestClock(DAY - Timedelta(days=1))
+    api = BackTestAPI(
+        clock,
+        back_testing_balance=1e6,
+        symbol_objects=[Symbol("SYN0-USD", daily_bars(fine))],
+        sell_metric="High",
+        intrabar_source=source if intrabar else None,
+    )
+    return api, clock
+
+
+def place_stop_and_target(api):
+    api.buy_order_market("SYN0-USD", 10)
+    take_profit = api.sell_order_limit("SYN0-USD", 10, 110)
+    stop_loss = api.sell_order_stop_limit("SYN0-USD", 10, 95, 80)
+    return take_profit, stop_loss
+
+
+def test_sub_bars_decide_between_stop_and_target():
+    for fine, winner, price in ((stop_first(), 1, 94.0), (target_first(), 0, 112.0)):
+        api, clock = back_test(fine)
+        orders = place_stop_and_target(api)
+
+        clock.now = DAY
+        api.list_positions()
+        orders = [api.get_order(order.order_id) for order in orders]
+
+        assert orders[winner].status == 4
+        assert orders[winner].filled_unit_price == price
+        assert orders[winner].update_time == DAY + Timedelta(minutes=4)
+        # by the time the other one triggers there's nothing left to sell
+        assert orders[1 - winner].status == 6
+        assert api._get_held_units("SYN0-USD")[0] == 0
+
+
+def test_coarse_bars_fill_in_placement_order():
+    api, clock = back_test(stop_first(), intrabar=False)
+    take_profit, stop_loss = place_stop_and_target(api)
+
+    clock.now = DAY
+    api.list_positions()
+    assert api.get_order(take_profit.order_id).status == 4
+    assert api.get_order(take_profit.order_id).filled_unit_price == 112.0
+    assert api.get_order(stop_loss.order_id).status == 6
+
+
+def test_bracket_exits_settle_on_the_sub_bars_after_the_entry():
+    for fine, winner, price in ((stop_first(), 2, 94.0), (target_first(), 1, 112.0)):
+        api, clock = back_test(fine)
+        clock.now = DAY
+        # the entry's the only order that triggers on the day, but its exits could fill on it too
+        bracket = api.place_bracket(
+            "SYN0-USD", 10, take_profit=110, stop_loss=95, stop_loss_limit=80
+        )
+        bracket = [api.get_order(order.order_id) for order in bracket]
+
+        assert bracket[0].status == 4
+        assert bracket[0].filled_unit_price == 101.0
+        assert bracket[0].update_time == DAY
+        assert bracket[winner].status == 4
+        assert bracket[winner].filled_unit_price == price
+        assert bracket[winner].update_time == DAY + Timedelta(minutes=4)
+        assert bracket[3 - winner].status == 8
+        assert api._get_held_units("SYN0-USD")[0] == 0
@@ -0,0 +1,35 @@
+import pytest
+
+from broker_api.ledger import LotLedger
+
+
+def test_sold_out_lots_are_dropped():
+    ledger = LotLedger("SYN0-USD")
+    ledger.buy(2, 10)
+    ledger.buy(3, 12)
+    consumed = ledger.sell(4, 15)
+
+    assert [(lot.unit_price, taken, pnl) for lot, taken, pnl in consumed] == [
+        (10, 2, 10),
+        (12, 2, 6),
+    ]
+    assert len(ledger) == 1 and ledger.closed_lots is None
+    assert ledger.quantity == 1 and ledger.cost == 12
+    assert ledger.realized_pnl == 16
+
+
+def test_keep_closed_lots():
+    ledger = LotLedger("SYN0-USD", keep_closed_lots=True)
+    ledger.buy(2, 10)
+    ledger.buy(3, 12)
+    ledger.sell(5, 11)
+
+    assert len(ledger) == 0 and ledger.quantity == 0 and ledger.cost == 0
+    assert [(lot.unit_price, lot.realized_pnl) for lot in ledger.closed_lots] == [(10, 2), (12, -3)]
+
+
+def test_oversell_raises():
+    ledger = LotLedger("SYN0-USD")
+    ledger.buy(1, 10)
+    with pytest.raises(ValueError):
+        ledger.sell(2, 10)
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from broker_api.back_test import BackTestAPI, BackTestClock
+
+from .synthetic import make_symbols
+
+pytest.importorskip("pyarrow")
+
+
+def run(monkeypatch, **kwargs) -> tuple:
+    # the same random limit grid with a few market sells and cancels, with the same order ids
+    # every time it's run
+    ids = random.Random(9)
+    monkeypatch.setattr(
+        BackTestAPI, "generate_id", staticmethod(lambda length=6: "%06X" % ids.getrandbits(24))
+    )
+
+    symbols = make_symbols(3, 1500)
+    clock = BackTestClock()
+    api = BackTestAPI(clock, back_testing_balance=1e6, symbol_objects=symbols, **kwargs)
+    rng = random.Random(3)
+    order_ids = []
+    for row, period in enumerate(symbols[0].ohlc.bars.index):
+        clock.now = period
+        for symbol in symbols:
+            close = symbol.ohlc.bars["Close"].iloc[row]
+            if rng.random() < 0.3:
+                limit_price = close * (1 - rng.uniform(0, 0.003))
+                order_ids.append(api.buy_order_limit(symbol.yf_symbol, 1, limit_price).order_id)
+            if rng.random() < 0.3:
+                limit_price = close * (1 + rng.uniform(0, 0.003))
+                order_ids.append(api.sell_order_limit(symbol.yf_symbol, 1, limit_price).order_id)
+            if rng.random() < 0.05:
+                order_ids.append(api.sell_order_market(symbol.yf_symbol, 1).order_id)
+            if rng.random() < 0.05 and order_ids:
+                api.cancel_order(rng.choice(order_ids))
+
+    return api, order_ids
+
+
+def key(order) -> tuple:
+    return order.order_id, order.as_dict()
+
+
+def test_archive_round_trip(monkeypatch, tmp_path):
+    in_memory, order_ids = run(monkeypatch)
+    archived, archived_ids = run(
+        monkeypatch, order_archive=str(tmp_path / "archive"), closed_order_window=50
+    )
+
+    assert order_ids == archived_ids
+    # most of the closed orders actually made it out to disk
+    assert len(archived._archive) > len(order_ids) // 2
+    assert len(archived._all_orders) < len(order_ids) // 2
+
+    for order_id in order_ids:
+        assert key(archived.get_order(order_id)) == key(in_memory.get_order(order_id))
+
+    assert sorted(map(key, archived.list_orders())) == sorted(map(key, in_memory.list_orders()))
+    assert sorted(map(key, archived.list_orders(symbol="SYN1-USD"))) == sorted(
+        map(key, in_memory.list_orders(symbol="SYN1-USD"))
+    )
+    assert archived.get_account().assets == in_memory.get_account().assets
+
+
+def test_archive_survives_snapshot(monkeypatch, tmp_path):
+    archived, order_ids = run(
+        monkeypatch, order_archive=str(tmp_path / "archive"), closed_order_window=50
+    )
+    archived.snapshot(str(tmp_path / "snapshot"))
+
+    restored = BackTestAPI.restore(
+        str(tmp_path / "snapshot"), BackTestClock(), make_symbols(3, 1500)
+    )
+    for order_id in order_ids[::25]:
+        assert key(restored.get_order(order_id)) == key(archived.get_order(order_id))
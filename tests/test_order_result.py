@@ -0,0 +1,24 @@
+from broker_api.back_test import BackTestAPI, BackTestClock, OrderResult
+
+from .synthetic import make_symbols
+
+
+def test_raw_response_rebuilds_the_order():
+    symbols = make_symbols(1, 10)
+    clock = BackTestClock(symbols[0].ohlc.bars.index[0])
+    api = BackTestAPI(clock, back_testing_balance=10000, symbol_objects=symbols)
+    close = symbols[0].ohlc.bars["Close"].iloc[0]
+
+    limit = api.buy_order_limit("SYN0-USD", 1, round(close * 0.5, 2))
+    stop = api.sell_order_stop_limit("SYN0-USD", 1, round(close * 0.5, 2), round(close * 0.4, 2))
+    # exits held back until the entry fills are pending, not open
+    entry, take_profit, stop_loss = api.place_bracket(
+        "SYN0-USD", 1, take_profit=close * 2, stop_loss=close * 0.5, entry_price=close * 0.5
+    )
+
+    for order in (limit, stop, entry, take_profit, stop_loss):
+        order = api.get_order(order.order_id)
+        assert order._raw_response["status"] == order.status
+        assert OrderResult(order._raw_response).as_dict() == order.as_dict()
+
+    assert api.get_order(take_profit.order_id)._raw_response["status"] == 5
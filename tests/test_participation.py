@@ -0,0 +1,173 @@
+import pytest
+
+from broker_api.back_test import BackTestAPI, BackTestClock
+
+from .synthetic import Symbol, make_bars
+
+RATE = 0.1
+
+
+@pytest.fixture
+def symbol():
+    return Symbol("SYN0-USD", make_bars(200, seed=7))
+
+
+def back_test(symbol, **kwargs):
+    clock = BackTestClock(symbol.ohlc.bars.index[0])
+    api = BackTestAPI(
+        clock,
+        back_testing_balance=1e7,
+        symbol_objects=[symbol],
+        participation_rate=RATE,
+        **kwargs,
+    )
+    return api, clock
+
+
+def step(api, clock, periods):
+    for period in periods:
+        clock.now = period
+        api.list_positions()
+
+
+def test_market_buy_fills_over_bars_at_the_volume_weighted_price(symbol):
+    bars = symbol.ohlc.bars
+    api, clock = back_test(symbol)
+    units = round(bars["Volume"].iloc[:3].sum() * RATE * 1.5)
+
+    order = api.buy_order_market("SYN0-USD", units)
+    assert order.status == 3
+    assert order.filled_unit_quantity == pytest.approx(bars["Volume"].iloc[0] * RATE)
+
+    # work out what each bar should have filled, at that bar's aligned High
+    expected_units = []
+    expected_value = 0.0
+    remaining = units
+    for row in range(len(bars)):
+        if remaining <= 0:
+            break
+        taken = min(remaining, bars["Volume"].iloc[row] * RATE)
+        expected_units.append(taken)
+        expected_value += taken * symbol.align_price(bars["High"].iloc[row])
+        remaining -= taken
+
+    step(api, clock, bars.index[1 : len(expected_units)])
+    order = api.get_order(order.order_id)
+    assert order.status == 4
+    assert order.filled_unit_quantity == units
+    assert order.filled_unit_price == pytest.approx(expected_value / units)
+    assert order.update_time == bars.index[len(expected_units) - 1]
+    assert api.get_account().assets["USD"] == pytest.approx(1e7 - expected_value)
+
+
+def test_orders_share_a_bars_volume(symbol):
+    volume = symbol.ohlc.bars["Volume"].iloc[0]
+    api, clock = back_test(symbol)
+    units = round(volume * RATE * 0.75)
+
+    first = api.buy_order_market("SYN0-USD", units)
+    second = api.buy_order_market("SYN0-USD", units)
+
+    # first in gets its whole order, the second gets whatever volume is left
+    assert first.status == 4 and first.filled_unit_quantity == units
+    assert second.status == 3
+    assert second.filled_unit_quantity == pytest.approx(volume * RATE - units)
+
+    third = api.buy_order_market("SYN0-USD", 1)
+    assert third.status == 1 and not third.filled_unit_quantity
+
+
+def test_sell_larger_than_holding_is_rejected_up_front(symbol):
+    bars = symbol.ohlc.bars
+    api, clock = back_test(symbol)
+    units = round(bars["Volume"].iloc[:3].sum() * RATE * 1.5)
+    api.buy_order_market("SYN0-USD", units)
+    step(api, clock, bars.index[1:60])
+
+    # this bar's slice is well within the holding, but the whole order isn't
+    assert bars["Volume"].loc[clock.now] * RATE < units
+    order = api.sell_order_market("SYN0-USD", units * 2)
+    assert order.status == 6 and not order.filled_unit_quantity
+    assert api._get_held_units("SYN0-USD")[0] == units
+
+
+def test_partial_oco_fill_shrinks_the_sibling(symbol):
+    bars = symbol.ohlc.bars
+    api, clock = back_test(symbol)
+    units = round(bars["Volume"].iloc[:3].sum() * RATE * 1.5)
+    api.buy_order_market("SYN0-USD", units)
+    step(api, clock, bars.index[1:60])
+    held = api._get_held_units("SYN0-USD")[0]
+    assert held == units
+
+    close = bars["Close"].loc[clock.now]
+    market, limit = api.place_oco(
+        [
+            {"symbol": "SYN0-USD", "order_type": "MARKET_SELL", "units": held},
+            {
+                "symbol": "SYN0-USD",
+                "order_type": "LIMIT_SELL",
+                "units": held,
+                "unit_price": close * 5,
+            },
+        ]
+    )
+    assert market.status == 3
+    assert limit.status == 1
+    assert limit.ordered_unit_quantity == pytest.approx(held - market.filled_unit_quantity)
+
+    # once the market sell completes the limit sell has nothing left to cover
+    step(api, clock, bars.index[60:120])
+    market = api.get_order(market.order_id)
+    limit = api.get_order(limit.order_id)
+    assert market.status == 4 and limit.status == 8
+    assert api._get_held_units("SYN0-USD")[0] == 0
+
+
+def test_bracket_exits_cover_only_what_the_entry_filled(symbol):
+    bars = symbol.ohlc.bars
+    api, clock = back_test(symbol)
+    api.buy_order_market("SYN0-USD", 5)
+    clock.now = bars.index[1]
+
+    # an entry that takes a few bars to fill, and a target close enough to be hit while it does
+    units = round(bars["Volume"].iloc[1] * RATE * 4)
+    close = bars["Close"].iloc[1]
+    entry, take_profit, stop_loss = api.place_bracket(
+        "SYN0-USD", units, take_profit=round(close * 1.002, 2), stop_loss=round(close * 0.998, 2)
+    )
+    assert entry.status == 3
+    assert take_profit.status == 1 and stop_loss.status == 5
+    assert take_profit.ordered_unit_quantity == entry.filled_unit_quantity
+    assert stop_loss.ordered_unit_quantity == entry.filled_unit_quantity
+
+    step(api, clock, bars.index[2:])
+    orders = [api.get_order(order.order_id) for order in (entry, take_profit, stop_loss)]
+    sold = sum(order.filled_unit_quantity or 0 for order in orders[1:])
+    assert sold <= orders[0].filled_unit_quantity + 1e-9
+    # the 5 units held before the bracket are never sold by it
+    assert api._get_held_units("SYN0-USD")[0] >= 5 - 1e-9
+
+
+def test_cancelling_a_partly_filled_entry_keeps_its_exits(symbol):
+    bars = symbol.ohlc.bars
+    api, clock = back_test(symbol)
+    close = bars["Close"].iloc[0]
+    units = round(bars["Volume"].iloc[0] * RATE * 4)
+
+    entry, take_profit, stop_loss = api.place_bracket(
+        "SYN0-USD", units, take_profit=close * 3, stop_loss=close * 0.2
+    )
+    assert entry.status == 3
+    api.cancel_order(entry.order_id)
+
+    entry = api.get_order(entry.order_id)
+    take_profit = api.get_order(take_profit.order_id)
+    stop_loss = api.get_order(stop_loss.order_id)
+    assert entry.status == 6
+    assert take_profit.status == 1 and stop_loss.status == 5
+    assert take_profit.ordered_unit_quantity == entry.filled_unit_quantity
+
+    # the exits are still an OCO pair between themselves
+    api.cancel_order(stop_loss.order_id)
+    assert api.get_order(take_profit.order_id).status == 8
@@ -0,0 +1,49 @@
+import random
+
+from broker_api.back_test import BackTestAPI, BackTestClock
+from broker_api.settlement_stats import PHASES
+
+from .synthetic import make_symbols
+
+
+def run(instrument: bool) -> BackTestAPI:
+    symbols = make_symbols(2, 300)
+    clock = BackTestClock()
+    api = BackTestAPI(
+        clock, back_testing_balance=1e6, symbol_objects=symbols, instrument=instrument
+    )
+    rng = random.Random(1)
+    for row, period in enumerate(symbols[0].ohlc.bars.index):
+        clock.now = period
+        for symbol in symbols:
+            close = symbol.ohlc.bars["Close"].iloc[row]
+            api.buy_order_limit(symbol.yf_symbol, 1, close * (1 - rng.uniform(0, 0.01)))
+            api.sell_order_limit(symbol.yf_symbol, 1, close * (1 + rng.uniform(0, 0.01)))
+            if rng.random() < 0.1:
+                api.buy_order_market(symbol.yf_symbol, 1)
+    api.list_positions()
+    return api
+
+
+def test_stats_time_every_settlement_phase():
+    stats = run(instrument=True).stats(per_tick=True)
+    per_tick = stats.pop("per_tick")
+
+    assert list(stats["phases"]) == list(PHASES)
+    for phase in ("copying", "matching", "bar_lookup", "balance", "bookkeeping", "lot_update"):
+        assert stats["phases"][phase]["laps"] > 0, phase
+    assert stats["phases"]["intrabar"]["laps"] == 0
+    assert abs(sum(phase["share"] for phase in stats["phases"].values()) - 1) < 1e-9
+
+    assert len(per_tick) == stats["ticks"] == 300
+    assert stats["orders"]["filled"] == per_tick["filled"].sum() > 0
+    assert stats["orders"]["evaluated"] >= stats["orders"]["filled"]
+
+
+def test_stats_off_by_default():
+    api = run(instrument=False)
+    assert api.stats() == {}
+
+    api.set_instrumentation(True)
+    api.buy_order_market("SYN0-USD", 1)
+    assert api.stats()["calls"] > 0
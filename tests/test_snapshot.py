@@ -0,0 +1,101 @@
+import random
+import struct
+
+import pytest
+
+from broker_api.back_test import SNAPSHOT_MAGIC, SNAPSHOT_VERSION, BackTestAPI, BackTestClock
+
+from .synthetic import make_symbols
+
+
+def drive(api, clock, periods, rng, symbols):
+    for period in periods:
+        clock.now = period
+        for _ in range(rng.randint(0, 2)):
+            symbol = rng.choice(symbols).yf_symbol
+            bars = api._bar_cache[symbol]
+            close = bars.value("Close", bars.row_at_or_before(period))
+            kind = rng.random()
+            if kind < 0.25:
+                api.buy_order_market(symbol, 1)
+            elif kind < 0.45:
+                api.sell_order_market(symbol, 1)
+            elif kind < 0.65:
+                api.buy_order_limit(symbol, 1, round(close * 0.995, 2))
+            elif kind < 0.85:
+                api.sell_order_limit(symbol, 1, round(close * 1.005, 2))
+            else:
+                api.sell_order_stop_limit(
+                    symbol, 1, round(close * 0.995, 2), round(close * 0.99, 2)
+                )
+        api.list_positions()
+
+
+def history(api) -> list:
+    # order ids are random, so orders are compared on everything else
+    return sorted(
+        (
+            str(order.create_time),
+            order.symbol,
+            order.order_type,
+            order.status,
+            order.filled_unit_quantity,
+            order.filled_unit_price,
+            str(order.update_time),
+        )
+        for order in api.list_orders()
+    )
+
+
+def test_restore_carries_on_the_same(tmp_path):
+    symbols = make_symbols(3, 2000)
+    periods = symbols[0].ohlc.bars.index
+    path = str(tmp_path / "snapshot")
+
+    clock = BackTestClock()
+    api = BackTestAPI(clock, back_testing_balance=10000, symbol_objects=symbols)
+    rng = random.Random(5)
+    drive(api, clock, periods[:1000], rng, symbols)
+
+    # a bracket still waiting on its entry goes over as well
+    close = symbols[0].ohlc.bars["Close"].iloc[999]
+    bracket = api.place_bracket(
+        "SYN0-USD", 1, take_profit=close * 1.01, stop_loss=close * 0.99, entry_price=close * 0.998
+    )
+    api.snapshot(path)
+    state = rng.getstate()
+
+    restored_clock = BackTestClock()
+    restored = BackTestAPI.restore(path, restored_clock, symbols)
+    assert restored_clock.now == clock.now
+    assert history(restored) == history(api)
+    assert [restored.get_order(order.order_id).status for order in bracket] == [
+        api.get_order(order.order_id).status for order in bracket
+    ]
+
+    drive(api, clock, periods[1000:], rng, symbols)
+    rng.setstate(state)
+    drive(restored, restored_clock, periods[1000:], rng, symbols)
+
+    assert history(restored) == history(api)
+    assert restored.get_account().assets == api.get_account().assets
+    assert sorted((p.symbol, p.quantity) for p in restored.list_positions()) == sorted(
+        (p.symbol, p.quantity) for p in api.list_positions()
+    )
+    assert restored.equity_curve().equals(api.equity_curve())
+    assert [restored.get_order(order.order_id).status for order in bracket] == [
+        api.get_order(order.order_id).status for order in bracket
+    ]
+
+
+def test_restore_rejects_other_files(tmp_path):
+    symbols = make_symbols(1, 10)
+    path = tmp_path / "snapshot"
+
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError):
+        BackTestAPI.restore(str(path), BackTestClock(), symbols)
+
+    path.write_bytes(SNAPSHOT_MAGIC + struct.pack("<H", SNAPSHOT_VERSION + 1))
+    with pytest.raises(ValueError):
+        BackTestAPI.restore(str(path), BackTestClock(), symbols)
@@ -0,0 +1,66 @@
+import pytest
+
+from broker_api.back_test import BackTestAPI, BackTestClock
+from broker_api.back_test_sweep import SweepRunner, summarise_run
+
+from .synthetic import Symbol, make_bars
+
+
+def load_symbols():
+    return [Symbol("SYN0-USD", make_bars(100, seed=3))]
+
+
+def load_symbols_without_close():
+    bars = make_bars(100, seed=3).drop(columns=["Close"])
+    return [Symbol("SYN0-USD", bars)]
+
+
+def buy_and_hold(symbols, params, back_testing_balance, seed):
+    clock = BackTestClock()
+    api = BackTestAPI(clock, back_testing_balance=back_testing_balance, symbol_objects=symbols)
+    for row, period in enumerate(symbols[0].ohlc.bars.index):
+        clock.now = period
+        if row == params["buy_at"]:
+            api.buy_order_market("SYN0-USD", params["units"])
+    return api
+
+
+@pytest.mark.parametrize("load", [load_symbols, load_symbols_without_close])
+def test_sweep_summary_matches_the_equity_curve(load):
+    runner = SweepRunner(buy_and_hold, load, back_testing_balance=10000, max_workers=0)
+    results = runner.run({"buy_at": [0, 50], "units": [1, 5]})
+
+    assert len(results) == 4
+    assert results["error"].isna().all()
+
+    # the summary is the back test's own valuation of itself
+    for run, row in results.iterrows():
+        api = buy_and_hold(load(), {"buy_at": row.buy_at, "units": row.units}, 10000, row.seed)
+        api.list_positions()
+        equity = api.equity_curve().iloc[-1]
+        assert row.final_balance == equity["cash"]
+        assert row.position_value == equity["position_value"]
+        assert row.final_equity == pytest.approx(equity["equity"])
+        assert row["return"] == pytest.approx(equity["equity"] / 10000 - 1)
+        assert row.fills == 1
+
+
+def test_summarise_run_values_starting_balances_in_the_default_currency():
+    symbols = load_symbols()
+    periods = symbols[0].ohlc.bars.index
+    fx_rates = {"AUD": make_bars(100, seed=4)["Close"] / 150}
+
+    clock = BackTestClock(periods[0])
+    api = BackTestAPI(
+        clock,
+        back_testing_balance={"USD": 1000, "AUD": 1000},
+        symbol_objects=symbols,
+        fx_rates=fx_rates,
+    )
+    api.list_positions()
+    clock.now = periods[-1]
+
+    summary = summarise_run(api, {"USD": 1000, "AUD": 1000})
+    starting_equity = 1000 + 1000 * fx_rates["AUD"].iloc[0]
+    assert summary["final_equity"] == pytest.approx(1000 + 1000 * fx_rates["AUD"].iloc[-1])
+    assert summary["return"] == pytest.approx(summary["final_equity"] / starting_equity - 1)
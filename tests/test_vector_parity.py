@@ -0,0 +1,134 @@
+import random
+
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+from broker_api.back_test import BackTestAPI, BackTestClock, VectorBackTest
+from broker_api.fill_models import FillModel, FixedSlippage, VolumeSlippage
+
+from .synthetic import Symbol, make_bars
+
+BALANCE = 5000
+
+FILL_MODELS = {
+    "none": None,
+    "volume": FillModel(VolumeSlippage(impact=0.5), fees="alpaca"),
+    "fixed": FillModel(FixedSlippage(5), fees="swyftx"),
+}
+
+
+def make_symbols(seed: int) -> list:
+    symbols = []
+    for number in range(3):
+        bars = make_bars(500, seed=seed * 10 + number)
+        if number == 1:
+            # gaps, so orders get placed between bars
+            bars = bars.drop(bars.index[::5])
+        symbols.append(Symbol(f"SYN{number}-USD", bars))
+    return symbols
+
+
+def random_signals(symbols: list, seed: int, order_types: list) -> DataFrame:
+    rng = random.Random(seed)
+    index = symbols[0].ohlc.bars.index
+    rows = []
+    for period in index[:-50]:
+        for _ in range(rng.randint(0, 2)):
+            symbol = symbols[rng.randrange(len(symbols))]
+            bars = symbol.ohlc.bars
+            close = bars["Close"].iloc[min(len(bars) - 1, bars.index.searchsorted(period))]
+            order_type = rng.choice(order_types)
+            limit_price = np.nan
+            stop_price = np.nan
+            if order_type == "LIMIT_BUY":
+                limit_price = round(close * rng.uniform(0.99, 1.001), 2)
+            elif order_type == "LIMIT_SELL":
+                limit_price = round(close * rng.uniform(0.999, 1.01), 2)
+            elif order_type == "STOP_LIMIT_BUY":
+                stop_price = round(close * rng.uniform(1.0, 1.02), 2)
+                limit_price = round(stop_price * rng.uniform(1.0, 1.02), 2)
+            elif order_type == "STOP_LIMIT_SELL":
+                stop_price = round(close * rng.uniform(0.98, 1.0), 2)
+                limit_price = round(stop_price * rng.uniform(0.97, 1.0), 2)
+
+            quantity = float(rng.choice([1, 2, 5, 10]))
+            rows.append((period, symbol.yf_symbol, order_type, quantity, limit_price, stop_price))
+
+    return DataFrame(
+        rows,
+        columns=["timestamp", "symbol", "order_type", "quantity", "limit_price", "stop_price"],
+    )
+
+
+def step_through(symbols: list, signals: DataFrame, fill_model) -> tuple:
+    # places the same signals one at a time against a BackTestAPI as its clock steps
+    clock = BackTestClock()
+    api = BackTestAPI(
+        clock, back_testing_balance=BALANCE, symbol_objects=symbols, fill_model=fill_model
+    )
+    place = {
+        "MARKET_BUY": lambda row: api.buy_order_market(row.symbol, row.quantity),
+        "MARKET_SELL": lambda row: api.sell_order_market(row.symbol, row.quantity),
+        "LIMIT_BUY": lambda row: api.buy_order_limit(row.symbol, row.quantity, row.limit_price),
+        "LIMIT_SELL": lambda row: api.sell_order_limit(row.symbol, row.quantity, row.limit_price),
+        "STOP_LIMIT_BUY": lambda row: api.buy_order_stop_limit(
+            row.symbol, row.quantity, row.stop_price, row.limit_price
+        ),
+        "STOP_LIMIT_SELL": lambda row: api.sell_order_stop_limit(
+            row.symbol, row.quantity, row.stop_price, row.limit_price
+        ),
+    }
+
+    rows = list(signals.itertuples(index=False))
+    placed = []
+    for period in symbols[0].ohlc.bars.index:
+        clock.now = period
+        api.list_positions()
+        while len(placed) < len(rows) and rows[len(placed)].timestamp == period:
+            row = rows[len(placed)]
+            placed.append(place[row.order_type](row))
+
+    api.list_positions()
+    return api, [api.get_order(order.order_id) for order in placed]
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+@pytest.mark.parametrize(
+    "order_types, fill_model",
+    [
+        (["MARKET_BUY", "MARKET_SELL", "LIMIT_BUY", "LIMIT_SELL"], "none"),
+        (["MARKET_BUY", "LIMIT_BUY", "STOP_LIMIT_BUY", "STOP_LIMIT_SELL", "LIMIT_SELL"], "none"),
+        (["MARKET_BUY", "MARKET_SELL", "LIMIT_BUY", "LIMIT_SELL"], "volume"),
+        (["MARKET_BUY", "MARKET_SELL", "LIMIT_BUY", "LIMIT_SELL"], "fixed"),
+    ],
+    ids=["market_limit", "stop_limit", "volume_slippage", "fixed_slippage"],
+)
+def test_vector_matches_stepped(seed, order_types, fill_model):
+    symbols = make_symbols(seed)
+    signals = random_signals(symbols, seed, order_types)
+    fill_model = FILL_MODELS[fill_model]
+
+    result = VectorBackTest.from_symbols(
+        symbols, back_testing_balance=BALANCE, fill_model=fill_model
+    ).run(signals)
+    api, orders = step_through(symbols, signals, fill_model)
+
+    assert len(result.orders) == len(orders)
+    for order, record in zip(orders, result.orders.itertuples()):
+        vector_price = None if np.isnan(record.filled_unit_price) else record.filled_unit_price
+        assert order.order_type == record.order_type
+        assert order.status == record.status
+        assert order.filled_unit_price == vector_price
+        assert order.update_time == record.update_time
+        assert float(order.fees) == record.fees
+
+    # enough of each kind of outcome that the comparison means something
+    statuses = {order.status for order in orders}
+    assert 4 in statuses and statuses - {4}
+
+    assert api.get_account().assets["USD"] == result.balance
+    assert sorted((p.symbol, p.quantity) for p in api.list_positions()) == sorted(
+        result.positions.items()
+    )
+    assert len(result.order_results()) == len(orders)